@@ -1,5 +1,9 @@
 #   -*- coding: utf-8 -*-
-from pybuilder.core import use_plugin, init
+import subprocess
+import sys
+
+from pybuilder.core import use_plugin, init, task, description
+from pybuilder.errors import BuildFailedException
 
 use_plugin("python.core")
 use_plugin("python.unittest")
@@ -14,4 +18,20 @@ default_task = "publish"
 
 @init
 def set_properties(project):
-    pass
+    project.set_property("dir_source_benchmark_python", "src/benchmark/python")
+    # Store sizes and timed calls of the benchmark task (pyb benchmark -P benchmark_calls=20)
+    project.set_property("benchmark_sizes", "1000 100000 1000000")
+    project.set_property("benchmark_calls", 50)
+
+
+@task
+@description("Runs the benchmark suite and writes its results to $dir_target/benchmarks")
+def benchmark(project, logger):
+    suite = project.expand_path("$dir_source_benchmark_python", "bench_suite.py")
+    sizes = str(project.get_property("benchmark_sizes")).split()
+    command = [sys.executable, suite, "--sizes", *sizes,
+               "--calls", str(project.get_property("benchmark_calls")),
+               "--output-dir", project.expand_path("$dir_target", "benchmarks")]
+    logger.info("Running %s", " ".join(command))
+    if subprocess.call(command, cwd=project.basedir) != 0:
+        raise BuildFailedException("The benchmark suite failed")
@@ -0,0 +1,132 @@
+"""Latency benchmark of the async entry points under concurrent load.
+
+Runs the same number of concurrent deposit and transfer requests on temporary
+copies of the stores three ways: calling the blocking functions from the
+coroutines, offloading every call with asyncio.to_thread, and through the async
+API with group commits. For each one it prints the throughput, the p50/p95/p99
+latency of a request and the worst stall of the event loop (how late a 1 ms
+ticker woke up).
+Run with: python src/benchmark/python/bench_async_api.py --requests 2000 --concurrency 200"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+from uc3m_money.account_deposit import deposit_into_account
+from uc3m_money.transfer_request import process_transfer
+from uc3m_money.transfer_journal import close_journals
+from uc3m_money.async_api import aprocess_transfer, adeposit_into_account
+
+IBAN = "ES8658342044541216872704"
+TRANSFER_DATE = (date.today() + timedelta(days=30)).strftime("%d/%m/%Y")
+
+
+def transfer_arguments(number: int) -> tuple:
+    """Arguments of a distinct valid transfer"""
+    return ("ES9121000418450200051332", "ES7921000813610123456789", "monthly rent payment",
+            "ORDINARY", TRANSFER_DATE, f"{10 + number % 9000}.{number % 100:02d}")
+
+
+def blocking_calls(input_file: str):
+    """The request calls the blocking functions on the event loop"""
+    async def request(number: int):
+        if number % 2:
+            return process_transfer(*transfer_arguments(number))
+        return deposit_into_account(input_file)
+    return request
+
+
+def thread_calls(input_file: str):
+    """The request offloads the blocking functions to a thread"""
+    async def request(number: int):
+        if number % 2:
+            return await asyncio.to_thread(process_transfer, *transfer_arguments(number))
+        return await asyncio.to_thread(deposit_into_account, input_file)
+    return request
+
+
+def async_calls(input_file: str):
+    """The request uses the async API"""
+    async def request(number: int):
+        if number % 2:
+            return await aprocess_transfer(*transfer_arguments(number))
+        return await adeposit_into_account(input_file)
+    return request
+
+
+async def run_load(request, requests: int, concurrency: int):
+    """Runs the requests, ``concurrency`` at a time, with a ticker measuring the loop stalls"""
+    latencies = []
+    worst_stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst_stall
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst_stall = max(worst_stall, time.perf_counter() - start - 0.001)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(number: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await request(number)
+            latencies.append(time.perf_counter() - start)
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(number) for number in range(requests)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker_task
+    latencies.sort()
+    return elapsed, latencies, worst_stall
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Value below which ``fraction`` of the sorted values are"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    """Prints the results of every way of calling the entry points"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    for mode in (blocking_calls, thread_calls, async_calls):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            nested_dir = os.path.join(temp_dir, "level1", "level2")
+            os.makedirs(nested_dir)
+            module_file = os.path.join(nested_dir, "dummy_module.py")
+            input_file = os.path.join(temp_dir, "deposit.json")
+            with open(input_file, "w", encoding="utf-8") as f:
+                json.dump({"IBAN": IBAN, "AMOUNT": "EUR 500.00"}, f)  # type: ignore
+            with patch("uc3m_money.transfer_request.__file__", module_file), \
+                    patch("uc3m_money.account_deposit.__file__", module_file):
+                elapsed, latencies, stall = asyncio.run(
+                    run_load(mode(input_file), args.requests, args.concurrency))
+                close_journals()
+        print(f"{mode.__name__:>15}: {args.requests / elapsed:8,.0f} requests/s  "
+              f"p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  "
+              f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  "
+              f"worst loop stall {stall * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
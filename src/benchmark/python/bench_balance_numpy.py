@@ -0,0 +1,57 @@
+"""Benchmark of the NumPy balance backend against the pure Python ledger.
+
+Writes a synthetic all_transactions.json and times the full aggregation of both
+ledgers: the first NumPy run parses the file and writes the columnar cache, the
+second one reads the cache. Needs NumPy installed.
+Run with: python src/benchmark/python/bench_balance_numpy.py --rows 1000000"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+from uc3m_money.balance_ledger import BalanceLedger
+from uc3m_money.balance_numpy import NumpyBalanceLedger, numpy_available
+from bench_money import movements
+
+
+def timed(ledger_class, path: str):
+    """Returns the balances of a new ledger and the seconds it took"""
+    start = time.perf_counter()
+    balances = ledger_class(path).balances()
+    return balances, time.perf_counter() - start
+
+
+def main():
+    """Prints the timings of every backend and checks they agree"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+    if not numpy_available():
+        sys.exit("NumPy is not installed")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "all_transactions.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(list(movements(args.rows)), f, indent=4)  # type: ignore
+
+        python_balances, python_seconds = timed(BalanceLedger, path)
+        cold_balances, cold_seconds = timed(NumpyBalanceLedger, path)
+        cached_balances, cached_seconds = timed(NumpyBalanceLedger, path)
+
+    print(f"rows: {args.rows}")
+    print(f"pure Python ledger: {python_seconds:.3f} s")
+    print(f"NumPy, parsing the file: {cold_seconds:.3f} s")
+    print(f"NumPy, from the columnar cache: {cached_seconds:.3f} s")
+    print(f"same balances: {python_balances == cold_balances == cached_balances}")
+
+
+if __name__ == "__main__":
+    main()
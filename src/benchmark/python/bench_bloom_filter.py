@@ -0,0 +1,62 @@
+"""Benchmark of the Bloom filter in front of the transfer code index.
+
+Stores ``--records`` transfers in a journal, then times duplicate checks of new
+codes (the usual case) through the journal, which asks the filter first, and
+straight on the code index, and prints the filter statistics and its size.
+Run with: python src/benchmark/python/bench_bloom_filter.py --records 100000"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+from uc3m_money import bloom_filter
+from uc3m_money.transfer_index import TransferCodeIndex
+from uc3m_money.transfer_journal import TransferJournal
+
+
+def per_check(check, codes: list) -> float:
+    """Microseconds per call of ``check`` over ``codes``"""
+    def loop():
+        for code in codes:
+            check(code)
+    return min(timeit.repeat(loop, number=1, repeat=3)) / len(codes) * 1e6
+
+
+def main():
+    """Prints the time per duplicate check with and without the filter"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--checks", type=int, default=50000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        legacy_path = os.path.join(temp_dir, "stored_transactions.json")
+        journal = TransferJournal(legacy_path)
+        journal.append_many([{"transfer_code": f"{number:032x}"}
+                             for number in range(args.records)])
+        journal.close()
+        index = TransferCodeIndex(os.path.join(temp_dir, "stored_transactions.idx"),
+                                  journal.path)
+        new_codes = [f"new{number:029x}" for number in range(args.checks)]
+        index_us = per_check(index.__contains__, new_codes)
+        bloom_filter.reset_stats()
+        filter_us = per_check(journal.__contains__, new_codes)
+        stats = bloom_filter.stats()
+        index.close()
+        journal.close()
+        bloom_size = os.path.getsize(os.path.join(temp_dir, "stored_transactions.bloom"))
+    print(f"index only          {index_us:8.2f} us per check")
+    print(f"filter, then index  {filter_us:8.2f} us per check")
+    print(f"avoided {stats['avoided_ratio']:.2%} of the exact lookups, "
+          f"{stats['false_positives']} false positives in {stats['checks']} checks, "
+          f"filter file {bloom_size / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark of deposit_many_into_account against deposit_into_account.
+
+Times a batch of deposits given one file per deposit to deposit_into_account
+(a rewrite of deposits.json per deposit) against the same batch in a single
+JSON Lines file given to deposit_many_into_account, with each number of workers.
+Run with:
+    python src/benchmark/python/bench_deposit_many.py --deposits 50000 --workers 1 2 4"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+# pylint: disable=duplicate-code
+from uc3m_money.account_deposit import deposit_into_account, deposit_many_into_account
+
+IBAN = "ES7921000813610123456789"
+
+
+def run(deposits: int, workers: int) -> float:
+    """Deposits per second; ``workers`` None times deposit_into_account"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        nested_dir = os.path.join(temp_dir, "level1", "level2")
+        os.makedirs(nested_dir)
+        request = json.dumps({"IBAN": IBAN, "AMOUNT": "EUR 500.00"})
+        input_file = os.path.join(temp_dir, "input.json")
+        with open(input_file, "w", encoding="utf-8") as f:
+            f.write("\n".join([request] * (1 if workers is None else deposits)))
+
+        with patch("uc3m_money.account_deposit.__file__",
+                   os.path.join(nested_dir, "dummy_module.py")):
+            start = time.perf_counter()
+            if workers is None:
+                for _ in range(deposits):
+                    deposit_into_account(input_file)
+            else:
+                deposit_many_into_account(input_file, workers)
+            return deposits / (time.perf_counter() - start)
+
+
+def main():
+    """Prints the deposit throughput of each mode"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--deposits", type=int, default=50000)
+    parser.add_argument("--single", type=int, default=500,
+                        help="deposits timed one file at a time (the rate falls as the file grows)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    print(f"{'mode':>24} {'deposits':>10} {'throughput':>14}")
+    print(f"{'one file per deposit':>24} {args.single:>10} "
+          f"{run(args.single, None):>10,.0f} /s")
+    for workers in args.workers:
+        print(f"{f'bulk, {workers} workers':>24} {args.deposits:>10} "
+              f"{run(args.deposits, workers):>10,.0f} /s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Microbenchmark for the memoized transfer code and deposit signature.
+
+Counts how many MD5 / SHA-256 computations a request needs and times the
+repeated property accesses done by process_transfer and deposit_into_account,
+with the memoized properties and with the unmemoized ones they replaced (which
+hashed again on every access).
+Run with: python src/benchmark/python/bench_hash_memo.py"""
+import functools
+import hashlib
+import os
+import sys
+import timeit
+from unittest.mock import patch
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+from uc3m_money.transfer_request import TransferRequest
+from uc3m_money.account_deposit import AccountDeposit
+
+REPEAT = 20000
+
+
+class UnmemoizedTransferRequest(TransferRequest):  # pylint: disable=too-few-public-methods
+    """TransferRequest with the transfer code computed on every access, as before"""
+
+    @property
+    def transfer_code(self):
+        """Returns the MD5 signature (transfer code)"""
+        return hashlib.md5(str(self).encode()).hexdigest()
+
+
+class UnmemoizedAccountDeposit(AccountDeposit):  # pylint: disable=too-few-public-methods
+    """AccountDeposit with the signature computed on every access, as before"""
+
+    @property
+    def deposit_signature(self):
+        """Returns the sha256 signature of the deposit details"""
+        # pylint: disable=protected-access,no-member
+        return hashlib.sha256(self._AccountDeposit__signature_string().encode()).hexdigest()
+
+
+def transfer_request_cycle(transfer_class=TransferRequest):
+    """Property accesses done for one stored transfer: duplicate check, to_json and result"""
+    transfer = transfer_class("ES9121000418450200051332", "ORDINARY",
+                              "ES7921000813610123456789", "monthly rent payment",
+                              "01/01/2030", 100.0)
+    _ = transfer.transfer_code
+    transfer.to_json()
+    return transfer.transfer_code
+
+
+def deposit_request_cycle(deposit_class=AccountDeposit):
+    """Property accesses done for one stored deposit: to_json and result"""
+    deposit = deposit_class("ES7921000813610123456789", 500.0)
+    deposit.to_json()
+    return deposit.deposit_signature
+
+
+def count_hashes(function, algorithm: str) -> int:
+    """Returns how many times ``hashlib.<algorithm>`` is called by ``function``"""
+    original = getattr(hashlib, algorithm)
+    with patch.object(hashlib, algorithm, side_effect=original) as counter:
+        function()
+    return counter.call_count
+
+
+def main():
+    """Prints the hash computations per request and the time per request, before
+    and after the memoization"""
+    cases = (("transfer", transfer_request_cycle, UnmemoizedTransferRequest,
+              TransferRequest, "md5"),
+             ("deposit", deposit_request_cycle, UnmemoizedAccountDeposit,
+              AccountDeposit, "sha256"))
+    for name, cycle, before_class, after_class, algorithm in cases:
+        for label, request_class in (("unmemoized", before_class), ("memoized", after_class)):
+            function = functools.partial(cycle, request_class)
+            hashes = count_hashes(function, algorithm)
+            seconds = timeit.timeit(function, number=REPEAT)
+            print(f"{name} {label:>10}: {hashes} {algorithm} computation(s) per request, "
+                  f"{seconds / REPEAT * 1e6:.2f} us per request")
+
+
+if __name__ == "__main__":
+    main()
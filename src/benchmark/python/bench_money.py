@@ -0,0 +1,123 @@
+"""Benchmark of the exact integer cents arithmetic against the float path.
+
+Aggregates synthetic movements per IBAN the way aggregate_movements used to
+(float) and the way the balance ledger does now (integer cents), both on the
+raw amount strings and end to end from an all_transactions.json file.
+Run with: python src/benchmark/python/bench_money.py --rows 10000000"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+from uc3m_money.money import parse_cents
+from uc3m_money.balance_ledger import BalanceLedger
+
+ACCOUNTS = 1000
+# Movements generated at a time, so 10M rows do not need to be held in memory
+BLOCK = 100000
+
+
+def movements(rows: int, seed: int = 22):
+    """Yields synthetic movements like the ones in all_transactions.json"""
+    generator = random.Random(seed)
+    ibans = [f"ES{generator.randrange(10 ** 22):022d}" for _ in range(ACCOUNTS)]
+    for _ in range(rows):
+        cents = generator.randrange(1, 1000000)
+        sign = generator.choice("+-")
+        yield {"IBAN": generator.choice(ibans), "amount": f"{sign}{cents // 100}.{cents % 100:02d}"}
+
+
+def blocks(rows: int):
+    """Yields the movements in lists of BLOCK rows"""
+    block = []
+    for movement in movements(rows):
+        block.append(movement)
+        if len(block) == BLOCK:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def float_sums(rows: int):
+    """Per IBAN float sums, as aggregate_movements did; returns (sums, seconds)"""
+    sums = {}
+    elapsed = 0.0
+    for block in blocks(rows):
+        start = time.perf_counter()
+        for key in block:
+            iban = key["IBAN"]
+            sums[iban] = sums.get(iban, 0) + float(key["amount"])
+        elapsed += time.perf_counter() - start
+    return sums, elapsed
+
+
+def cents_sums(rows: int):
+    """Per IBAN integer cents sums, as the ledger does; returns (sums, seconds)"""
+    sums = {}
+    elapsed = 0.0
+    for block in blocks(rows):
+        start = time.perf_counter()
+        for key in block:
+            iban = key["IBAN"]
+            sums[iban] = sums.get(iban, 0) + parse_cents(key["amount"])
+        elapsed += time.perf_counter() - start
+    return sums, elapsed
+
+
+def end_to_end(rows: int):
+    """Times json.load plus float sums against the streaming ledger on one file"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "all_transactions.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(list(movements(rows)), f, indent=4)  # type: ignore
+
+        start = time.perf_counter()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        sums = {}
+        for key in data:
+            iban = key["IBAN"]
+            sums[iban] = sums.get(iban, 0) + float(key["amount"])
+        float_seconds = time.perf_counter() - start
+        del data
+
+        start = time.perf_counter()
+        BalanceLedger(path).balances()
+        ledger_seconds = time.perf_counter() - start
+    return float_seconds, ledger_seconds
+
+
+def main():
+    """Prints the timings and the float drift of every path"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--file-rows", type=int, default=200000,
+                        help="rows of the end to end file benchmark (0 to skip)")
+    args = parser.parse_args()
+
+    floats, float_seconds = float_sums(args.rows)
+    cents, cents_seconds = cents_sums(args.rows)
+    drifted = sum(1 for iban, total in cents.items() if round(floats[iban] * 100) != total
+                  or floats[iban] != total / 100)
+    print(f"rows: {args.rows}")
+    print(f"float sums: {float_seconds:.3f} s ({args.rows / float_seconds:,.0f} rows/s)")
+    print(f"cents sums: {cents_seconds:.3f} s ({args.rows / cents_seconds:,.0f} rows/s)")
+    print(f"accounts whose float balance drifted from the exact one: {drifted}/{len(cents)}")
+    if args.file_rows:
+        float_seconds, ledger_seconds = end_to_end(args.file_rows)
+        print(f"file of {args.file_rows} rows: json.load + float sums {float_seconds:.3f} s, "
+              f"streaming ledger (cents) {ledger_seconds:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
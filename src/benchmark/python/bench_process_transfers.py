@@ -0,0 +1,70 @@
+"""Benchmark of process_transfers with a growing number of worker processes.
+
+Times a batch of transfers given to process_transfers with each number of
+workers, on an empty store, and prints the throughput and the speedup over a
+single worker. The validation and the transfer codes are spread over the
+workers, the duplicate checks and the commit stay in one process, so the
+speedup is bounded by the share of the time spent in that serial part.
+Run with:
+    python src/benchmark/python/bench_process_transfers.py --transfers 100000 --workers 1 2 4 8"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+# pylint: disable=duplicate-code
+from uc3m_money.transfer_request import process_transfers
+from uc3m_money.transfer_journal import close_journals
+from uc3m_money.parallel import default_workers
+
+
+def make_requests(transfers: int) -> list:
+    """Valid transfer requests, all of them different"""
+    transfer_date = (date.today() + timedelta(days=30)).strftime("%d/%m/%Y")
+    return [{"from_iban": "ES9121000418450200051332", "to_iban": "ES7921000813610123456789",
+             "concept": f"monthly rent {number}", "transfer_type": "ORDINARY",
+             "date": transfer_date, "amount": f"{10 + number % 9990}.{number % 100:02d}"}
+            for number in range(transfers)]
+
+
+def run(requests: list, workers: int) -> float:
+    """Transfers per second with ``workers`` processes"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        nested_dir = os.path.join(temp_dir, "level1", "level2")
+        os.makedirs(nested_dir)
+        with patch("uc3m_money.transfer_request.__file__",
+                   os.path.join(nested_dir, "dummy_module.py")):
+            start = time.perf_counter()
+            process_transfers(requests, workers)
+            elapsed = time.perf_counter() - start
+            close_journals()
+        return len(requests) / elapsed
+
+
+def main():
+    """Prints the throughput and speedup for every number of workers"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transfers", type=int, default=50000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    requests = make_requests(args.transfers)
+    print(f"available cores: {default_workers()}")
+    print(f"{'workers':>8} {'throughput':>16} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        throughput = run(requests, workers)
+        baseline = baseline or throughput
+        print(f"{workers:>8} {throughput:>12,.0f} /s {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
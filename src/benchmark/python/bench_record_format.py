@@ -0,0 +1,62 @@
+"""Benchmark of the output formats of the store files.
+
+Encodes and decodes the same synthetic deposits in the indent=4 layout the stores
+used to be written in and in every output format of record_format, and prints the
+size of the file and the time to write and read it whole.
+Run with: python src/benchmark/python/bench_record_format.py --records 100000"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+from uc3m_money import record_format
+
+
+def make_deposits(records: int) -> list:
+    """Deposits shaped like the ones deposit_into_account stores"""
+    generator = random.Random(23)
+    return [{"alg": "SHA-256", "type": "DEPOSIT",
+             "to_iban": f"ES{generator.randrange(100):02d}{generator.randrange(10 ** 20):020d}",
+             "deposit_amount": generator.randrange(1000, 1000001) / 100,
+             "deposit_date": 1742774400.0 + number, "deposit_signature": f"{number:064x}"}
+            for number in range(records)]
+
+
+def timed(function, argument):
+    """Result of ``function(argument)`` and the best time of three calls in seconds"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        result = function(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    """Prints the size, write time and read time of every format"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+    deposits = make_deposits(args.records)
+    formats = [("indent=4", lambda records: json.dumps(records, indent=4).encode("utf-8"))]
+    formats += [(name, lambda records, name=name: record_format.encode(records, name))
+                for name in record_format.FORMATS]
+    print(f"{'format':>10} {'MB':>8} {'write s':>8} {'read s':>8}")
+    for name, encode in formats:
+        data, write_seconds = timed(encode, deposits)
+        decoded, read_seconds = timed(record_format.decode, data)
+        assert decoded == deposits
+        print(f"{name:>10} {len(data) / 1e6:>8.2f} {write_seconds:>8.3f} {read_seconds:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark of the memory taken by TransferRequest and AccountDeposit objects.
+
+Builds a batch of records with the slotted classes and with replicas of the
+previous classes (the same attributes in an instance __dict__), and prints the
+bytes per record measured with tracemalloc. The field values are shared by
+every record, so the figures are the cost of the objects themselves, the time
+stamp and the cached code or signature.
+Run with: python src/benchmark/python/bench_record_memory.py --records 100000"""
+import argparse
+import hashlib
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+from uc3m_money.transfer_request import TransferRequest
+from uc3m_money.account_deposit import AccountDeposit
+
+FROM_IBAN = "ES9121000418450200051332"
+TO_IBAN = "ES7921000813610123456789"
+
+
+class DictTransferRequest:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """The attributes of TransferRequest before it had slots"""
+    # pylint: disable=too-many-arguments,too-many-positional-arguments,unused-private-member
+    def __init__(self, from_iban, transfer_type, to_iban, transfer_concept,
+                 transfer_date, transfer_amount):
+        self.__from_iban = from_iban
+        self.__to_iban = to_iban
+        self.__transfer_type = transfer_type
+        self.__transfer_concept = transfer_concept
+        self.__transfer_date = transfer_date
+        self.__transfer_amount = transfer_amount
+        self.__time_stamp = datetime.timestamp(datetime.now(timezone.utc))
+        self.__transfer_code = hashlib.md5(str(vars(self)).encode()).hexdigest()
+
+    @property
+    def transfer_code(self):
+        """MD5 transfer code"""
+        return self.__transfer_code
+
+
+class DictAccountDeposit:  # pylint: disable=too-few-public-methods
+    """The attributes of AccountDeposit before it had slots"""
+    # pylint: disable=unused-private-member
+    def __init__(self, to_iban, deposit_amount):
+        self.__alg = "SHA-256"
+        self.__type = "DEPOSIT"
+        self.__to_iban = to_iban
+        self.__deposit_amount = deposit_amount
+        self.__deposit_date = datetime.timestamp(datetime.now(timezone.utc))
+        self.__deposit_signature = hashlib.sha256(str(vars(self)).encode()).hexdigest()
+
+    @property
+    def deposit_signature(self):
+        """SHA-256 deposit signature"""
+        return self.__deposit_signature
+
+
+def bytes_per_record(build, records: int) -> float:
+    """Bytes allocated per record to keep ``records`` records built by ``build``"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    batch = [build() for _ in range(records)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del batch
+    return allocated / records
+
+
+def new_transfer() -> TransferRequest:
+    """A slotted transfer with its code computed"""
+    transfer = TransferRequest(FROM_IBAN, "ORDINARY", TO_IBAN, "monthly rent payment",
+                               "01/01/2030", 500.0)
+    _ = transfer.transfer_code
+    return transfer
+
+
+def new_deposit() -> AccountDeposit:
+    """A slotted deposit with its signature computed"""
+    deposit = AccountDeposit(TO_IBAN, 500.0)
+    _ = deposit.deposit_signature
+    return deposit
+
+
+def main():
+    """Prints the bytes per record of both layouts"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+    cases = [("TransferRequest", new_transfer,
+              lambda: DictTransferRequest(FROM_IBAN, "ORDINARY", TO_IBAN, "monthly rent payment",
+                                          "01/01/2030", 500.0)),
+             ("AccountDeposit", new_deposit, lambda: DictAccountDeposit(TO_IBAN, 500.0))]
+    print(f"{'record':>16} {'__dict__':>12} {'__slots__':>12} {'saved':>7}")
+    for name, new, old in cases:
+        old_bytes = bytes_per_record(old, args.records)
+        new_bytes = bytes_per_record(new, args.records)
+        print(f"{name:>16} {old_bytes:>8.0f} B {new_bytes:>8.0f} B "
+              f"{1 - new_bytes / old_bytes:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Benchmark suite of the three entry points on synthetic stores.
+
+For every store size, generates a temporary data directory with that many stored
+transfers (the journal), deposits (deposits.json) and movements
+(all_transactions.json), then times calls of process_transfer,
+deposit_into_account and store_new_balance against it. Every operation gets one
+untimed first call (which opens the journal, builds the balance ledger...),
+reported apart, before the timed calls. The latencies and throughputs are
+printed and written as JSON, so the runs of different commits can be compared
+with --compare.
+Run with:
+    python src/benchmark/python/bench_suite.py --sizes 1000 100000 1000000 --calls 50
+or as the PyBuilder task: pyb benchmark"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(current_dir, "..", "..", ".."))
+project_src = os.path.join(project_root, "src", "main", "python")
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+from uc3m_money.transfer_request import process_transfer
+from uc3m_money.account_deposit import deposit_into_account
+from uc3m_money.account_balance import store_new_balance
+from uc3m_money.transfer_journal import close_journals
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+DEFAULT_CALLS = 50
+ACCOUNTS = 1000
+# The modules find the data files from their __file__, two or three levels up
+PATCHED_MODULES = ["uc3m_money.transfer_request", "uc3m_money.account_deposit",
+                   "uc3m_money.account_balance"]
+
+
+def iban(number: int) -> str:
+    """Spanish IBAN with valid check digits for a 20 digit BBAN"""
+    bban = f"{number:020d}"
+    check_digits = 98 - (int(bban) * 10 ** 6 + 142800) % 97
+    return f"ES{check_digits:02d}{bban}"
+
+
+def generate_store(directory: str, records: int, seed: int = 20):
+    """Writes ``records`` stored transfers, deposits and movements to ``directory``"""
+    generator = random.Random(seed)
+    accounts = [iban(generator.randrange(10 ** 20)) for _ in range(min(ACCOUNTS, records))]
+    time_stamp = datetime.now(timezone.utc).timestamp() - records
+    with open(os.path.join(directory, "stored_transactions.jsonl"), "w", encoding="utf-8") as f:
+        for number in range(records):
+            f.write(json.dumps({
+                "from_iban": generator.choice(accounts), "to_iban": generator.choice(accounts),
+                "transfer_type": "ORDINARY",
+                "transfer_amount": generator.randrange(1000, 1000001) / 100,
+                "transfer_concept": f"synthetic transfer {number}",
+                # Spread over three years, as the month partitions of a real store
+                "transfer_date": f"15/{number % 12 + 1:02d}/{2024 + number % 36 // 12}",
+                "time_stamp": time_stamp + number, "transfer_code": f"{number:032x}"},
+                separators=(",", ":")) + "\n")
+    deposits = [{"alg": "SHA-256", "type": "DEPOSIT", "to_iban": generator.choice(accounts),
+                 "deposit_amount": generator.randrange(1000, 1000001) / 100,
+                 "deposit_date": time_stamp + number, "deposit_signature": f"{number:064x}"}
+                for number in range(records)]
+    with open(os.path.join(directory, "deposits.json"), "w", encoding="utf-8") as f:
+        json.dump(deposits, f, indent=4)  # type: ignore
+    del deposits
+    # Every account has movements, its balance can be stored
+    movements = [{"IBAN": accounts[number % len(accounts)],
+                  "amount": f"{generator.choice('+-')}{generator.randrange(1, 1000000) / 100:.2f}"}
+                 for number in range(records)]
+    with open(os.path.join(directory, "all_transactions.json"), "w", encoding="utf-8") as f:
+        json.dump(movements, f, indent=4)  # type: ignore
+    with open(os.path.join(directory, "account_balances.json"), "w", encoding="utf-8") as f:
+        f.write("[]")
+    return accounts
+
+
+def measure(operation, calls: int) -> dict:
+    """Latency percentiles and throughput of ``calls`` calls of ``operation(number)``"""
+    start = time.perf_counter()
+    operation(0)
+    first_call = time.perf_counter() - start
+    latencies = []
+    for number in range(1, calls + 1):
+        start = time.perf_counter()
+        operation(number)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    def percentile(fraction: float) -> float:
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+    return {"calls": calls, "first_call_ms": first_call * 1000,
+            "mean_ms": sum(latencies) / len(latencies) * 1000, "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95), "p99_ms": percentile(0.99),
+            "max_ms": latencies[-1] * 1000, "throughput_per_s": len(latencies) / sum(latencies)}
+
+
+def make_operations(accounts: list, input_file: str) -> dict:
+    """The timed call of every entry point, taking the number of the call"""
+    count = len(accounts)
+    transfer_date = (date.today() + timedelta(days=30)).strftime("%d/%m/%Y")
+    return {
+        "process_transfer": lambda number: process_transfer(
+            accounts[number % count], accounts[(number + 1) % count],
+            f"bench transfer {number}", "ORDINARY", transfer_date, "250.00"),
+        "deposit_into_account": lambda number: deposit_into_account(input_file),
+        "store_new_balance": lambda number: store_new_balance(accounts[number % count])}
+
+
+def run_size(records: int, calls: int) -> list:
+    """Results of the three entry points on a store of ``records`` records"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        nested_dir = os.path.join(temp_dir, "level1", "level2")
+        os.makedirs(nested_dir)
+        accounts = generate_store(temp_dir, records)
+        input_file = os.path.join(temp_dir, "deposit_request.json")
+        with open(input_file, "w", encoding="utf-8") as f:
+            json.dump({"IBAN": accounts[0], "AMOUNT": "EUR 500.00"}, f)  # type: ignore
+        patchers = [patch(module + ".__file__", os.path.join(nested_dir, "dummy_module.py"))
+                    for module in PATCHED_MODULES]
+        for patcher in patchers:
+            patcher.start()
+        results = []
+        try:
+            for name, operation in make_operations(accounts, input_file).items():
+                result = measure(operation, calls)
+                results.append({"operation": name, "store_records": records, **result})
+        finally:
+            close_journals()
+            for patcher in patchers:
+                patcher.stop()
+        return results
+
+
+def current_commit():
+    """Commit being benchmarked, None outside a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: list, baseline: list = None):
+    """Prints a row per operation and store size, with the throughput ratio to the
+    same row of ``baseline`` when given"""
+    previous = {(row["operation"], row["store_records"]): row for row in baseline or []}
+    print(f"{'operation':>22} {'records':>9} {'first ms':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'ops/s':>9}" + (f" {'vs base':>8}" if baseline else ""))
+    for row in results:
+        line = (f"{row['operation']:>22} {row['store_records']:>9} {row['first_call_ms']:>9.1f} "
+                f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+                f"{row['throughput_per_s']:>9.1f}")
+        old = previous.get((row["operation"], row["store_records"]))
+        if old is not None:
+            line += f" {row['throughput_per_s'] / old['throughput_per_s']:>7.2f}x"
+        print(line)
+
+
+def main(argv=None):
+    """Runs the suite, prints the results and writes them as JSON"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--calls", type=int, default=DEFAULT_CALLS)
+    parser.add_argument("--output", help="JSON file for the results "
+                        "(default: <output-dir>/bench-<commit>-<time>.json)")
+    parser.add_argument("--output-dir", default=os.path.join(project_root, "target", "benchmarks"))
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    args = parser.parse_args(argv)
+    commit = current_commit()
+    report = {"commit": commit, "created": datetime.now(timezone.utc).isoformat(),
+              "python": platform.python_version(), "platform": platform.platform(),
+              "calls": args.calls, "results": []}
+    for records in args.sizes:
+        report["results"].extend(run_size(records, args.calls))
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_results(report["results"], baseline)
+    output = args.output or os.path.join(
+        args.output_dir, f"bench-{commit or 'unknown'}-{time.strftime('%Y%m%d%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)  # type: ignore
+    print(f"results written to {output}")
+    return output
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark of the validation parsers against the code they replace.
+
+Times, per call and on realistic inputs, the checks as process_transfer and
+AccountDeposit did them before the validation module against the ones that
+replaced them: datetime.strptime against validation.parse_date, the split,
+isdigit and float() amount checks against validation.parse_transfer_amount, the
+str().split(".") decimals check against validation.float_cents, and the format
+only IBAN check against validation.valid_iban (uncached and cached), which also
+checks the mod 97 check digits.
+Run with: python src/benchmark/python/bench_validation.py --calls 200000"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, date, timedelta
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+from uc3m_money.validation import parse_date, parse_transfer_amount, float_cents, valid_iban
+from uc3m_money.validation import _valid_iban_text  # pylint: disable=protected-access
+
+
+def old_date(text: str):
+    """The date check process_transfer used to do"""
+    return datetime.strptime(text, "%d/%m/%Y").date()
+
+
+def old_transfer_amount(amount: str) -> float:
+    """The amount checks process_transfer used to do, up to the range check"""
+    normalized_amount = amount.replace(",", "")
+    if normalized_amount.count('.') != 1:
+        raise ValueError(amount)
+    integer_part, decimal_part = normalized_amount.split('.')
+    if not (integer_part.isdigit() and decimal_part.isdigit() and len(decimal_part) == 2):
+        raise ValueError(amount)
+    return float(normalized_amount)
+
+
+def old_deposit_decimals(deposit_amount: float):
+    """The decimals check AccountDeposit used to do"""
+    if len(str(deposit_amount).split(".")[1]) > 2:
+        raise ValueError(deposit_amount)
+
+
+def old_iban(iban: str) -> bool:
+    """The IBAN check of process_transfer and AccountManager, without check digits"""
+    return iban.startswith("ES") and (len(iban) == 24) and iban[2:].isdigit()
+
+
+def per_call(function, inputs: list) -> float:
+    """Nanoseconds per call of ``function`` over ``inputs``"""
+    def loop():
+        for value in inputs:
+            function(value)
+    return min(timeit.repeat(loop, number=1, repeat=3)) / len(inputs) * 1e9
+
+
+def make_cases(calls: int) -> list:
+    """(name, old check, new check, inputs) for every check"""
+    generator = random.Random(17)
+    today = date.today()
+    # Transfers are dated within the next few months
+    dates = [(today + timedelta(days=generator.randrange(120))).strftime("%d/%m/%Y")
+             for _ in range(calls)]
+    amounts = [f"{generator.randrange(10, 10001):,}.{generator.randrange(100):02d}"
+               for _ in range(calls)]
+    floats = [generator.randrange(1000, 1000001) / 100 for _ in range(calls)]
+    # A thousand accounts doing every request, the way the stored transfers look
+    accounts = [f"ES{generator.randrange(100):02d}{generator.randrange(10 ** 20):020d}"
+                for _ in range(1000)]
+    ibans = [generator.choice(accounts) for _ in range(calls)]
+    return [("date", old_date, parse_date, dates),
+            ("transfer amount", old_transfer_amount, parse_transfer_amount, amounts),
+            ("deposit decimals", old_deposit_decimals, float_cents, floats),
+            ("iban, uncached", old_iban, _valid_iban_text.__wrapped__, ibans),
+            ("iban, cached", old_iban, valid_iban, ibans)]
+
+
+def main():
+    """Prints the time per call of the old and new checks"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+    cases = make_cases(args.calls)
+    print(f"{'check':>18} {'old':>10} {'new':>10} {'speedup':>8}")
+    for name, old, new, inputs in cases:
+        old_ns = per_call(old, inputs)
+        new_ns = per_call(new, inputs)
+        print(f"{name:>18} {old_ns:>7.0f} ns {new_ns:>7.0f} ns {old_ns / new_ns:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark of deposit_into_account with and without the write-behind queue.
+
+For deposits.json files already holding a growing number of deposits, times a
+run of deposits stored one by one (a rewrite of the file per deposit) against
+the same run queued in write-behind mode and flushed at the end.
+Run with:
+    python src/benchmark/python/bench_write_behind.py --deposits 200 --sizes 0 1000 10000 50000"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_src = os.path.abspath(os.path.join(current_dir, "..", "..", "main", "python"))
+if project_src not in sys.path:
+    sys.path.insert(0, project_src)
+
+# pylint: disable=import-error,wrong-import-position
+from uc3m_money.account_deposit import (deposit_into_account, enable_write_behind,
+                                        disable_write_behind)
+
+IBAN = "ES7921000813610123456789"
+
+
+def run(stored: int, deposits: int, write_behind: bool) -> float:
+    """Deposits per second on a deposits.json that already has ``stored`` deposits"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        nested_dir = os.path.join(temp_dir, "level1", "level2")
+        os.makedirs(nested_dir)
+        existing = [{"alg": "SHA-256", "type": "DEPOSIT", "to_iban": IBAN,
+                     "deposit_amount": 500.0, "deposit_date": 1742846943.840017 + number,
+                     "deposit_signature": f"{number:064x}"} for number in range(stored)]
+        with open(os.path.join(temp_dir, "deposits.json"), "w", encoding="utf-8") as f:
+            json.dump(existing, f, indent=4)  # type: ignore
+        input_file = os.path.join(temp_dir, "input.json")
+        with open(input_file, "w", encoding="utf-8") as f:
+            json.dump({"IBAN": IBAN, "AMOUNT": "EUR 500.00"}, f)  # type: ignore
+
+        with patch("uc3m_money.account_deposit.__file__",
+                   os.path.join(nested_dir, "dummy_module.py")):
+            if write_behind:
+                enable_write_behind()
+            start = time.perf_counter()
+            for _ in range(deposits):
+                deposit_into_account(input_file)
+            disable_write_behind()
+            return deposits / (time.perf_counter() - start)
+
+
+def main():
+    """Prints the deposit throughput of both modes for every file size"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--deposits", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 1000, 10000])
+    args = parser.parse_args()
+    print(f"{'stored deposits':>16} {'one by one':>14} {'write-behind':>14}")
+    for stored in args.sizes:
+        direct = run(stored, args.deposits, write_behind=False)
+        queued = run(stored, args.deposits, write_behind=True)
+        print(f"{stored:>16} {direct:>10,.0f} /s {queued:>10,.0f} /s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,19 @@
 """Module for function 3 where we receive an incoming json file with transactions, and
 we must verify the validity of IBAN, if we have it and then create the new balance."""
 
-import json
 import os
+import time
 from datetime import date
 # pylint: disable=import-error
 from uc3m_money.transfer_request import valid_iban
+from uc3m_money.balance_ledger import get_ledger
+from uc3m_money.record_format import iter_records
+from uc3m_money.json_array_store import (append_to_json_array, write_json_array,
+                                         load_json_array_to_update)
+from uc3m_money.money import cents_to_float
+from uc3m_money.storage_backend import get_backend
+from uc3m_money.file_lock import file_lock
+from uc3m_money import metrics
 
 
 # Steps to take:
@@ -33,15 +41,26 @@ def in_json_file_check(iban:str) -> bool:
     if os.path.exists(path) is not True:
         raise AccountManagementException(f"AllTransactions file not found at: {absolute_path}")
 
-    with open(path, "r", encoding="utf-8") as file:
-        data = json.load(file)
-
-# We iterate through our file to check if there is
-# at least an instance of the iban
-    for key in data:
-        if key["IBAN"] == iban:
-            return True
-    return False
+# With a storage backend the movements are loaded into it and looked up there
+    backend = get_backend()
+    if backend is not None:
+        backend.refresh_transactions(path)
+        return backend.has_movements(iban)
+
+# If the ledger is up to date it knows every iban with movements in the file
+    ledger = get_ledger(path)
+    if ledger.is_current():
+        return iban in ledger
+
+# If not, we go through the file only until we find the iban
+    rows = 0
+    try:
+        for rows, key in enumerate(iter_records(path), 1):
+            if key["IBAN"] == iban:
+                return True
+        return False
+    finally:
+        metrics.count("rows_scanned", path, rows)
 
 def correct_iban(iban: str):
     """Here we do steps 1 and 2."""
@@ -52,23 +71,38 @@ def correct_iban(iban: str):
 
 def aggregate_movements(iban: str) -> float:
     """Here we do step 3."""
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "all_transactions.json")
 
-    correct_iban(iban)
+# We bring the ledger up to date first, so that checking the iban
+# and adding its movements take a single pass through the file
+    backend = get_backend()
+    if backend is None and valid_iban(iban) and os.path.exists(path):
+        with metrics.timer("balance", "aggregate"):
+            get_ledger(path).refresh()
+
+    with metrics.timer("balance", "validate"):
+        correct_iban(iban)
+    with metrics.timer("balance", "aggregate"):
+        if backend is not None:
+            return cents_to_float(backend.balance_cents(iban))
+
+# The ledger keeps the running balance of every iban, so we
+# do not need to go through the file again
+        return get_ledger(path).balance(iban)
+
+def store_new_balance(iban: str, upsert: bool = False) -> bool:
+    """Here we do step 4.
+    The new balance is appended to account_balances.json without rewriting it.
+    With upsert, the latest balance already stored for the iban and today's date
+    is replaced instead of adding another one."""
+    snapshot = new_balance_snapshot(iban)
+    with metrics.timer("balance", "write"):
+        store_balance_snapshots([snapshot], upsert)
+    return True
 
-    path = os.path.join(os.path.dirname(__file__), "..", "..", "all_transactions.json")
-    with open(path, "r", encoding="utf-8") as file:
-        data = json.load(file)
-
-# We iterate through our file to check if it is
-# our iban, and we add the balance
-    amount = 0
-    for key in data:
-        if key["IBAN"] == iban:
-            amount = amount + float(key["amount"])
-    return amount
-
-def store_new_balance(iban: str) -> bool:
-    """Here we do step 4."""
+def new_balance_snapshot(iban: str) -> dict:
+    """Here we do step 4 without storing the snapshot, which
+    store_balance_snapshots does (maybe together with other ones)."""
     balance = aggregate_movements(iban)
     path = os.path.join(os.path.dirname(__file__), "..", "..", "account_balances.json")
 
@@ -77,21 +111,86 @@ def store_new_balance(iban: str) -> bool:
 #        2. The total amount(balance)
 #        3. Current date stamp
 
-    if os.path.exists(path) is not True:
+# A storage backend keeps the balances itself, so the file is only needed without one
+    if get_backend() is None and os.path.exists(path) is not True:
         raise AccountManagementException("JsonFile to store balances doesn't exist")
 
-    new_account_balance = {
+    return {
         "iban": iban,
         "amount": balance,
         "date": date.today().isoformat()
     }
 
-    with open(path, "r", encoding="utf-8") as file:
-        data = json.load(file)
+def store_balance_snapshots(snapshots: list, upsert: bool = False):
+    """Stores balance snapshots made by new_balance_snapshot with one write."""
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "account_balances.json")
+    _store_snapshots(path, snapshots, upsert)
 
-    data.append(new_account_balance)
+def store_all_balances(upsert: bool = False) -> dict:
+    """Here we do step 4 for every iban in all_transactions.json at once.
+    The transactions file is read once and all the balances are written in
+    one go. Returns a report with the row counts and the time it took."""
+    start = time.perf_counter()
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "all_transactions.json")
+    if os.path.exists(path) is not True:
+        absolute_path = os.path.abspath(path)
+        raise AccountManagementException(f"AllTransactions file not found at: {absolute_path}")
+    backend = get_backend()
+    if backend is not None:
+        backend.refresh_transactions(path)
+        balances = {iban: cents_to_float(cents)
+                    for iban, cents in backend.balances_cents().items()}
+        rows = backend.movement_count()
+    else:
+        ledger = get_ledger(path)
+        balances = ledger.balances()
+        rows = ledger.rows
+
+    balances_path = os.path.join(os.path.dirname(__file__), "..", "..", "account_balances.json")
+    if backend is None and os.path.exists(balances_path) is not True:
+        raise AccountManagementException("JsonFile to store balances doesn't exist")
 
-    with open(path, "w", encoding="utf-8") as file:
-        json.dump(data, file, indent=4) #type: ignore
+    today = date.today().isoformat()
+    new_account_balances = [{"iban": iban, "amount": amount, "date": today}
+                            for iban, amount in balances.items()]
+    _store_snapshots(balances_path, new_account_balances, upsert)
 
-    return True
+    return {
+        "transactions": rows,
+        "accounts": len(new_account_balances),
+        "seconds": time.perf_counter() - start
+    }
+
+def _store_snapshots(path: str, snapshots: list, upsert: bool):
+    """Appends the snapshots to account_balances.json. With upsert, a snapshot
+    replaces the latest one stored for its iban and date. With a storage backend
+    they are stored there instead."""
+    backend = get_backend()
+    if backend is not None:
+        backend.add_balances(snapshots, upsert)
+        return
+# The file is locked so that snapshots stored at the same time by other
+# processes are not lost
+    with file_lock(path):
+        if upsert:
+            data = load_json_array_to_update(path)
+            latest = {}
+            for position, snapshot in enumerate(data):
+                latest[(snapshot["iban"], snapshot["date"])] = position
+            stored = len(data)
+            replaced = False
+            for snapshot in snapshots:
+                key = (snapshot["iban"], snapshot["date"])
+                position = latest.get(key)
+                if position is None:
+                    latest[key] = len(data)
+                    data.append(snapshot)
+                else:
+                    data[position] = snapshot
+                    replaced = True
+            if replaced:
+                write_json_array(path, data)
+                return
+            snapshots = data[stored:]
+
+        append_to_json_array(path, snapshots)
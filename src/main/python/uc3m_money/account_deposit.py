@@ -7,10 +7,24 @@ from datetime import datetime, timezone
 # pylint: disable=import-error
 from uc3m_money.account_manager import AccountManager
 from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.validation import float_cents
+from uc3m_money.money import parse_cents, cents_to_float
+from uc3m_money.storage_backend import get_backend
+from uc3m_money.file_lock import file_lock
+from uc3m_money.json_array_store import (write_json_array, append_in_place,
+                                         load_json_array_to_update)
+from uc3m_money.write_behind import WriteBehindQueue, DEFAULT_BATCH_SIZE, DEFAULT_INTERVAL_MS
+from uc3m_money.parallel import map_chunks
+from uc3m_money import metrics
 
 
 class AccountDeposit:
     """Class representing a deposit request."""
+    # Slots instead of an instance __dict__, batches keep many of them in memory
+    __slots__ = ("__to_iban", "__deposit_amount", "__deposit_date", "__deposit_signature")
+    # The same for every deposit
+    __alg = "SHA-256"
+    __type = "DEPOSIT"
 
     def __init__(self, to_iban: str, deposit_amount):
         # First validate the IBAN format
@@ -34,17 +48,19 @@ class AccountDeposit:
             raise AccountManagementException("Amount must be <= 10000.00")
 
         # Check for decimal places (limit to 2 decimal places)
-        if len(str(deposit_amount).split(".")[1]) > 2:
-            raise AccountManagementException("Amount format invalid, must have two decimal places")
+        try:
+            float_cents(deposit_amount)
+        except ValueError as exc:
+            raise AccountManagementException(
+                "Amount format invalid, must have two decimal places") from exc
 
         # Setting instance variables
-        self.__alg = "SHA-256"
-        self.__type = "DEPOSIT"
         self.__to_iban = to_iban
         self.__deposit_amount = deposit_amount
 
         justnow = datetime.now(timezone.utc)
         self.__deposit_date = datetime.timestamp(justnow)
+        self.__deposit_signature = None
 
     def to_json(self):
         """returns the object data in json format"""
@@ -65,8 +81,11 @@ class AccountDeposit:
 
     @property
     def deposit_signature(self):
-        """Returns the sha256 signature of the deposit details"""
-        return hashlib.sha256(self.__signature_string().encode()).hexdigest()
+        """Returns the sha256 signature of the deposit details, computed only once"""
+        if self.__deposit_signature is None:
+            self.__deposit_signature = hashlib.sha256(
+                self.__signature_string().encode()).hexdigest()
+        return self.__deposit_signature
 
 def deposit_into_account(input_file: str) -> str:
     """
@@ -82,18 +101,127 @@ def deposit_into_account(input_file: str) -> str:
     Raises:
         AccountManagementException: If any validation fails.
     """
+    deposit = read_deposit(input_file)
+    with metrics.timer("deposit", "hash"):
+        deposit_signature = deposit.deposit_signature
+    with metrics.timer("deposit", "write"):
+        queue = _WRITE_BEHIND[0]
+        if queue is not None:
+            # Stored later by the write-behind writer (see enable_write_behind)
+            queue.put(deposit.to_json())
+        else:
+            store_deposits([deposit])
+    return deposit_signature
+
+
+def read_deposit(input_file: str) -> AccountDeposit:
+    """
+    Reads and validates a deposit file (steps 1 to 6 of deposit_into_account)
+    without storing it.
 
+    Raises:
+        AccountManagementException: If any validation fails.
+    """
     # Step 1: Check if file exists
     if not os.path.exists(input_file):
         raise AccountManagementException("The data file is not found.")
 
     # Step 2: Try reading the JSON file
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except json.JSONDecodeError as exc:
-        raise AccountManagementException("The file is not in JSON format.") from exc
+    with metrics.timer("deposit", "read"):
+        try:
+            with open(input_file, 'r', encoding='utf-8') as f:
+                content = f.read()
+            data = json.loads(content)
+        except json.JSONDecodeError as exc:
+            raise AccountManagementException("The file is not in JSON format.") from exc
+        metrics.count("bytes_read", input_file, len(content))
+
+    with metrics.timer("deposit", "validate"):
+        return validate_deposit(data)
+
+
+def deposit_many_into_account(input_file: str, workers: int = None) -> list:
+    """
+    Reads a file with many deposit requests, either a JSON array or a JSON Lines
+    file (one {"IBAN": ..., "AMOUNT": ...} object per line), validates and signs
+    them in parallel and stores the valid ones with a single write.
+
+    Args:
+        input_file (str): Path to the input file.
+        workers (int): Worker processes used for the validation (default: the
+            available cores, 1 validates in this process).
+
+    Returns:
+        list: One result per request, in input order: the SHA-256 deposit
+        signature, or the AccountManagementException that deposit_into_account
+        would have raised for that request alone.
+
+    Raises:
+        AccountManagementException: If the file is not found or is not a JSON
+        array or a JSON Lines file.
+    """
+    requests = _read_deposit_requests(input_file)
+    results = map_chunks(_validate_deposits, requests, workers)
+    store_deposits([result for result in results if isinstance(result, AccountDeposit)])
+    return [result if isinstance(result, Exception) else result.deposit_signature
+            for result in results]
+
+
+def _read_deposit_requests(input_file: str) -> list:
+    """Returns the requests of a JSON array or JSON Lines file. A line of a JSON Lines
+    file that cannot be decoded is returned as its AccountManagementException."""
+    if not os.path.exists(input_file):
+        raise AccountManagementException("The data file is not found.")
+    with open(input_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if content.lstrip().startswith("["):
+        try:
+            requests = json.loads(content)
+        except json.JSONDecodeError as exc:
+            raise AccountManagementException("The file is not in JSON format.") from exc
+        if not isinstance(requests, list):
+            raise AccountManagementException("The file is not in JSON format.")
+        return requests
+    requests = []
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        try:
+            requests.append(json.loads(line))
+        except json.JSONDecodeError:
+            requests.append(AccountManagementException("The file is not in JSON format."))
+    return requests
+
+
+def _validate_deposits(requests: list) -> list:
+    """Validates and signs a chunk of requests (run in the worker processes)."""
+    results = []
+    for data in requests:
+        if isinstance(data, Exception):
+            results.append(data)
+            continue
+        try:
+            deposit = validate_deposit(data)
+            # Signed here, so the hashing is spread over the workers as well
+            _ = deposit.deposit_signature
+            results.append(deposit)
+        except AccountManagementException as exc:
+            results.append(exc)
+        except (AttributeError, TypeError):
+            # IBAN or AMOUNT are not strings
+            results.append(AccountManagementException(
+                "The JSON does not have the expected structure."))
+    return results
+
+
+def validate_deposit(data) -> AccountDeposit:
+    """
+    Validates a deposit request ({"IBAN": ..., "AMOUNT": "EUR ..."}) and creates
+    its AccountDeposit (steps 3 to 6 of deposit_into_account).
 
+    Raises:
+        AccountManagementException: If any validation fails.
+    """
     # Step 3: Validate JSON structure
     if not isinstance(data, dict) or "IBAN" not in data or "AMOUNT" not in data:
         raise AccountManagementException("The JSON does not have the expected structure.")
@@ -109,10 +237,16 @@ def deposit_into_account(input_file: str) -> str:
     if not amount_str.startswith("EUR "):
         raise AccountManagementException("Invalid currency format.")
 
+    # "EUR 500.00" and "EUR 1,000.00" are parsed straight into exact cents. Any
+    # other text goes through float() as it always did, so it gets the same errors
+    # in the same order (the range first, then the decimals in AccountDeposit)
     try:
-        amount = float(amount_str.split("EUR ")[1])
-    except ValueError as exc:
-        raise AccountManagementException("Invalid amount format") from exc
+        amount = cents_to_float(parse_cents(amount_str))
+    except ValueError:
+        try:
+            amount = float(amount_str.split("EUR ")[1])
+        except ValueError as exc:
+            raise AccountManagementException("Invalid amount format") from exc
 
     if amount > 10000.00:
         raise AccountManagementException("Amount must be <= 10000.00")
@@ -121,29 +255,81 @@ def deposit_into_account(input_file: str) -> str:
         raise AccountManagementException("Deposit amount must be greater than zero.")
 
     # Step 6: Create AccountDeposit instance
-    deposit = AccountDeposit(to_iban=iban, deposit_amount=amount)
+    return AccountDeposit(to_iban=iban, deposit_amount=amount)
 
-    # Step 7: Save the deposit data to a JSON file
-    base_dir = os.path.dirname(__file__)
-    deposit_json_path = os.path.join(base_dir,"..", "..", "deposits.json")
 
-    # Load existing deposits
-    if os.path.exists(deposit_json_path):
-        with open(deposit_json_path, 'r', encoding='utf-8') as f:
-            try:
-                deposits = json.load(f)
-                if not isinstance(deposits, list):
-                    deposits = []
-            except json.JSONDecodeError:
-                deposits = []
+def store_deposits(deposits: list):
+    """
+    Saves validated deposits with a single write (step 7 of deposit_into_account),
+    to the storage backend if one was selected or to deposits.json.
+    """
+    if not deposits:
+        return
+    records = [deposit.to_json() for deposit in deposits]
+    backend = get_backend()
+    if backend is not None:
+        backend.add_deposits(records)
     else:
-        deposits = []
+        _save_deposit_json(records)
+
+
+_WRITE_BEHIND = [None]
+
+
+def enable_write_behind(batch_size: int = DEFAULT_BATCH_SIZE,
+                        interval_ms: int = DEFAULT_INTERVAL_MS) -> WriteBehindQueue:
+    """
+    Makes deposit_into_account return as soon as the deposit is validated and
+    signed. The deposits are queued and a background writer stores them every
+    ``batch_size`` deposits or ``interval_ms`` milliseconds, appending them to
+    deposits.json in place, so storing a batch does not depend on the file size.
+    Use flush_deposits() to wait until they are stored; the queue is also
+    flushed at exit.
+    """
+    disable_write_behind()
+    _WRITE_BEHIND[0] = WriteBehindQueue(_store_queued_deposits, batch_size, interval_ms)
+    return _WRITE_BEHIND[0]
+
+
+def disable_write_behind():
+    """Stores the queued deposits and goes back to storing every deposit at once."""
+    queue, _WRITE_BEHIND[0] = _WRITE_BEHIND[0], None
+    if queue is not None:
+        queue.close()
+
+
+def flush_deposits():
+    """Waits until every queued deposit is stored (nothing to do without write-behind)."""
+    if _WRITE_BEHIND[0] is not None:
+        _WRITE_BEHIND[0].flush()
+
+
+def _store_queued_deposits(records: list):
+    """Stores a batch of the write-behind queue."""
+    backend = get_backend()
+    if backend is not None:
+        backend.add_deposits(records)
+        return
+    deposit_json_path = os.path.join(os.path.dirname(__file__), "..", "..", "deposits.json")
+    with file_lock(deposit_json_path):
+        if not append_in_place(deposit_json_path, records):
+            _save_deposit_json(records)
+
+
+def _save_deposit_json(records: list):
+    """Adds the deposit records to deposits.json. The file is locked while it is read and
+    written, so deposits made at the same time by other processes are not lost,
+    and it is replaced atomically, so a crash never leaves it truncated."""
+    base_dir = os.path.dirname(__file__)
+    deposit_json_path = os.path.join(base_dir,"..", "..", "deposits.json")
 
-    # Add the new deposit
-    deposits.append(deposit.to_json())
+    with file_lock(deposit_json_path):
+        # Load existing deposits, served from memory while the file is the one this
+        # process wrote last (a file that cannot be loaded is kept as deposits.json.corrupt)
+        deposits = load_json_array_to_update(deposit_json_path)
 
-    # Write back to the JSON file
-    with open(deposit_json_path, 'w', encoding='utf-8') as f:
-        json.dump(deposits, f, indent=4) #type: ignore
+        # Add the new deposits
+        deposits.extend(records)
 
-    return deposit.deposit_signature
+        # Write back to the JSON file
+        write_json_array(deposit_json_path, deposits)
@@ -1,4 +1,8 @@
 """Here we create the module to handle the account manager"""
+# pylint: disable=import-error
+from uc3m_money.validation import valid_iban
+
+
 class AccountManager:# pylint: disable=too-few-public-methods
     """Here we define our class for later use"""
     @staticmethod
@@ -8,6 +12,7 @@ class AccountManager:# pylint: disable=too-few-public-methods
         - Must start with 'ES'
         - Must be 24 characters long
         - The remaining characters after 'ES' must be digits
+        - The check digits must be right (mod 97)
 
         Args:
             iban (str): The IBAN string to be validated.
@@ -15,8 +20,5 @@ class AccountManager:# pylint: disable=too-few-public-methods
         Returns:
             bool: Returns True if the IBAN is valid, False otherwise.
         """
-        # Check if the IBAN starts with 'ES', is 24
-        # characters long, and contains only digits after 'ES'.
-        if iban.startswith("ES") and len(iban) == 24 and iban[2:].isdigit():
-            return True
-        return False
+        # The same validator is used by every entry point
+        return valid_iban(iban)
@@ -0,0 +1,116 @@
+"""MODULE: async_api. Asyncio counterparts of the three entry points.
+
+aprocess_transfer, adeposit_into_account and astore_new_balance validate their
+inputs and raise the same exceptions as process_transfer, deposit_into_account
+and store_new_balance, but the file I/O runs in worker threads so the event loop
+is never blocked. The writes are group committed: while a commit is running the
+requests that arrive are queued, and the next commit stores all of them with one
+write (and one fsync) of the store."""
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+# pylint: disable=import-error
+from uc3m_money.transfer_request import validate_transfer, store_transfers
+from uc3m_money.account_deposit import read_deposit, store_deposits
+from uc3m_money.account_balance import new_balance_snapshot, store_balance_snapshots
+
+# Commits run one after the other in a single thread, reads and validation in the
+# default executor of the loop
+_COMMIT_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="uc3m_money-commit")
+
+
+class GroupCommitter:
+    """Queues the items submitted from one event loop and stores the ones queued
+    while the previous commit was running with a single call to ``commit``.
+
+    ``commit`` receives a list of items and returns one result per item, which
+    is either the value for the submitter or an exception to raise to it."""
+
+    def __init__(self, commit):
+        self.__commit = commit
+        self.__pending = []
+        self.__task = None
+        self.__commits = 0
+
+    @property
+    def commits(self):
+        """Number of commits done"""
+        return self.__commits
+
+    async def submit(self, item):
+        """Queues the item and returns its result once it is committed."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__pending.append((item, future))
+        if self.__task is None or self.__task.done():
+            self.__task = loop.create_task(self.__run())
+        result = await future
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def __run(self):
+        loop = asyncio.get_running_loop()
+        while self.__pending:
+            batch, self.__pending = self.__pending, []
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(_COMMIT_EXECUTOR, self.__commit, items)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                # The whole commit failed, every request of the group gets the error
+                results = [exc] * len(batch)
+            self.__commits += 1
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+def _commit_deposits(deposits: list) -> list:
+    store_deposits(deposits)
+    return [deposit.deposit_signature for deposit in deposits]
+
+
+def _commit_balances(upsert: bool):
+    def commit(snapshots: list) -> list:
+        store_balance_snapshots(snapshots, upsert)
+        return [True] * len(snapshots)
+    return commit
+
+
+# The futures of a committer belong to one event loop
+_COMMITTERS = weakref.WeakKeyDictionary()
+
+
+def committer(name: str) -> GroupCommitter:
+    """Returns the group committer of the running event loop for "transfers",
+    "deposits", "balances" or "balances_upsert"."""
+    committers = _COMMITTERS.setdefault(asyncio.get_running_loop(), {})
+    if name not in committers:
+        commits = {"transfers": store_transfers,
+                   "deposits": _commit_deposits,
+                   "balances": _commit_balances(False),
+                   "balances_upsert": _commit_balances(True)}
+        committers[name] = GroupCommitter(commits[name])
+    return committers[name]
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+async def aprocess_transfer(from_iban: str, to_iban: str, concept: str,
+                            transfer_type: str, date: str, amount: str) -> str:
+    """Async process_transfer: same validation, result and exceptions."""
+    transfer = validate_transfer(from_iban, to_iban, concept, transfer_type, date, amount)
+    return await committer("transfers").submit(transfer)
+
+
+async def adeposit_into_account(input_file: str) -> str:
+    """Async deposit_into_account: same validation, result and exceptions."""
+    loop = asyncio.get_running_loop()
+    deposit = await loop.run_in_executor(None, read_deposit, input_file)
+    return await committer("deposits").submit(deposit)
+
+
+async def astore_new_balance(iban: str, upsert: bool = False) -> bool:
+    """Async store_new_balance: same validation, result and exceptions."""
+    loop = asyncio.get_running_loop()
+    snapshot = await loop.run_in_executor(None, new_balance_snapshot, iban)
+    return await committer("balances_upsert" if upsert else "balances").submit(snapshot)
@@ -0,0 +1,159 @@
+"""Module with the balance ledger used by function 3. It keeps the running balance
+of every IBAN in all_transactions.json, so a balance query does not need to read
+the transactions file again."""
+
+import json
+import os
+import threading
+# pylint: disable=import-error
+from uc3m_money.record_format import iter_records
+from uc3m_money import metrics
+from uc3m_money.money import parse_cents, cents_to_float
+
+# Bytes before the closing bracket used to check that the file was only appended to
+_FINGERPRINT_SIZE = 64
+# Bytes read from the end of the file to find the closing bracket
+_TAIL_SIZE = 4096
+
+
+class BalanceLedger:
+    """Per IBAN running balances of a transactions file.
+
+    Amounts are added as integer cents, so the balances do not drift however long
+    the file is. The balances are built in one streaming pass the first time they are needed, so
+    only the balances (not the movements) are kept in memory. When the
+    file grows because new movements were appended to the array, only the new
+    movements are parsed and added; any other change rebuilds the balances."""
+
+    def __init__(self, path: str):
+        self.__path = path
+        self.__balances = {}
+        self.__rows = 0
+        self.__file_signature = None
+        self.__end = 0
+        self.__fingerprint = b""
+        self.__lock = threading.Lock()
+
+    @property
+    def path(self):
+        """Path of the transactions file"""
+        return self.__path
+
+    @property
+    def rows(self):
+        """Number of movements aggregated in the ledger"""
+        self.refresh()
+        return self.__rows
+
+    def __contains__(self, iban: str) -> bool:
+        self.refresh()
+        return iban in self.__balances
+
+    def balance(self, iban: str) -> float:
+        """Returns the aggregated amount of the IBAN (0 if it has no movements)."""
+        return cents_to_float(self.balance_cents(iban))
+
+    def balance_cents(self, iban: str) -> int:
+        """Returns the aggregated amount of the IBAN in cents."""
+        self.refresh()
+        return self.__balances.get(iban, 0)
+
+    def balances(self) -> dict:
+        """Returns the aggregated amount of every IBAN."""
+        self.refresh()
+        return {iban: cents_to_float(cents) for iban, cents in self.__balances.items()}
+
+    def is_current(self) -> bool:
+        """True if the balances are up to date with the transactions file."""
+        stat = os.stat(self.__path)
+        return (stat.st_size, stat.st_mtime_ns) == self.__file_signature
+
+    def refresh(self):
+        """Brings the balances up to date with the transactions file.
+        Safe to call from several threads."""
+        with self.__lock:
+            stat = os.stat(self.__path)
+            file_signature = (stat.st_size, stat.st_mtime_ns)
+            if file_signature == self.__file_signature:
+                return
+            previous_size = self.__file_signature[0] if self.__file_signature else 0
+            if not (previous_size < stat.st_size and self.__add_appended_movements()):
+                self.rebuild()
+            self.__file_signature = file_signature
+
+    def rebuild(self):
+        """Aggregates every movement of the transactions file."""
+        self.__balances, self.__rows = self._aggregate()
+        with open(self.__path, "rb") as file:
+            size = file.seek(0, os.SEEK_END)
+            start = max(0, size - _TAIL_SIZE)
+            file.seek(start)
+            self.__remember_end(file.read(), start)
+        metrics.count("bytes_read", self.__path, size)
+        metrics.count("rows_scanned", self.__path, self.__rows)
+
+    def __add_appended_movements(self) -> bool:
+        """Adds the movements written after the last known closing bracket.
+        Returns False if the file was not simply appended to."""
+        start = max(0, self.__end - _FINGERPRINT_SIZE)
+        with open(self.__path, "rb") as file:
+            file.seek(start)
+            content = file.read()
+        if content[:self.__end - start] != self.__fingerprint:
+            return False
+        tail = content[self.__end - start:].strip()
+        # What used to be "]" is now ", {...}, {...}]"
+        if not tail.startswith(b","):
+            return False
+        try:
+            movements = json.loads(b"[" + tail[1:])
+        except json.JSONDecodeError:
+            return False
+        rows = add_movements(self.__balances, movements)
+        self.__rows += rows
+        self.__remember_end(content, start)
+        metrics.count("bytes_read", self.__path, len(content))
+        metrics.count("rows_scanned", self.__path, rows)
+        return True
+
+    def _aggregate(self):
+        """Returns the balance in cents of every IBAN of the whole file and the
+        number of movements. Other backends override this step."""
+        balances = {}
+        rows = add_movements(balances, iter_records(self.__path))
+        return balances, rows
+
+    def __remember_end(self, content: bytes, offset: int):
+        end = content.rfind(b"]")
+        self.__end = offset + end
+        self.__fingerprint = content[max(0, end - _FINGERPRINT_SIZE):end]
+
+
+def add_movements(balances: dict, movements) -> int:
+    """Adds the amounts of the movements to the balances in cents, returning how
+    many movements there were."""
+    rows = 0
+    for key in movements:
+        iban = key["IBAN"]
+        balances[iban] = balances.get(iban, 0) + parse_cents(key["amount"])
+        rows += 1
+    return rows
+
+
+_LEDGERS = {}
+_LEDGER_CLASS = [BalanceLedger]
+
+
+def get_ledger(path: str) -> BalanceLedger:
+    """Returns the shared ledger of a transactions file, creating it on first use."""
+    key = os.path.abspath(path)
+    if key not in _LEDGERS:
+        _LEDGERS[key] = _LEDGER_CLASS[0](key)
+    return _LEDGERS[key]
+
+
+def use_ledger_class(ledger_class):
+    """Selects the class of the ledgers created from now on (BalanceLedger or a
+    subclass with another aggregation backend) and drops the existing ones."""
+    _LEDGER_CLASS[0] = ledger_class
+    _LEDGERS.clear()
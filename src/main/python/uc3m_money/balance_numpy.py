@@ -0,0 +1,115 @@
+"""MODULE: balance_numpy. Optional NumPy backend for the balance ledger.
+
+The transactions file is loaded once into two columns, the IBAN of every movement
+as an int64 code into a table of IBANs (an IBAN has too many digits for an int64)
+and the amount as int64 cents. The per IBAN sums are then a single grouped
+reduction. The columns are cached next to the transactions file and reused while
+the file does not change, so a rebuild does not parse the JSON again.
+
+NumPy is not a dependency of the project: without it the pure Python ledger is
+used and ``use_numpy_backend`` raises an AccountManagementException."""
+import os
+import zipfile
+from array import array
+# pylint: disable=import-error
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.balance_ledger import BalanceLedger, use_ledger_class
+from uc3m_money.record_format import iter_records
+from uc3m_money.money import parse_cents
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CACHE_SUFFIX = ".columns.npz"
+
+
+class ColumnarTransactions:
+    """Movements of a transactions file as IBAN code and cents columns."""
+
+    def __init__(self, ibans, codes, cents):
+        self.ibans = ibans
+        self.codes = codes
+        self.cents = cents
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_json(cls, path: str):
+        """Parses the transactions file into columns."""
+        code_of = {}
+        codes = array("q")
+        cents = array("q")
+        for key in iter_records(path):
+            iban = key["IBAN"]
+            code = code_of.get(iban)
+            if code is None:
+                code = code_of[iban] = len(code_of)
+            codes.append(code)
+            cents.append(parse_cents(key["amount"]))
+        ibans = np.array(list(code_of), dtype=np.str_)
+        return cls(ibans, np.frombuffer(codes, dtype=np.int64),
+                   np.frombuffer(cents, dtype=np.int64))
+
+    @classmethod
+    def load(cls, path: str):
+        """Returns the columns of the transactions file, from the cache when it was
+        written for the current contents of the file, parsing the file otherwise."""
+        signature = _file_signature(path)
+        cache_path = path + CACHE_SUFFIX
+        try:
+            with np.load(cache_path, allow_pickle=False) as cached:
+                if tuple(cached["signature"]) == signature:
+                    return cls(cached["ibans"], cached["codes"], cached["cents"])
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+        columns = cls.from_json(path)
+        # The file may have changed while it was parsed, then the cache is not valid
+        if _file_signature(path) == signature:
+            columns.save(cache_path, signature)
+        return columns
+
+    def save(self, cache_path: str, signature: tuple):
+        """Writes the columns to the cache file through a temporary file."""
+        temp_path = cache_path + ".tmp.npz"
+        np.savez(temp_path, ibans=self.ibans, codes=self.codes, cents=self.cents,
+                 signature=np.array(signature, dtype=np.int64))
+        os.replace(temp_path, cache_path)
+
+    def sums(self) -> dict:
+        """Returns the balance in cents of every IBAN."""
+        totals = np.zeros(len(self.ibans), dtype=np.int64)
+        np.add.at(totals, self.codes, self.cents)
+        return dict(zip(self.ibans.tolist(), totals.tolist()))
+
+
+class NumpyBalanceLedger(BalanceLedger):
+    """Balance ledger that aggregates the whole file with NumPy. Movements appended
+    afterwards are still added one by one, as in BalanceLedger."""
+
+    def _aggregate(self):
+        columns = ColumnarTransactions.load(self.path)
+        return columns.sums(), len(columns)
+
+
+def numpy_available() -> bool:
+    """True if NumPy can be imported."""
+    return np is not None
+
+
+def use_numpy_backend(enabled: bool = True):
+    """Makes the balance queries use the NumPy backend (or the pure Python one
+    again when ``enabled`` is False)."""
+    if not enabled:
+        use_ledger_class(BalanceLedger)
+        return
+    if np is None:
+        raise AccountManagementException("NumPy is not installed")
+    use_ledger_class(NumpyBalanceLedger)
+
+
+def _file_signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,295 @@
+"""MODULE: bloom_filter. Bloom filter in front of the transfer code index.
+
+Almost every transfer is new, so most duplicate checks can be answered "not
+stored" by a Bloom filter in memory, without a lookup in the code index. The
+filter of a journal is persisted in a sidecar ``.bloom`` file that remembers how
+many bytes of the journal it covers, like the index (see transfer_index): at
+startup it is loaded and catches up with the transfers appended since, or it is
+rebuilt from the whole journal when it is missing, broken or was built for
+another false positive rate.
+
+The filter is scalable: when the current slice is full a new one, twice as large
+and with half the false positive rate, is added, so the rate of the whole filter
+stays under the configured one (see set_false_positive_rate) however many
+transfers are stored. stats() tells how many exact lookups it avoided."""
+import hashlib
+import math
+import os
+import struct
+# pylint: disable=import-error
+from uc3m_money import metrics
+from uc3m_money.transfer_index import journal_codes
+
+BLOOM_SUFFIX = ".bloom"
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+INITIAL_CAPACITY = 1024
+
+_HEADER = struct.Struct("<4sIdQI")  # magic, version, false positive rate, journal offset, slices
+_SLICE = struct.Struct("<QQQI")  # capacity, count, bits, hashes
+_MAGIC = b"TBLM"
+_VERSION = 1
+# Every new slice has twice the capacity and half the false positive rate of the
+# previous one, so the rates add up to at most twice the rate of the first slice
+_GROWTH = 2
+_TIGHTENING = 0.5
+
+_RATE = [DEFAULT_FALSE_POSITIVE_RATE]
+# Counted without a lock, which would cost more than the check: under concurrent
+# threads a few counts may be lost
+_STATS = {"checks": 0, "avoided": 0, "exact_lookups": 0, "false_positives": 0}
+
+
+def get_false_positive_rate() -> float:
+    """Returns the false positive rate the filters are built for."""
+    return _RATE[0]
+
+
+def set_false_positive_rate(rate: float):
+    """Selects the false positive rate of the filters. The persisted filters built
+    for another rate are rebuilt the next time they are loaded.
+
+    Raises:
+        ValueError: If the rate is not between 0 and 1.
+    """
+    if not 0 < rate < 1:
+        raise ValueError(f"The false positive rate must be between 0 and 1: {rate}")
+    _RATE[0] = rate
+
+
+def stats() -> dict:
+    """How many duplicate checks went through the filters, how many of them it
+    answered alone ("avoided") and how many needed the exact lookup, of which
+    "false_positives" were not stored after all."""
+    result = dict(_STATS)
+    result["avoided_ratio"] = result["avoided"] / result["checks"] if result["checks"] else 0.0
+    return result
+
+
+def reset_stats():
+    """Sets every statistic back to zero."""
+    for name in _STATS:
+        _STATS[name] = 0
+
+
+def _count(name: str, file: str):
+    _STATS[name] += 1
+    metrics.count("bloom_" + name, file)
+
+
+def _hashes(code: str):
+    """The two 64 bit hashes the bit positions of a code are derived from"""
+    digest = hashlib.blake2b(code.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class _Slice:
+    """Plain Bloom filter of a fixed capacity."""
+    __slots__ = ("capacity", "count", "size", "hashes", "bits")
+
+    def __init__(self, capacity: int, rate: float, count: int = 0, size: int = 0,
+                 hashes: int = 0, bits: bytearray = None):
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self.capacity = capacity
+        self.count = count
+        self.size = size or max(8, math.ceil(-capacity * math.log(rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+
+    def add(self, first: int, second: int):
+        """Sets the bits of a code"""
+        size, bits = self.size, self.bits
+        for number in range(self.hashes):
+            position = (first + number * second) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, hashes) -> bool:
+        first, second = hashes
+        size, bits = self.size, self.bits
+        for number in range(self.hashes):
+            position = (first + number * second) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class ScalableBloomFilter:
+    """Bloom filter that grows by adding slices, keeping the false positive rate
+    of the whole filter under ``rate``."""
+
+    def __init__(self, rate: float, capacity: int = INITIAL_CAPACITY, slices: list = None):
+        self.__rate = rate
+        self.__slices = slices or [_Slice(capacity, rate * (1 - _TIGHTENING))]
+
+    @property
+    def rate(self):
+        """False positive rate the filter was built for"""
+        return self.__rate
+
+    def __len__(self):
+        return sum(piece.count for piece in self.__slices)
+
+    def add(self, code: str):
+        """Adds a code."""
+        last = self.__slices[-1]
+        if last.count >= last.capacity:
+            last = _Slice(last.capacity * _GROWTH,
+                          self.__rate * (1 - _TIGHTENING) * _TIGHTENING ** len(self.__slices))
+            self.__slices.append(last)
+        last.add(*_hashes(code))
+
+    def __contains__(self, code: str) -> bool:
+        hashes = _hashes(code)
+        # The last slices are the largest ones, they hold most of the codes
+        for piece in reversed(self.__slices):
+            if hashes in piece:
+                return True
+        return False
+
+    def to_bytes(self, journal_offset: int) -> bytes:
+        """The filter as stored in a ``.bloom`` file"""
+        parts = [_HEADER.pack(_MAGIC, _VERSION, self.__rate, journal_offset,
+                              len(self.__slices))]
+        for piece in self.__slices:
+            parts.append(_SLICE.pack(piece.capacity, piece.count, piece.size, piece.hashes))
+            parts.append(bytes(piece.bits))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """Returns the filter stored in ``data`` and the journal offset it covers.
+
+        Raises:
+            ValueError: If the data is not a filter of this version.
+        """
+        try:
+            magic, version, rate, offset, count = _HEADER.unpack_from(data, 0)
+            if magic != _MAGIC or version != _VERSION or count == 0:
+                raise ValueError("Not a Bloom filter file")
+            position = _HEADER.size
+            slices = []
+            for _ in range(count):
+                capacity, stored, size, hashes = _SLICE.unpack_from(data, position)
+                position += _SLICE.size
+                length = (size + 7) // 8
+                if position + length > len(data):
+                    raise ValueError("Truncated Bloom filter file")
+                slices.append(_Slice(capacity, rate, stored, size, hashes,
+                                     bytearray(data[position:position + length])))
+                position += length
+        except struct.error as exception:
+            raise ValueError("Truncated Bloom filter file") from exception
+        return cls(rate, slices=slices), offset
+
+
+class TransferCodeFilter:
+    """Persisted Bloom filter of the transfer codes of a journal, loaded lazily."""
+
+    def __init__(self, path: str, journal_path: str):
+        self.__path = path
+        self.__journal_path = journal_path
+        self.__filter = None
+        self.__offset = 0
+        self.__changed = False
+
+    @property
+    def path(self):
+        """Path of the filter file"""
+        return self.__path
+
+    def might_contain(self, code: str) -> bool:
+        """False if the code is certainly not stored. True means the exact lookup
+        is needed; report its result with exact_lookup."""
+        self.__load()
+        found = code in self.__filter
+        _count("checks", self.__journal_path)
+        if not found:
+            _count("avoided", self.__journal_path)
+        return found
+
+    def exact_lookup(self, stored: bool):
+        """Counts the exact lookup done after might_contain returned True."""
+        _count("exact_lookups", self.__journal_path)
+        if not stored:
+            _count("false_positives", self.__journal_path)
+
+    def add(self, code: str):
+        """Adds the code of a transfer appended to the journal."""
+        self.__load()
+        self.__filter.add(code)
+        self.__changed = True
+
+    def mark_journal_offset(self, offset: int):
+        """Records that the filter covers the journal up to ``offset`` bytes."""
+        self.__offset = offset
+
+    def refresh(self):
+        """Picks up the transfers appended by other processes since the filter was
+        loaded. Call it while holding the journal lock."""
+        if self.__filter is None:
+            return
+        size = _size(self.__journal_path)
+        if size < self.__offset:
+            self.rebuild()
+        elif size > self.__offset:
+            self.__catch_up()
+
+    def rebuild(self):
+        """Recreates the filter from the whole journal, in a single slice with room
+        for twice the codes stored."""
+        codes = []
+        offset = 0
+        for code, offset in journal_codes(self.__journal_path, 0):
+            if code is not None:
+                codes.append(code)
+        self.__filter = ScalableBloomFilter(_RATE[0], max(INITIAL_CAPACITY, 2 * len(codes)))
+        for code in codes:
+            self.__filter.add(code)
+        self.__offset = offset
+        self.__changed = True
+
+    def save(self):
+        """Writes the filter to its file, if it changed since it was loaded."""
+        if self.__filter is None or not self.__changed:
+            return
+        temp_path = self.__path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.__filter.to_bytes(self.__offset))
+        os.replace(temp_path, self.__path)
+        self.__changed = False
+
+    def close(self):
+        """Saves the filter and forgets it, it is loaded again when needed."""
+        self.save()
+        self.__filter = None
+
+    def __load(self):
+        if self.__filter is not None:
+            return
+        try:
+            with open(self.__path, "rb") as f:
+                self.__filter, self.__offset = ScalableBloomFilter.from_bytes(f.read())
+        except (OSError, ValueError):
+            self.__filter = None
+        size = _size(self.__journal_path)
+        if self.__filter is None or self.__filter.rate != _RATE[0] or self.__offset > size:
+            # Missing, broken, built for another rate or for a journal that was replaced
+            self.rebuild()
+        elif self.__offset < size:
+            self.__catch_up()
+
+    def __catch_up(self):
+        """Adds the codes of the complete journal lines written after the offset."""
+        start = offset = self.__offset
+        for code, offset in journal_codes(self.__journal_path, start):
+            if code is not None:
+                self.__filter.add(code)
+        self.__offset = offset
+        self.__changed = self.__changed or offset != start
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
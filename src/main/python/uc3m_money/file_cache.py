@@ -0,0 +1,178 @@
+"""MODULE: file_cache. In-memory read-through cache of the parsed JSON array files.
+
+A long running worker loads the same deposits.json, account_balances.json or
+legacy stored_transactions.json again and again. The cache keeps the parsed
+array of each file with the modification time, size and inode it was read
+at, and serves it again as long as os.stat gives the same three values.
+A file changed or replaced by another process is therefore read again. The
+writes of this process (see json_array_store) update the cached array in
+place, so a file is not parsed again after every write.
+
+The cache is bounded by the total size of the cached files, in bytes of JSON
+text. When it is full the least recently used files are evicted. A cap of 0
+disables it. Callers get a shallow copy of the array, so changing the list
+never changes the cached one."""
+import os
+import threading
+from collections import OrderedDict
+# pylint: disable=import-error
+from uc3m_money import metrics
+from uc3m_money.record_format import decode
+
+# Enough for the stores of a busy day, set_max_bytes changes it
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def stat_signature(stat: os.stat_result) -> tuple:
+    """(mtime, size, inode) of a stat result, what tells two versions of a file apart"""
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _signature(path: str):
+    """Signature of the file, or None if it does not exist."""
+    try:
+        return stat_signature(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+
+class FileCache:
+    """Parsed arrays of files, valid while the files do not change on disk."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.__max_bytes = max_bytes
+        self.__entries = OrderedDict()  # path: (signature, records)
+        self.__bytes = 0
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self):
+        """Cap of the cached file sizes"""
+        return self.__max_bytes
+
+    @property
+    def cached_bytes(self):
+        """Total size of the cached files"""
+        return self.__bytes
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, path: str):
+        """Returns a copy of the cached array of the file, or None if it is not
+        cached or the file changed since it was cached."""
+        key = os.path.abspath(path)
+        signature = _signature(key)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[0] != signature:
+                if entry is not None:
+                    self.__remove(key)
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, path: str, records: list, read_signature=None):
+        """Caches the array of the file as it is on disk now (after reading or
+        writing it). The list is copied. With ``read_signature``, the signature
+        taken before the file was read, nothing is cached if the file changed
+        while it was being read."""
+        key = os.path.abspath(path)
+        signature = _signature(key)
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+            if signature is None or signature[1] > self.__max_bytes:
+                return
+            if read_signature is not None and read_signature != signature:
+                return
+            self.__entries[key] = (signature, list(records))
+            self.__bytes += signature[1]
+            self.__evict()
+
+    def extend(self, path: str, records: list, previous_signature):
+        """Adds records appended to the file by this process to its cached array.
+        ``previous_signature`` is the signature of the file just before the append:
+        if the cached array is not of that version it is dropped instead."""
+        key = os.path.abspath(path)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return
+            self.__remove(key)
+            signature = _signature(key)
+            if entry[0] != previous_signature or signature is None \
+                    or signature[1] > self.__max_bytes:
+                return
+            entry[1].extend(records)
+            self.__entries[key] = (signature, entry[1])
+            self.__bytes += signature[1]
+            self.__evict()
+
+    def __contains__(self, path: str) -> bool:
+        return os.path.abspath(path) in self.__entries
+
+    def invalidate(self, path: str):
+        """Drops the cached array of the file."""
+        key = os.path.abspath(path)
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+
+    def clear(self):
+        """Drops every cached array."""
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+
+    def __remove(self, key: str):
+        signature, _ = self.__entries.pop(key)
+        self.__bytes -= signature[1]
+
+    def __evict(self):
+        while self.__bytes > self.__max_bytes:
+            key = next(iter(self.__entries))
+            self.__remove(key)
+            self.evictions += 1
+
+
+_CACHE = [FileCache()]
+
+
+def get_file_cache() -> FileCache:
+    """Returns the cache shared by the stores."""
+    return _CACHE[0]
+
+
+def set_max_bytes(max_bytes: int) -> FileCache:
+    """Replaces the shared cache with an empty one with another cap (0 disables it)."""
+    _CACHE[0] = FileCache(max_bytes)
+    return _CACHE[0]
+
+
+def load_json(path: str):
+    """
+    Contents of the file in any format (see record_format.decode), through the
+    shared cache when it holds an array.
+
+    Raises:
+        OSError: If the file cannot be opened.
+        ValueError: If the file is not valid (json.JSONDecodeError for JSON).
+    """
+    cache = _CACHE[0]
+    records = cache.get(path)
+    if records is not None:
+        return records
+    signature = _signature(path)
+    with open(path, "rb") as f:
+        content = f.read()
+    metrics.count("bytes_read", path, len(content))
+    data = decode(content)
+    if isinstance(data, list):
+        cache.put(path, data, signature)
+    return data
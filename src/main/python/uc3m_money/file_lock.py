@@ -0,0 +1,101 @@
+"""MODULE: file_lock. Exclusive locks between processes for the stored files.
+
+A store is locked through a sidecar ``<file>.lock`` file with fcntl.flock
+(msvcrt.locking on Windows), so two workers never read, change and write the
+same store at the same time. The lock file is opened on every acquisition, which
+keeps processes forked while a lock is held from sharing it. Inside a process
+the lock is also a reentrant thread lock, shared by every user of the same file."""
+import os
+import threading
+
+try:
+    import fcntl
+    msvcrt = None  # pylint: disable=invalid-name
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+LOCK_SUFFIX = ".lock"
+
+
+class FileLock:
+    """Reentrant exclusive lock on a file, between processes and threads."""
+
+    def __init__(self, path: str):
+        self.__path = path + LOCK_SUFFIX
+        self.__thread_lock = threading.RLock()
+        self.__depth = 0
+        self.__file = None
+
+    @property
+    def path(self):
+        """Path of the lock file"""
+        return self.__path
+
+    def acquire(self):
+        """Waits until the lock is free and takes it."""
+        self.__thread_lock.acquire()  # pylint: disable=consider-using-with
+        if self.__depth == 0:
+            try:
+                lock_file = open(self.__path, "a+b")  # pylint: disable=consider-using-with
+                try:
+                    _lock(lock_file)
+                except OSError:
+                    lock_file.close()
+                    raise
+            except OSError:
+                self.__thread_lock.release()
+                raise
+            self.__file = lock_file
+        self.__depth += 1
+
+    def release(self):
+        """Releases the lock taken by the last acquire."""
+        self.__depth -= 1
+        if self.__depth == 0:
+            _unlock(self.__file)
+            self.__file.close()
+            self.__file = None
+        self.__thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def _lock(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        return
+    lock_file.seek(0)
+    while True:
+        try:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after ten seconds, keep waiting
+            continue
+
+
+def _unlock(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        return
+    lock_file.seek(0)
+    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def file_lock(path: str) -> FileLock:
+    """Returns the shared lock of a file, creating it on first use."""
+    key = os.path.abspath(path)
+    with _LOCKS_GUARD:
+        if key not in _LOCKS:
+            _LOCKS[key] = FileLock(key)
+        return _LOCKS[key]
@@ -0,0 +1,247 @@
+"""MODULE: json_array_store. Helpers for the array files used as stores
+(account_balances.json, deposits.json and the legacy stored_transactions.json).
+
+The files are written in the selected output format (see record_format) and read
+in whichever format they are. New records are appended in place (just before the
+closing bracket of a compact JSON array, at the end of the other formats) so
+adding a record does not rewrite the file. The result is byte for byte what
+writing the whole array would have given. A file in another format, e.g. written
+before the format was changed, is rewritten in the selected one instead.
+
+An append in place is made crash safe with an undo record: before the end of the
+file is overwritten, its offset and the bytes it had are written to a sidecar
+``<file>.undo`` file. If a crash leaves the file torn, the next append (or
+load_json_array_to_update) puts the old end back. A file that still cannot be
+decoded is never taken for an empty store: it is copied to ``<file>.corrupt``
+before it is written again."""
+import os
+import shutil
+import struct
+import tempfile
+# pylint: disable=import-error
+from uc3m_money import metrics
+from uc3m_money import record_format
+from uc3m_money.file_cache import get_file_cache, load_json, stat_signature
+
+_TAIL_CHUNK = 4096
+UNDO_SUFFIX = ".undo"
+CORRUPT_SUFFIX = ".corrupt"
+_UNDO_OFFSET = struct.Struct("<Q")
+
+
+def load_json_array(path: str) -> list:
+    """Loads a JSON array file, returning an empty list when it is missing or broken.
+    Use load_json_array_to_update for a file that is going to be written."""
+    if not os.path.exists(path):
+        return []
+    try:
+        data = load_json(path)
+    except ValueError:
+        return []
+    if not isinstance(data, list):
+        return []
+    return data
+
+
+def write_json_array(path: str, records: list, output_format: str = None):
+    """Writes the whole array, in ``output_format`` or the selected one, through a
+    temporary file that replaces ``path``, so a crash leaves either the old or the
+    new contents, never a truncated file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path),
+                                             suffix=".tmp")
+    try:
+        # mkstemp creates the file readable only by its owner, keep the usual mode
+        os.chmod(temp_path, _file_mode(path))
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(record_format.encode(records, output_format))
+            f.flush()
+            os.fsync(f.fileno())
+            metrics.count("bytes_written", path, f.tell())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _sync_directory(directory)
+    _clear_undo(path)
+    # The next load of the file does not need to parse what was just written
+    get_file_cache().put(path, records)
+
+
+def _file_mode(path: str) -> int:
+    """Permissions of the file, or the default ones of a new file."""
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        return 0o644
+
+
+def _sync_directory(directory: str):
+    """Makes a rename in the directory durable (not possible on Windows)."""
+    if os.name != "posix":
+        return
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def append_to_json_array(path: str, records: list):
+    """
+    Appends records to the JSON array stored in ``path`` without rewriting it.
+
+    If the file does not end with a closing bracket (missing, empty or not an
+    array) it is written again with the records it holds plus the new ones (see
+    load_json_array_to_update). Call it holding the file lock.
+    """
+    if not append_in_place(path, records):
+        write_json_array(path, load_json_array_to_update(path) + list(records))
+
+
+def load_json_array_to_update(path: str) -> list:
+    """
+    Loads the array of a file that is about to be written, after undoing an append
+    in place torn by a crash. A file that cannot be decoded as an array is copied
+    to ``<file>.corrupt`` first, so what it held is kept, and an empty list is
+    returned. Call it holding the file lock.
+    """
+    if not os.path.exists(path):
+        return []
+    recover_append(path)
+    try:
+        data = load_json(path)
+    except ValueError:
+        data = None
+    if not isinstance(data, list):
+        # Keep a copy of what could not be loaded before it is replaced
+        shutil.copyfile(path, path + CORRUPT_SUFFIX)
+        return []
+    return data
+
+
+def recover_append(path: str) -> bool:
+    """
+    Undoes an append in place that a crash left unfinished, using its undo record.
+    An append that was completely written is kept. Call it holding the file lock.
+
+    Returns:
+        bool: True if the end of the file was put back.
+    """
+    undo_path = path + UNDO_SUFFIX
+    try:
+        with open(undo_path, "rb") as f:
+            undo = f.read()
+    except FileNotFoundError:
+        return False
+    if len(undo) < _UNDO_OFFSET.size or not os.path.exists(path):
+        _clear_undo(path)
+        return False
+    # Rare (only after a crash), so the whole file can be read to tell if the
+    # append was finished
+    get_file_cache().invalidate(path)
+    try:
+        finished = isinstance(load_json(path), list)
+    except ValueError:
+        finished = False
+    if not finished:
+        end = _UNDO_OFFSET.unpack_from(undo)[0]
+        with open(path, "r+b") as f:
+            f.seek(end)
+            f.write(undo[_UNDO_OFFSET.size:])
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        get_file_cache().invalidate(path)
+    _clear_undo(path)
+    return not finished
+
+
+def _write_undo(path: str, end: int, tail: bytes):
+    """Makes the undo record of an append durable before the file is changed."""
+    undo_path = path + UNDO_SUFFIX
+    created = not os.path.exists(undo_path)
+    with open(undo_path, "wb") as f:
+        f.write(_UNDO_OFFSET.pack(end) + tail)
+        f.flush()
+        os.fsync(f.fileno())
+    if created:
+        _sync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+def _clear_undo(path: str):
+    """Empties the undo record. It is not synced: a record left by a crash after
+    a finished append is recognised by recover_append, which keeps the append."""
+    undo_path = path + UNDO_SUFFIX
+    if os.path.exists(undo_path) and os.path.getsize(undo_path):
+        with open(undo_path, "wb"):
+            pass
+
+
+def append_in_place(path: str, records: list) -> bool:
+    """
+    Writes the records at the end of the array in ``path``.
+
+    Returns:
+        bool: False, without changing the file, if it is not in the selected output
+        format or does not end like an array of objects (missing, empty, torn or
+        not an array).
+    """
+    if not records:
+        return True
+    if not os.path.exists(path):
+        return False
+    recover_append(path)
+    output_format = record_format.get_output_format()
+    with open(path, "r+b") as f:
+        if record_format.layout(f.read(record_format.HEAD_SIZE)) != (output_format, True):
+            return False
+        empty = False
+        if output_format == record_format.COMPACT:
+            end, empty = _find_closing_bracket(f)
+        else:
+            end = _find_end(f, output_format)
+        if end is None:
+            return False
+        previous_signature = stat_signature(os.fstat(f.fileno()))
+        f.seek(end)
+        _write_undo(path, end, f.read())
+        f.seek(end)
+        written = f.write(record_format.encode_appended(records, output_format, empty))
+        f.truncate()
+        f.flush()
+        os.fsync(f.fileno())
+    _clear_undo(path)
+    metrics.count("bytes_written", path, written)
+    get_file_cache().extend(path, records, previous_signature)
+    return True
+
+
+def _find_end(f, output_format: str):
+    """Returns the size of a JSON Lines or MessagePack file, or None when a JSON
+    Lines file does not end with a complete line."""
+    size = f.seek(0, os.SEEK_END)
+    if output_format == record_format.JSONL:
+        f.seek(size - 1)
+        if f.read(1) != b"\n":
+            return None
+    return size
+
+
+def _find_closing_bracket(f):
+    """Returns the offset where the tail of the array starts (the whitespace before
+    the closing bracket) and whether the array is empty, or (None, False) when the
+    file does not end like an array of objects."""
+    size = f.seek(0, os.SEEK_END)
+    start = max(0, size - _TAIL_CHUNK)
+    f.seek(start)
+    before = f.read().rstrip()
+    if not before.endswith(b"]"):
+        return None, False
+    before = before[:-1].rstrip()
+    if before.endswith(b"}"):
+        return start + len(before), False
+    if before == b"[" and start == 0:
+        return len(before), True
+    return None, False
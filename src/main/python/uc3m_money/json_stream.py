@@ -0,0 +1,104 @@
+"""MODULE: json_stream. Incremental reader for files holding a JSON array.
+
+The file is read in chunks and every element of the top-level array is decoded
+and yielded on its own, so the memory used does not depend on the file size and
+the caller can stop as soon as it found what it was looking for."""
+import json
+import re
+
+CHUNK_SIZE = 1 << 16
+
+_DECODER = json.JSONDecoder()
+_OPENING = re.compile(r"[ \t\n\r]*\[[ \t\n\r]*")
+# What follows an element: the delimiter and the whitespace before the next element
+_DELIMITER = re.compile(r"[ \t\n\r]*([,\]])[ \t\n\r]*")
+
+
+class _Buffer:
+    """Text read from the file that has not been consumed yet."""
+
+    def __init__(self, file, chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.position = 0
+        self.eof = False
+
+    def read_more(self) -> bool:
+        """Appends the next chunk, dropping the consumed text. False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = self.text[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def match(self, pattern):
+        """Matches ``pattern`` at the position, reading more text while the match
+        could still go on in the next chunk."""
+        while True:
+            found = pattern.match(self.text, self.position)
+            if found is not None and found.end() < len(self.text):
+                return found
+            if not self.read_more():
+                return found
+
+    def error(self, message: str):
+        """Decode error at the current position"""
+        return json.JSONDecodeError(message, self.text, self.position)
+
+
+def iter_json_array(path: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Yields the elements of the JSON array stored in ``path`` one at a time.
+
+    Raises:
+        json.JSONDecodeError: If the file is not a well formed JSON array.
+    """
+    scan_once = _DECODER.scan_once
+    delimiter_match = _DELIMITER.match
+    with open(path, "r", encoding="utf-8") as file:
+        buffer = _Buffer(file, chunk_size)
+        opening = buffer.match(_OPENING)
+        if opening is None:
+            raise buffer.error("Expecting '['")
+        buffer.position = opening.end()
+        if buffer.text.startswith("]", buffer.position):
+            return
+        while True:
+            # Fast path: the element and its delimiter are complete in the buffer
+            text = buffer.text
+            try:
+                value, end = scan_once(text, buffer.position)
+                delimiter = delimiter_match(text, end)
+            except (StopIteration, json.JSONDecodeError):
+                delimiter = None
+            if delimiter is None or delimiter.end() == len(text):
+                value = _decode_value(buffer)
+                delimiter = buffer.match(_DELIMITER)
+                if delimiter is None:
+                    raise buffer.error("Expecting ',' delimiter")
+            buffer.position = delimiter.end()
+            yield value
+            if delimiter.group(1) == "]":
+                return
+
+
+def _decode_value(buffer: _Buffer):
+    """Decodes the value at the buffer position, reading more text until it is complete."""
+    while True:
+        try:
+            value, end = _DECODER.raw_decode(buffer.text, buffer.position)
+        except json.JSONDecodeError:
+            if buffer.read_more():
+                continue
+            raise
+        # In an array a value is followed by "," or "]". Anything else may be a number
+        # cut by the end of the chunk ("12" of "125", "-0." of "-0.5"), so read more
+        if _DELIMITER.match(buffer.text, end) is None and buffer.read_more():
+            continue
+        buffer.position = end
+        return value
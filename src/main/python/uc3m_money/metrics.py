@@ -0,0 +1,217 @@
+"""MODULE: metrics. Optional timers and counters for the entry points.
+
+The entry points time their phases (read, validate, hash, dedup, aggregate,
+write) with ``timer(operation, phase)``, and the stores count the bytes they
+read and write and the rows they scan with ``count(counter, file, value)``.
+Nothing is measured until a sink is selected with set_sink: without one,
+timer() returns a shared do-nothing context manager and count() returns at once.
+
+A sink is any object with these methods (MetricsRegistry is one):
+
+    observe(operation, phase, seconds)  time spent in a phase
+    increment(counter, file, value)     adds to a counter of a file
+    close()
+
+MetricsRegistry keeps the figures in memory, PrometheusTextFile also writes them
+in the Prometheus text exposition format, e.g. for the textfile collector of the
+node exporter."""
+import os
+import tempfile
+import threading
+import time
+
+_SINK = [None]
+
+PREFIX = "uc3m_money"
+COUNTERS = ("bytes_read", "bytes_written", "rows_scanned", "bloom_checks", "bloom_avoided",
+            "bloom_exact_lookups", "bloom_false_positives")
+
+
+def get_sink():
+    """Returns the selected metrics sink, or None when nothing is measured."""
+    return _SINK[0]
+
+
+def set_sink(sink):
+    """Selects the metrics sink (None stops measuring). The previous sink is closed."""
+    previous = _SINK[0]
+    _SINK[0] = sink
+    if previous is not None and previous is not sink:
+        previous.close()
+
+
+def enabled() -> bool:
+    """True if a sink is selected. Lets callers skip computing a value to count."""
+    return _SINK[0] is not None
+
+
+class _NullTimer:
+    """Context manager that does nothing, shared by every timer while disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+
+_DISABLED = _NullTimer()
+
+
+class _PhaseTimer:
+    """Times the block it wraps and reports it to the sink."""
+    __slots__ = ("__sink", "__operation", "__phase", "__start")
+
+    def __init__(self, sink, operation: str, phase: str):
+        self.__sink = sink
+        self.__operation = operation
+        self.__phase = phase
+        self.__start = None
+
+    def __enter__(self):
+        self.__start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__sink.observe(self.__operation, self.__phase, time.perf_counter() - self.__start)
+
+
+def timer(operation: str, phase: str):
+    """Context manager timing a phase of an operation ("transfer", "deposit",
+    "balance")."""
+    sink = _SINK[0]
+    if sink is None:
+        return _DISABLED
+    return _PhaseTimer(sink, operation, phase)
+
+
+def count(counter: str, file: str, value: int = 1):
+    """Adds ``value`` to a counter ("bytes_read", "bytes_written", "rows_scanned")
+    of a file (only its name is kept)."""
+    sink = _SINK[0]
+    if sink is not None:
+        sink.increment(counter, os.path.basename(file), value)
+
+
+class MetricsRegistry:
+    """In-memory sink: the count, total and maximum time of every phase, and
+    the counters of every file."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__timers = {}
+        self.__counters = {}
+
+    def observe(self, operation: str, phase: str, seconds: float):
+        """Records the time spent in a phase."""
+        with self.__lock:
+            calls, total, longest = self.__timers.get((operation, phase), (0, 0.0, 0.0))
+            self.__timers[(operation, phase)] = (calls + 1, total + seconds,
+                                                 max(longest, seconds))
+
+    def increment(self, counter: str, file: str, value: int):
+        """Adds to the counter of a file."""
+        with self.__lock:
+            self.__counters[(counter, file)] = self.__counters.get((counter, file), 0) + value
+
+    def timers(self) -> dict:
+        """{(operation, phase): {"count", "seconds", "max_seconds"}}"""
+        with self.__lock:
+            return {key: {"count": calls, "seconds": total, "max_seconds": longest}
+                    for key, (calls, total, longest) in self.__timers.items()}
+
+    def counters(self) -> dict:
+        """{(counter, file): value}"""
+        with self.__lock:
+            return dict(self.__counters)
+
+    def reset(self):
+        """Forgets every figure."""
+        with self.__lock:
+            self.__timers.clear()
+            self.__counters.clear()
+
+    def prometheus_text(self) -> str:
+        """The figures in the Prometheus text exposition format."""
+        timers = self.timers()
+        counters = self.counters()
+        lines = [f"# HELP {PREFIX}_phase_seconds Time spent in each phase of the entry points",
+                 f"# TYPE {PREFIX}_phase_seconds summary"]
+        for (operation, phase), figures in sorted(timers.items()):
+            labels = _labels(operation=operation, phase=phase)
+            lines.append(f"{PREFIX}_phase_seconds_sum{labels} {figures['seconds']!r}")
+            lines.append(f"{PREFIX}_phase_seconds_count{labels} {figures['count']}")
+        lines.append(f"# HELP {PREFIX}_phase_seconds_max Longest time spent in a phase")
+        lines.append(f"# TYPE {PREFIX}_phase_seconds_max gauge")
+        for (operation, phase), figures in sorted(timers.items()):
+            lines.append(f"{PREFIX}_phase_seconds_max{_labels(operation=operation, phase=phase)}"
+                         f" {figures['max_seconds']!r}")
+        for counter in COUNTERS:
+            lines.append(f"# HELP {PREFIX}_{counter}_total {counter.replace('_', ' ')} per file")
+            lines.append(f"# TYPE {PREFIX}_{counter}_total counter")
+            for (name, file), value in sorted(counters.items()):
+                if name == counter:
+                    lines.append(f"{PREFIX}_{counter}_total{_labels(file=file)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        """Nothing to release."""
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    """Label value with the backslashes, quotes and newlines escaped"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusTextFile(MetricsRegistry):
+    """Sink that also writes the figures to a Prometheus text file, at most every
+    ``interval`` seconds while they change, and when it is closed. The file is
+    replaced atomically, so a scraper never reads half of it."""
+
+    def __init__(self, path: str, interval: float = 10.0):
+        super().__init__()
+        self.__path = path
+        self.__interval = interval
+        self.__due = time.monotonic() + interval
+
+    @property
+    def path(self):
+        """Path of the text file"""
+        return self.__path
+
+    def observe(self, operation: str, phase: str, seconds: float):
+        super().observe(operation, phase, seconds)
+        self.__write_if_due()
+
+    def increment(self, counter: str, file: str, value: int):
+        super().increment(counter, file, value)
+        self.__write_if_due()
+
+    def write(self):
+        """Writes the figures to the text file now."""
+        directory = os.path.dirname(os.path.abspath(self.__path))
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.__path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def close(self):
+        """Writes the final figures."""
+        self.write()
+
+    def __write_if_due(self):
+        now = time.monotonic()
+        if now >= self.__due:
+            self.__due = now + self.__interval
+            self.write()
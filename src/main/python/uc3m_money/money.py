@@ -0,0 +1,63 @@
+"""MODULE: money. Exact money amounts as integer cents.
+
+Summing floats drifts on long ledgers, so the amounts are parsed straight into an
+integer number of cents, added as integers and only turned into a float when
+they are returned or stored in the existing JSON layouts."""
+import re
+
+# "EUR 500.00", "1,000.00", "10", "-.5", "+1,234,567.8"
+_AMOUNT = re.compile(r"(?:EUR\s*)?([+-])?(\d{1,3}(?:,\d{3})+|\d*)(?:\.(\d{0,2}))?", re.ASCII)
+
+
+def parse_cents(amount) -> int:
+    """
+    Returns the amount as an integer number of cents.
+
+    Accepts strings with an optional "EUR" prefix, sign, thousands commas and up to
+    two decimals, ints and floats.
+
+    Raises:
+        ValueError: If the amount is not a number or has more than two decimals.
+    """
+    if isinstance(amount, str):
+        # Fast path for "+2424.42", "-1021.97", "500.00", the format of almost every
+        # stored amount (int() would also take "_" separators and non ASCII digits)
+        if amount[-3:-2] == "." and amount.isascii() and "_" not in amount:
+            try:
+                return int(amount.replace(".", "", 1))
+            except ValueError:
+                pass
+        return _parse_text(amount.strip())
+    if isinstance(amount, bool):
+        raise ValueError(f"Not an amount: {amount!r}")
+    if isinstance(amount, int):
+        return amount * 100
+    if isinstance(amount, float):
+        # repr gives the shortest text that reads back as the same float
+        return _parse_text(repr(amount))
+    raise ValueError(f"Not an amount: {amount!r}")
+
+
+def _parse_text(text: str) -> int:
+    match = _AMOUNT.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Not an amount: {text!r}")
+    sign, integer_part, decimal_part = match.groups()
+    integer_part = integer_part.replace(",", "")
+    decimal_part = decimal_part or ""
+    if not integer_part and not decimal_part:
+        raise ValueError(f"Not an amount: {text!r}")
+    cents = int(integer_part or "0") * 100 + int(decimal_part.ljust(2, "0"))
+    return -cents if sign == "-" else cents
+
+
+def cents_to_float(cents: int) -> float:
+    """Float closest to the amount, the value stored in the JSON files."""
+    return cents / 100
+
+
+def format_cents(cents: int) -> str:
+    """Amount with two decimals, e.g. -1021.97"""
+    sign = "-" if cents < 0 else ""
+    units, hundredths = divmod(abs(cents), 100)
+    return f"{sign}{units}.{hundredths:02d}"
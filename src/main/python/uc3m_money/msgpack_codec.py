@@ -0,0 +1,237 @@
+"""MODULE: msgpack_codec. Pure Python MessagePack encoder and decoder.
+
+Covers the types a JSON record can hold (None, bool, int, float, str, list and
+dict) plus bytes, following the MessagePack specification, so the files can also
+be read by any other MessagePack implementation. It is bundled so the binary
+store format does not need a package installed from the network. Extension
+types are not supported."""
+import struct
+
+_UINT8 = struct.Struct(">B")
+_UINT16 = struct.Struct(">H")
+_UINT32 = struct.Struct(">I")
+_UINT64 = struct.Struct(">Q")
+_INT8 = struct.Struct(">b")
+_INT16 = struct.Struct(">h")
+_INT32 = struct.Struct(">i")
+_INT64 = struct.Struct(">q")
+_FLOAT32 = struct.Struct(">f")
+_FLOAT64 = struct.Struct(">d")
+
+
+class IncompleteData(ValueError):
+    """The data ends in the middle of a value."""
+
+
+def packb(value) -> bytes:
+    """Encodes a value as MessagePack.
+
+    Raises:
+        TypeError: If the value holds a type that cannot be encoded.
+        ValueError: If an integer does not fit in 64 bits.
+    """
+    parts = []
+    _pack(value, parts.append)
+    return b"".join(parts)
+
+
+def _pack(value, write):
+    # pylint: disable=too-many-branches
+    if value is None:
+        write(b"\xc0")
+    elif value is True:
+        write(b"\xc3")
+    elif value is False:
+        write(b"\xc2")
+    elif isinstance(value, int):
+        _pack_int(value, write)
+    elif isinstance(value, float):
+        write(b"\xcb" + _FLOAT64.pack(value))
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        _pack_length(len(data), write, 0xa0, 32, b"\xd9", b"\xda", b"\xdb")
+        write(data)
+    elif isinstance(value, dict):
+        _pack_length(len(value), write, 0x80, 16, None, b"\xde", b"\xdf")
+        for key, item in value.items():
+            _pack(key, write)
+            _pack(item, write)
+    elif isinstance(value, (list, tuple)):
+        _pack_length(len(value), write, 0x90, 16, None, b"\xdc", b"\xdd")
+        for item in value:
+            _pack(item, write)
+    elif isinstance(value, (bytes, bytearray)):
+        _pack_length(len(value), write, None, 0, b"\xc4", b"\xc5", b"\xc6")
+        write(bytes(value))
+    else:
+        raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+def _pack_int(value: int, write):
+    if 0 <= value < 0x80 or -32 <= value < 0:
+        write(_INT8.pack(value) if value < 0 else _UINT8.pack(value))
+    elif value >= 0:
+        if value <= 0xff:
+            write(b"\xcc" + _UINT8.pack(value))
+        elif value <= 0xffff:
+            write(b"\xcd" + _UINT16.pack(value))
+        elif value <= 0xffffffff:
+            write(b"\xce" + _UINT32.pack(value))
+        elif value <= 0xffffffffffffffff:
+            write(b"\xcf" + _UINT64.pack(value))
+        else:
+            raise ValueError("Integer too large for MessagePack")
+    elif value >= -0x80:
+        write(b"\xd0" + _INT8.pack(value))
+    elif value >= -0x8000:
+        write(b"\xd1" + _INT16.pack(value))
+    elif value >= -0x80000000:
+        write(b"\xd2" + _INT32.pack(value))
+    elif value >= -0x8000000000000000:
+        write(b"\xd3" + _INT64.pack(value))
+    else:
+        raise ValueError("Integer too large for MessagePack")
+
+
+def _pack_length(length: int, write, fix_base, fix_limit, marker8, marker16, marker32):
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """Writes the header of a str, bin, array or map of ``length`` items."""
+    if fix_base is not None and length < fix_limit:
+        write(_UINT8.pack(fix_base | length))
+    elif marker8 is not None and length <= 0xff:
+        write(marker8 + _UINT8.pack(length))
+    elif length <= 0xffff:
+        write(marker16 + _UINT16.pack(length))
+    elif length <= 0xffffffff:
+        write(marker32 + _UINT32.pack(length))
+    else:
+        raise ValueError("Object too large for MessagePack")
+
+
+def unpackb(data: bytes):
+    """Decodes one MessagePack value that takes the whole of ``data``.
+
+    Raises:
+        ValueError: If the data is not a single valid value.
+    """
+    value, end = unpack_from(data, 0)
+    if end != len(data):
+        raise ValueError(f"Extra data after the value at byte {end}")
+    return value
+
+
+def unpack_from(data: bytes, position: int):
+    """Decodes the value starting at ``position``. Returns it with the offset
+    where it ends.
+
+    Raises:
+        IncompleteData: If the data ends in the middle of the value.
+        ValueError: If the data is not valid MessagePack.
+    """
+    # pylint: disable=too-many-return-statements,too-many-branches
+    if position >= len(data):
+        raise IncompleteData("No data to decode")
+    marker = data[position]
+    position += 1
+    if marker <= 0x7f:
+        return marker, position
+    if marker >= 0xe0:
+        return marker - 0x100, position
+    if 0xa0 <= marker <= 0xbf:
+        return _unpack_str(data, position, marker & 0x1f)
+    if 0x90 <= marker <= 0x9f:
+        return _unpack_array(data, position, marker & 0x0f)
+    if 0x80 <= marker <= 0x8f:
+        return _unpack_map(data, position, marker & 0x0f)
+    if marker in _CONSTANTS:
+        return _CONSTANTS[marker], position
+    if marker in _NUMBERS:
+        number = _NUMBERS[marker]
+        return number.unpack_from(data, _need(data, position, number.size))[0], \
+            position + number.size
+    if marker in _LENGTHS:
+        kind, length_struct = _LENGTHS[marker]
+        start = _need(data, position, length_struct.size)
+        length = length_struct.unpack_from(data, start)[0]
+        return kind(data, position + length_struct.size, length)
+    raise ValueError(f"Unsupported MessagePack type 0x{marker:02x} at byte {position - 1}")
+
+
+def _need(data: bytes, position: int, size: int) -> int:
+    """Checks that ``size`` bytes are available at ``position``."""
+    if position + size > len(data):
+        raise IncompleteData(f"Truncated value at byte {position}")
+    return position
+
+
+def _unpack_str(data: bytes, position: int, length: int):
+    _need(data, position, length)
+    try:
+        return bytes(data[position:position + length]).decode("utf-8"), position + length
+    except UnicodeDecodeError as exception:
+        raise ValueError(f"Invalid UTF-8 string at byte {position}") from exception
+
+
+def _unpack_bin(data: bytes, position: int, length: int):
+    _need(data, position, length)
+    return bytes(data[position:position + length]), position + length
+
+
+def _unpack_array(data: bytes, position: int, length: int):
+    items = []
+    for _ in range(length):
+        item, position = unpack_from(data, position)
+        items.append(item)
+    return items, position
+
+
+def _unpack_map(data: bytes, position: int, length: int):
+    items = {}
+    for _ in range(length):
+        key, position = unpack_from(data, position)
+        value, position = unpack_from(data, position)
+        try:
+            items[key] = value
+        except TypeError as exception:
+            raise ValueError(f"Unhashable map key at byte {position}") from exception
+    return items, position
+
+
+_CONSTANTS = {0xc0: None, 0xc2: False, 0xc3: True}
+_NUMBERS = {0xca: _FLOAT32, 0xcb: _FLOAT64, 0xcc: _UINT8, 0xcd: _UINT16, 0xce: _UINT32,
+            0xcf: _UINT64, 0xd0: _INT8, 0xd1: _INT16, 0xd2: _INT32, 0xd3: _INT64}
+_LENGTHS = {0xc4: (_unpack_bin, _UINT8), 0xc5: (_unpack_bin, _UINT16),
+            0xc6: (_unpack_bin, _UINT32), 0xd9: (_unpack_str, _UINT8),
+            0xda: (_unpack_str, _UINT16), 0xdb: (_unpack_str, _UINT32),
+            0xdc: (_unpack_array, _UINT16), 0xdd: (_unpack_array, _UINT32),
+            0xde: (_unpack_map, _UINT16), 0xdf: (_unpack_map, _UINT32)}
+
+
+def iter_unpack(file, chunk_size: int = 1 << 16):
+    """Yields the values written one after another to a binary file, reading it
+    in chunks.
+
+    Raises:
+        ValueError: If the data is not valid MessagePack or ends in the middle
+        of a value.
+    """
+    data = b""
+    position = 0
+    eof = False
+    while True:
+        if position >= len(data):
+            if eof:
+                return
+            data, position = file.read(chunk_size), 0
+            eof = not data
+            continue
+        try:
+            value, position = unpack_from(data, position)
+        except IncompleteData:
+            if eof:
+                raise
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            data, position = data[position:] + chunk, 0
+            continue
+        yield value
@@ -0,0 +1,44 @@
+"""MODULE: parallel. Runs a function over the chunks of a list in a process pool.
+
+Used by the batch entry points to spread validation and hashing over several
+cores. Small inputs, or a single worker, are processed in the calling process,
+where starting a pool would cost more than it saves."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Below this number of items the work is done in the calling process
+MIN_PARALLEL_ITEMS = 2000
+# Chunks per worker, so that a slow chunk does not leave the other workers idle
+CHUNKS_PER_WORKER = 4
+
+
+def default_workers() -> int:
+    """Number of worker processes used when none is given: the available cores."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def map_chunks(function, items: list, workers: int = None,
+               min_parallel_items: int = MIN_PARALLEL_ITEMS) -> list:
+    """
+    Applies ``function`` to chunks of ``items`` and returns the concatenated results
+    in input order.
+
+    Args:
+        function: Top level function taking a list of items and returning a list
+            with one result per item (it runs in other processes).
+        items: The items to process.
+        workers: Worker processes (default: the available cores). With 1, or fewer
+            than ``min_parallel_items`` items, no pool is used.
+    """
+    workers = default_workers() if workers is None else max(1, workers)
+    if workers == 1 or len(items) < min_parallel_items:
+        return function(items)
+    chunk_size = -(-len(items) // (workers * CHUNKS_PER_WORKER))
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_results in pool.map(function, chunks):
+            results.extend(chunk_results)
+    return results
@@ -0,0 +1,177 @@
+"""MODULE: record_format. On-disk formats of the store files.
+
+The stores (deposits.json, account_balances.json and the stored_transactions.json
+regenerated from the journal) are written in the selected output format:
+
+    compact   a JSON array without whitespace (the default)
+    jsonl     JSON Lines, one record per line
+    msgpack   MAGIC followed by one MessagePack map per record (see msgpack_codec)
+
+Readers do not need to know which one was used: the format is detected from the
+first bytes of the file ("[" for a JSON array, whatever its layout, "{" for JSON
+Lines and MAGIC for MessagePack). The indent=4 layout the files used to have is
+only written on request, by export_pretty."""
+import json
+import os
+# pylint: disable=import-error
+from uc3m_money import msgpack_codec
+from uc3m_money.json_stream import iter_json_array
+
+COMPACT = "compact"
+JSONL = "jsonl"
+MSGPACK = "msgpack"
+FORMATS = (COMPACT, JSONL, MSGPACK)
+
+# 0xc1 is never used by MessagePack and cannot start a JSON text
+MAGIC = b"\xc1UC3M\x01"
+_WHITESPACE = b" \t\n\r"
+# One encoder for every record: json.dumps builds a new one per call when given
+# separators
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+# Enough of the start of a file to detect its format
+HEAD_SIZE = 64
+
+_FORMAT = [COMPACT]
+
+
+def get_output_format() -> str:
+    """Returns the format the stores are written in."""
+    return _FORMAT[0]
+
+
+def set_output_format(output_format: str):
+    """Selects the format the stores are written in. The files already written
+    are converted the next time they are rewritten.
+
+    Raises:
+        ValueError: If the format is not one of FORMATS.
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    _FORMAT[0] = output_format
+
+
+def encode(records: list, output_format: str = None) -> bytes:
+    """The whole file holding ``records`` in the format (by default the selected one)."""
+    output_format = output_format or _FORMAT[0]
+    if output_format == MSGPACK:
+        return MAGIC + b"".join(msgpack_codec.packb(record) for record in records)
+    if output_format == JSONL:
+        return "".join(encode_line(record) for record in records).encode("utf-8")
+    return _ENCODER.encode(records).encode("utf-8")
+
+
+def encode_line(record) -> str:
+    """A record as a line of a JSON Lines file."""
+    return _ENCODER.encode(record) + "\n"
+
+
+def encode_appended(records: list, output_format: str, empty: bool) -> bytes:
+    """What appending ``records`` adds to a file of the format. For a compact
+    array this goes before the closing bracket, which is written again."""
+    if output_format == MSGPACK:
+        return b"".join(msgpack_codec.packb(record) for record in records)
+    if output_format == JSONL:
+        return "".join(encode_line(record) for record in records).encode("utf-8")
+    body = ",".join(map(_ENCODER.encode, records))
+    return ("" if empty else ",").encode("utf-8") + body.encode("utf-8") + b"]"
+
+
+def detect(head: bytes):
+    """Format of a file starting with ``head``: COMPACT for any JSON array (also an
+    indented one, see is_compact), JSONL, MSGPACK, or None if the file is empty."""
+    if head.startswith(MAGIC[:1]):
+        return MSGPACK
+    head = head.lstrip(_WHITESPACE)
+    if not head:
+        return None
+    if head.startswith(b"{"):
+        return JSONL
+    return COMPACT
+
+
+def is_compact(head: bytes) -> bool:
+    """False if the JSON array starting with ``head`` has whitespace between its
+    first elements, i.e. it was written with an indent."""
+    head = head.lstrip(_WHITESPACE)
+    return head.startswith(b"[{") or head[1:].lstrip(_WHITESPACE).startswith(b"]")
+
+
+def layout(head: bytes):
+    """Format of a file starting with ``head``, with compact JSON arrays told apart
+    from indented ones: returns (format, compact)."""
+    output_format = detect(head)
+    return output_format, output_format != COMPACT or is_compact(head)
+
+
+def decode(data: bytes):
+    """Decodes a whole file of any of the formats. A JSON array or any other JSON
+    value is returned as json.loads would, JSON Lines and MessagePack files as the
+    list of their records.
+
+    Raises:
+        ValueError: If the data is not valid in the detected format
+        (json.JSONDecodeError for the JSON formats).
+    """
+    output_format = detect(data[:HEAD_SIZE])
+    if output_format == MSGPACK:
+        if not data.startswith(MAGIC):
+            raise ValueError("Unknown binary format")
+        return list(_unpack_all(data, len(MAGIC)))
+    # Every line ends with a newline: a JSON object on a single line is not taken
+    # for a file with one record
+    if output_format == JSONL and data.endswith(b"\n"):
+        lines = [line for line in data.splitlines() if line.strip()]
+        try:
+            # Parsed as a single array: one call of the decoder instead of one per line
+            records = json.loads(b"[" + b",".join(lines) + b"]")
+            if len(records) == len(lines):
+                return records
+        except json.JSONDecodeError:
+            # Not one record per line: an indented JSON object
+            pass
+    return json.loads(data)
+
+
+def _unpack_all(data: bytes, position: int):
+    while position < len(data):
+        record, position = msgpack_codec.unpack_from(data, position)
+        yield record
+
+
+def iter_records(path: str):
+    """Yields the records of a store file of any format one at a time, without
+    loading the whole file.
+
+    Raises:
+        ValueError: If the file is not valid in the detected format
+        (json.JSONDecodeError for the JSON formats).
+    """
+    with open(path, "rb") as file:
+        head = file.read(HEAD_SIZE)
+        output_format = detect(head)
+        if output_format == MSGPACK:
+            if not head.startswith(MAGIC):
+                raise ValueError("Unknown binary format")
+            file.seek(len(MAGIC))
+            yield from msgpack_codec.iter_unpack(file)
+            return
+        if output_format == JSONL:
+            file.seek(0)
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+            return
+    # An empty file is reported as iter_json_array always did
+    yield from iter_json_array(path)
+
+
+def export_pretty(source: str, destination: str):
+    """Writes the records of a store file of any format to ``destination`` as a
+    JSON array with indent=4, for people to read. Returns the number of records."""
+    records = list(iter_records(source))
+    directory = os.path.dirname(os.path.abspath(destination))
+    os.makedirs(directory, exist_ok=True)
+    with open(destination, "w", encoding="utf-8") as file:
+        json.dump(records, file, indent=4)  # type: ignore
+    return len(records)
@@ -0,0 +1,253 @@
+"""MODULE: sqlite_storage. SQLite implementation of the storage backend.
+
+Every store is a table of one database in WAL mode, so a new transfer, deposit or
+balance is one INSERT instead of a rewrite of a JSON file, and readers do not
+block the writer. The statements are constant strings run with parameters, so
+sqlite3 prepares each of them once per connection and reuses it. Transfer codes
+have a unique index and the IBAN columns are indexed for the balance queries.
+
+Transfers and deposits keep the same records as the JSON files, stored as JSON
+text next to the indexed columns. The movements of all_transactions.json are
+loaded as integer cents, so the balances are exact sums like in the ledger."""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+# pylint: disable=import-error
+from uc3m_money.record_format import iter_records
+from uc3m_money.money import parse_cents
+from uc3m_money.storage_backend import set_backend
+from uc3m_money.transfer_request import AccountManagementException
+
+DATABASE_NAME = "uc3m_money.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    transfer_code TEXT NOT NULL,
+    from_iban TEXT NOT NULL,
+    to_iban TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS transfers_code ON transfers (transfer_code);
+CREATE INDEX IF NOT EXISTS transfers_from_iban ON transfers (from_iban);
+CREATE INDEX IF NOT EXISTS transfers_to_iban ON transfers (to_iban);
+CREATE TABLE IF NOT EXISTS deposits (
+    deposit_signature TEXT NOT NULL,
+    to_iban TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deposits_to_iban ON deposits (to_iban);
+CREATE TABLE IF NOT EXISTS movements (
+    iban TEXT NOT NULL,
+    cents INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS movements_iban ON movements (iban);
+CREATE TABLE IF NOT EXISTS balances (
+    iban TEXT NOT NULL,
+    amount REAL NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS balances_iban_date ON balances (iban, date);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    signature TEXT NOT NULL
+);
+"""
+
+_INSERT_TRANSFER = ("INSERT INTO transfers (transfer_code, from_iban, to_iban, record) "
+                    "VALUES (?, ?, ?, ?)")
+_FIND_TRANSFER = "SELECT 1 FROM transfers WHERE transfer_code = ?"
+_INSERT_DEPOSIT = "INSERT INTO deposits (deposit_signature, to_iban, record) VALUES (?, ?, ?)"
+_INSERT_MOVEMENT = "INSERT INTO movements (iban, cents) VALUES (?, ?)"
+_FIND_MOVEMENT = "SELECT 1 FROM movements WHERE iban = ? LIMIT 1"
+_IBAN_BALANCE = "SELECT COALESCE(SUM(cents), 0) FROM movements WHERE iban = ?"
+_ALL_BALANCES = "SELECT iban, SUM(cents) FROM movements GROUP BY iban ORDER BY MIN(rowid)"
+_INSERT_BALANCE = "INSERT INTO balances (iban, amount, date) VALUES (?, ?, ?)"
+_LATEST_BALANCE = "SELECT MAX(rowid) FROM balances WHERE iban = ? AND date = ?"
+_UPDATE_BALANCE = "UPDATE balances SET amount = ? WHERE rowid = ?"
+
+
+class SQLiteStorage:
+    """Transfers, deposits, movements and balances stored in one SQLite database."""
+
+    def __init__(self, path: str):
+        self.__path = path
+        self.__local = threading.local()
+        self.__connections = []
+        self.__guard = threading.Lock()
+        with self.connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    @property
+    def path(self):
+        """Path of the database file"""
+        return self.__path
+
+    def connection(self) -> sqlite3.Connection:
+        """Returns the connection of the calling thread, opening it on first use.
+        Every thread has its own connection, WAL lets them read while one writes."""
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.__path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode NORMAL cannot corrupt the database, it only syncs at checkpoints
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__local.connection = connection
+            with self.__guard:
+                self.__connections.append(connection)
+        return connection
+
+    def transfer_store(self):
+        """Returns the store of the transfers, used like the transfer journal."""
+        return SQLiteTransferStore(self)
+
+    def add_deposit(self, record: dict):
+        """Stores one deposit record."""
+        self.add_deposits([record])
+
+    def add_deposits(self, records: list):
+        """Stores several deposit records in one transaction."""
+        rows = [(record["deposit_signature"], record["to_iban"], json.dumps(record))
+                for record in records]
+        with self.connection() as connection:
+            connection.executemany(_INSERT_DEPOSIT, rows)
+
+    def deposits(self) -> list:
+        """Returns the stored deposits in insertion order."""
+        rows = self.connection().execute("SELECT record FROM deposits ORDER BY rowid")
+        return [json.loads(record) for (record,) in rows]
+
+    def refresh_transactions(self, path: str):
+        """Loads the movements of the transactions file, unless they were already
+        loaded from the current contents of the file."""
+        stat = os.stat(path)
+        signature = f"{stat.st_size}:{stat.st_mtime_ns}"
+        key = os.path.abspath(path)
+        row = self.connection().execute("SELECT signature FROM files WHERE path = ?",
+                                        (key,)).fetchone()
+        if row is not None and row[0] == signature:
+            return
+        movements = ((movement["IBAN"], parse_cents(movement["amount"]))
+                     for movement in iter_records(path))
+        with self.connection() as connection:
+            connection.execute("DELETE FROM movements")
+            connection.executemany(_INSERT_MOVEMENT, movements)
+            connection.execute("INSERT OR REPLACE INTO files (path, signature) "
+                               "VALUES (?, ?)", (key, signature))
+
+    def has_movements(self, iban: str) -> bool:
+        """True if the IBAN has movements."""
+        return self.connection().execute(_FIND_MOVEMENT, (iban,)).fetchone() is not None
+
+    def balance_cents(self, iban: str) -> int:
+        """Returns the sum of the movements of the IBAN in cents."""
+        return self.connection().execute(_IBAN_BALANCE, (iban,)).fetchone()[0]
+
+    def balances_cents(self) -> dict:
+        """Returns the sum in cents of the movements of every IBAN."""
+        return dict(self.connection().execute(_ALL_BALANCES))
+
+    def movement_count(self) -> int:
+        """Number of movements loaded."""
+        return self.connection().execute("SELECT COUNT(*) FROM movements").fetchone()[0]
+
+    def add_balances(self, snapshots: list, upsert: bool = False):
+        """Stores balance snapshots. With upsert, a snapshot replaces the latest
+        one stored for its iban and date."""
+        with self.connection() as connection:
+            for snapshot in snapshots:
+                if upsert:
+                    (rowid,) = connection.execute(
+                        _LATEST_BALANCE, (snapshot["iban"], snapshot["date"])).fetchone()
+                    if rowid is not None:
+                        connection.execute(_UPDATE_BALANCE, (snapshot["amount"], rowid))
+                        continue
+                connection.execute(_INSERT_BALANCE, (snapshot["iban"],
+                                                     snapshot["amount"], snapshot["date"]))
+
+    def balances(self) -> list:
+        """Returns the stored balance snapshots in insertion order."""
+        rows = self.connection().execute("SELECT iban, amount, date FROM balances ORDER BY rowid")
+        return [{"iban": iban, "amount": amount, "date": day} for iban, amount, day in rows]
+
+    def close(self):
+        """Closes the connections of every thread."""
+        with self.__guard:
+            for connection in self.__connections:
+                connection.close()
+            self.__connections.clear()
+        self.__local = threading.local()
+
+
+class SQLiteTransferStore:
+    """The transfers table, with the methods of the transfer journal."""
+
+    def __init__(self, storage: SQLiteStorage):
+        self.__storage = storage
+
+    def __contains__(self, transfer_code: str) -> bool:
+        connection = self.__storage.connection()
+        return connection.execute(_FIND_TRANSFER, (transfer_code,)).fetchone() is not None
+
+    def has_transfer(self, transfer_code: str, transfer_date: str) -> bool:
+        """True if the transfer is stored. The table only needs the code."""
+        # pylint: disable=unused-argument
+        return transfer_code in self
+
+    @contextmanager
+    def locked(self):
+        """Holds the database write lock (BEGIN IMMEDIATE) so the duplicate checks
+        and the appends done meanwhile are one transaction: no other process can
+        store a transfer in between. Committed on exit, rolled back on an error."""
+        connection = self.__storage.connection()
+        if connection.in_transaction:
+            # Already inside the transaction of an outer locked()
+            yield self
+            return
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
+
+    def records(self):
+        """Yields the stored transfers in insertion order."""
+        connection = self.__storage.connection()
+        for (record,) in connection.execute("SELECT record FROM transfers ORDER BY rowid"):
+            yield json.loads(record)
+
+    def append(self, record: dict):
+        """Stores one transfer."""
+        self.append_many([record])
+
+    def append_many(self, records: list):
+        """Stores several transfers in one transaction: all of them or none. Inside
+        locked() they are committed with its transaction."""
+        rows = [(record["transfer_code"], record["from_iban"], record["to_iban"],
+                 json.dumps(record)) for record in records]
+        connection = self.__storage.connection()
+        try:
+            if connection.in_transaction:
+                connection.executemany(_INSERT_TRANSFER, rows)
+            else:
+                with connection:
+                    connection.executemany(_INSERT_TRANSFER, rows)
+        except sqlite3.IntegrityError as exc:
+            # A transfer already stored, appended without checking it under locked()
+            raise AccountManagementException("Output JSON file already has that transfer") from exc
+
+    def sync(self):
+        """Nothing to do, every append is committed."""
+
+
+def use_sqlite_storage(path: str = None) -> SQLiteStorage:
+    """Makes the entry points store their data in an SQLite database (by default
+    uc3m_money.sqlite3 next to the JSON files) and returns it."""
+    if path is None:
+        path = os.path.join(os.path.dirname(__file__), "..", "..", DATABASE_NAME)
+    storage = SQLiteStorage(path)
+    set_backend(storage)
+    return storage
@@ -0,0 +1,34 @@
+"""MODULE: storage_backend. Selects where the transfers, deposits and balances are stored.
+
+By default there is no backend and every entry point keeps using the JSON files
+(stored_transactions.json through its journal, deposits.json, all_transactions.json
+and account_balances.json). A backend is any object with the methods of
+sqlite_storage.SQLiteStorage:
+
+    transfer_store()                    journal-like store of the transfers
+    add_deposit(record)                 stores one deposit
+    add_deposits(records)               stores several deposits at once
+    refresh_transactions(path)          loads the movements of all_transactions.json
+    has_movements(iban)                 True if the IBAN has movements
+    balance_cents(iban)                 sum of the movements of the IBAN in cents
+    balances_cents()                    the same for every IBAN
+    movement_count()                    number of movements loaded
+    add_balances(snapshots, upsert)     stores balance snapshots
+    close()
+"""
+
+_BACKEND = [None]
+
+
+def get_backend():
+    """Returns the selected storage backend, or None when the JSON files are used."""
+    return _BACKEND[0]
+
+
+def set_backend(backend):
+    """Selects the storage backend (None goes back to the JSON files). The previous
+    backend is closed."""
+    previous = _BACKEND[0]
+    _BACKEND[0] = backend
+    if previous is not None and previous is not backend:
+        previous.close()
@@ -0,0 +1,107 @@
+"""MODULE: store_commands. Maintenance commands for the store files.
+
+    python -m uc3m_money.store_commands export deposits.json deposits.pretty.json
+        writes a store file of any format as indented JSON, for people to read
+    python -m uc3m_money.store_commands convert --format msgpack deposits.json
+        rewrites a store file in another output format
+    python -m uc3m_money.store_commands compact stored_transactions.json
+        merges the month partitions of the transfers of past years (run it offline)
+    python -m uc3m_money.store_commands export-transfers stored_transactions.json
+        writes the stored transfers as the legacy stored_transactions.json array
+"""
+import argparse
+import sys
+from datetime import date
+# pylint: disable=import-error
+from uc3m_money import record_format
+from uc3m_money.file_lock import file_lock
+from uc3m_money.json_array_store import write_json_array
+from uc3m_money.transfer_journal import PartitionedTransferStore
+
+
+def export(source: str, destination: str) -> int:
+    """Writes the store file ``source`` as indented JSON. Returns the number of records."""
+    with file_lock(source):
+        return record_format.export_pretty(source, destination)
+
+
+def convert(path: str, output_format: str) -> int:
+    """Rewrites the store file in ``output_format``. Returns the number of records.
+
+    Raises:
+        ValueError: If the format is unknown or the file cannot be read.
+    """
+    if output_format not in record_format.FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    with file_lock(path):
+        records = list(record_format.iter_records(path))
+        write_json_array(path, records, output_format)
+    return len(records)
+
+
+def compact(legacy_path: str, before_year: int = None) -> list:
+    """Merges the month partitions of the transfers stored next to ``legacy_path``
+    of the years before ``before_year`` (by default the current one). Returns the
+    names of the year partitions written."""
+    store = PartitionedTransferStore(legacy_path)
+    try:
+        return store.compact(before_year or date.today().year)
+    finally:
+        store.close()
+
+
+def export_transfers(legacy_path: str, destination: str = None) -> int:
+    """Writes the transfers stored next to ``legacy_path`` as the legacy JSON array,
+    over ``legacy_path`` or to ``destination``. Returns the number of records."""
+    store = PartitionedTransferStore(legacy_path)
+    try:
+        return store.export_legacy(destination)
+    finally:
+        store.close()
+
+
+def main(argv=None) -> int:
+    """Runs a command, returns the exit status"""
+    parser = argparse.ArgumentParser(prog="python -m uc3m_money.store_commands",
+                                     description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write a store file as indented JSON")
+    export_parser.add_argument("source")
+    export_parser.add_argument("destination")
+    convert_parser = commands.add_parser("convert", help="rewrite a store file in a format")
+    convert_parser.add_argument("--format", choices=record_format.FORMATS, required=True)
+    convert_parser.add_argument("path")
+    compact_parser = commands.add_parser("compact", help="merge the month partitions "
+                                         "of the transfers of past years")
+    compact_parser.add_argument("--before-year", type=int,
+                                help="merge the years before this one (default: this year)")
+    compact_parser.add_argument("legacy_path", metavar="stored_transactions.json")
+    transfers_parser = commands.add_parser("export-transfers", help="write the stored "
+                                           "transfers as the legacy JSON array")
+    transfers_parser.add_argument("legacy_path", metavar="stored_transactions.json")
+    transfers_parser.add_argument("destination", nargs="?",
+                                  help="file to write (default: stored_transactions.json)")
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "export":
+            count = export(args.source, args.destination)
+            print(f"{count} records exported to {args.destination}")
+        elif args.command == "compact":
+            years = compact(args.legacy_path, args.before_year)
+            print(f"compacted years: {', '.join(years) or 'none'}")
+        elif args.command == "export-transfers":
+            destination = args.destination or args.legacy_path
+            count = export_transfers(args.legacy_path, args.destination)
+            print(f"{count} transfers exported to {destination}")
+        else:
+            count = convert(args.path, args.format)
+            print(f"{count} records written to {args.path} as {args.format}")
+    except (OSError, ValueError) as exception:
+        print(f"error: {exception}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""MODULE: transfer_index. On-disk hash set of the stored transfer codes.
+
+The index is an open addressing table of 16 byte keys kept in a sidecar file next
+to the transfer journal. It is memory-mapped the first time it is needed, so a
+duplicate check touches a couple of slots whatever the number of stored transfers.
+The header remembers how many bytes of the journal are already indexed, which
+lets the index catch up with transfers appended while it was not up to date."""
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+INDEX_SUFFIX = ".idx"
+MIN_CAPACITY = 1024
+
+_HEADER = struct.Struct("<4sIQQQ")  # magic, version, capacity, count, journal offset
+_MAGIC = b"TIDX"
+_VERSION = 1
+_SLOT_SIZE = 16
+_EMPTY = bytes(_SLOT_SIZE)
+
+
+def _key(code: str) -> bytes:
+    """Fixed size key stored in the table for a transfer code"""
+    return hashlib.blake2b(code.encode(), digest_size=_SLOT_SIZE).digest()
+
+
+class TransferCodeIndex:
+    """Memory-mapped hash set of transfer codes, loaded lazily."""
+
+    def __init__(self, path: str, journal_path: str):
+        self.__path = path
+        self.__journal_path = journal_path
+        self.__file = None
+        self.__map = None
+        self.__capacity = 0
+        self.__count = 0
+
+    @property
+    def path(self):
+        """Path of the index file"""
+        return self.__path
+
+    def __len__(self):
+        self.__load()
+        return self.__count
+
+    def __contains__(self, code: str) -> bool:
+        self.__load()
+        return self.__find(_key(code))[1]
+
+    def add(self, code: str) -> bool:
+        """Adds a transfer code, returning False if it was already indexed."""
+        self.__load()
+        return self.__insert(_key(code))
+
+    def mark_journal_offset(self, offset: int):
+        """Records that the journal is indexed up to ``offset`` bytes."""
+        self.__load()
+        self.__write_header(offset)
+
+    def flush(self):
+        """Writes the mapped pages back to the file."""
+        if self.__map is not None:
+            self.__map.flush()
+
+    def refresh(self):
+        """Picks up the transfers indexed or appended by other processes since the
+        index was loaded. Call it while holding the journal lock."""
+        if self.__map is None:
+            return
+        try:
+            replaced = os.stat(self.__path).st_ino != os.fstat(self.__file.fileno()).st_ino
+        except FileNotFoundError:
+            replaced = True
+        if replaced:
+            # Another process grew or rebuilt the index, it is mapped again when needed
+            self.__unmap()
+            return
+        _, _, _, self.__count, offset = _HEADER.unpack_from(self.__map, 0)
+        journal_size = 0
+        if os.path.exists(self.__journal_path):
+            journal_size = os.path.getsize(self.__journal_path)
+        if offset > journal_size:
+            self.rebuild()
+        elif offset < journal_size:
+            self.__catch_up(offset)
+
+    def close(self):
+        """Flushes and unmaps the index."""
+        if self.__map is not None:
+            self.__map.flush()
+        self.__unmap()
+
+    def __unmap(self):
+        if self.__map is not None:
+            self.__map.close()
+            self.__file.close()
+        self.__map = None
+        self.__file = None
+
+    def rebuild(self):
+        """Recreates the index from the whole journal."""
+        self.close()
+        self.__create(MIN_CAPACITY, 0)
+        self.__catch_up(0)
+
+    def __load(self):
+        if self.__map is not None:
+            return
+        journal_size = 0
+        if os.path.exists(self.__journal_path):
+            journal_size = os.path.getsize(self.__journal_path)
+        offset = self.__open_existing()
+        if offset is None or offset > journal_size:
+            # Missing, corrupt or ahead of a journal that was replaced: start again
+            self.close()
+            self.__create(MIN_CAPACITY, 0)
+            offset = 0
+        if offset < journal_size:
+            self.__catch_up(offset)
+
+    def __open_existing(self):
+        """Maps the existing index file, returning its journal offset or None."""
+        if not os.path.exists(self.__path) or os.path.getsize(self.__path) < _HEADER.size:
+            return None
+        self.__map_file()
+        magic, version, capacity, count, offset = _HEADER.unpack_from(self.__map, 0)
+        expected_size = _HEADER.size + capacity * _SLOT_SIZE
+        if magic != _MAGIC or version != _VERSION or len(self.__map) != expected_size:
+            return None
+        self.__capacity = capacity
+        self.__count = count
+        return offset
+
+    def __create(self, capacity: int, offset: int, keys=()):
+        temp_path = self.__path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, capacity, 0, offset))
+            f.truncate(_HEADER.size + capacity * _SLOT_SIZE)
+        os.replace(temp_path, self.__path)
+        self.__map_file()
+        self.__capacity = capacity
+        self.__count = 0
+        for key in keys:
+            self.__insert(key)
+        self.__write_header(offset)
+
+    def __map_file(self):
+        self.__file = open(self.__path, "r+b")  # pylint: disable=consider-using-with
+        self.__map = mmap.mmap(self.__file.fileno(), 0)
+
+    def __catch_up(self, start: int):
+        """Indexes the complete journal lines written after ``start``."""
+        offset = start
+        for code, offset in journal_codes(self.__journal_path, start):
+            if code is not None:
+                self.__insert(_key(code))
+        self.__write_header(offset)
+
+    def __find(self, key: bytes):
+        """Returns the slot of ``key`` (or the empty slot where it would go) and
+        whether it was found."""
+        mask = self.__capacity - 1
+        position = int.from_bytes(key[:8], "little") & mask
+        while True:
+            start = _HEADER.size + position * _SLOT_SIZE
+            slot = self.__map[start:start + _SLOT_SIZE]
+            if slot == key:
+                return start, True
+            if slot == _EMPTY:
+                return start, False
+            position = (position + 1) & mask
+
+    def __insert(self, key: bytes) -> bool:
+        if (self.__count + 1) * 2 > self.__capacity:
+            self.__grow()
+        start, found = self.__find(key)
+        if found:
+            return False
+        self.__map[start:start + _SLOT_SIZE] = key
+        self.__count += 1
+        return True
+
+    def __grow(self):
+        """Doubles the capacity, reinserting the current keys."""
+        keys = []
+        for position in range(self.__capacity):
+            start = _HEADER.size + position * _SLOT_SIZE
+            slot = self.__map[start:start + _SLOT_SIZE]
+            if slot != _EMPTY:
+                keys.append(slot)
+        offset = _HEADER.unpack_from(self.__map, 0)[4]
+        self.close()
+        self.__create(self.__capacity * 2, offset, keys)
+
+    def __write_header(self, offset: int):
+        _HEADER.pack_into(self.__map, 0, _MAGIC, _VERSION,
+                          self.__capacity, self.__count, offset)
+
+
+def journal_codes(journal_path: str, offset: int):
+    """Yields the transfer code (None if the record has none) of every complete
+    journal line written after ``offset``, with the offset where the line ends."""
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            yield (json.loads(line).get("transfer_code") if line.strip() else None), offset
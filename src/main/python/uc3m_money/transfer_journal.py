@@ -0,0 +1,539 @@
+"""MODULE: transfer_journal. Append-only storage for the processed transfers.
+
+Every transfer is written as a single JSON line to ``stored_transactions.jsonl``,
+so storing a transfer costs the size of that transfer instead of a rewrite of the
+whole history. The old ``stored_transactions.json`` array is migrated into the
+journal the first time it is opened and is not written afterwards: the consumers
+read the stored transfers with read_transactions(), and the array can be
+regenerated on demand with the ``export-transfers`` command (see store_commands).
+The journal keeps a transfer code index (see transfer_index) up to date, so
+duplicate checks do not need to read the stored transfers, and a Bloom filter
+(see bloom_filter) that answers most of them without a lookup in the index. Several processes
+can share a journal: a check and the append that follows it are done while
+holding the journal lock (see file_lock).
+
+The transfers are kept in a PartitionedTransferStore: a directory
+``stored_transactions.partitions`` with one journal, and its own small code index,
+per month of ``transfer_date``. The transfer code is computed from the transfer
+date, so a stored duplicate is always in the partition of its month and storing a
+transfer only touches that partition. compact() merges the months of past years
+into one partition per year."""
+import atexit
+import json
+import os
+import re
+import shutil
+from contextlib import contextmanager, ExitStack
+# pylint: disable=import-error
+from uc3m_money.transfer_index import TransferCodeIndex, INDEX_SUFFIX
+from uc3m_money.bloom_filter import TransferCodeFilter, BLOOM_SUFFIX
+from uc3m_money.json_array_store import load_json_array, write_json_array
+from uc3m_money.record_format import iter_records
+from uc3m_money.file_lock import file_lock, LOCK_SUFFIX
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money import metrics
+
+JOURNAL_SUFFIX = ".jsonl"
+PARTITIONS_SUFFIX = ".partitions"
+DEFAULT_SYNC_EVERY = 32
+# Partition of the records whose transfer_date is not a dd/mm/yyyy date
+UNDATED = "undated"
+_TRANSFER_DATE = re.compile(r"\d\d/(\d\d)/(\d{4})\Z")
+_DATED_PARTITION = re.compile(r"(\d{4})(-\d\d)?\Z")
+
+
+class TransferJournal:
+    """Append-only JSON Lines store for transfer records."""
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, legacy_path: str, sync_every: int = DEFAULT_SYNC_EVERY):
+        self.__legacy_path = legacy_path
+        base_path = os.path.splitext(legacy_path)[0]
+        self.__path = base_path + JOURNAL_SUFFIX
+        self.__index = TransferCodeIndex(base_path + INDEX_SUFFIX, self.__path)
+        self.__filter = TransferCodeFilter(base_path + BLOOM_SUFFIX, self.__path)
+        self.__sync_every = max(1, sync_every)
+        self.__pending = 0
+        self.__file = None
+        # Size of the journal after the last append of this object, which ends in a
+        # complete line
+        self.__end = None
+        self.migrate()
+
+    @property
+    def path(self):
+        """Path of the journal file"""
+        return self.__path
+
+    @property
+    def legacy_path(self):
+        """Path of the legacy JSON array file"""
+        return self.__legacy_path
+
+    def __contains__(self, transfer_code: str) -> bool:
+        # Nearly every transfer is new: the filter tells so without the index
+        if not self.__filter.might_contain(transfer_code):
+            return False
+        stored = transfer_code in self.__index
+        self.__filter.exact_lookup(stored)
+        return stored
+
+    def has_transfer(self, transfer_code: str, transfer_date: str) -> bool:
+        """True if the transfer is stored. The journal only needs the code."""
+        # pylint: disable=unused-argument
+        return transfer_code in self
+
+    @contextmanager
+    def locked(self):
+        """Holds the journal lock, with the index up to date with the transfers
+        appended by other processes."""
+        with file_lock(self.__path):
+            self.__index.refresh()
+            self.__filter.refresh()
+            yield self
+
+    def migrate(self) -> int:
+        """
+        Copies the legacy JSON array into the journal, only if there is no journal yet.
+
+        Returns:
+            int: Number of records migrated.
+        """
+        with file_lock(self.__path):
+            if os.path.exists(self.__path) or not os.path.exists(self.__legacy_path):
+                return 0
+            return self.__migrate()
+
+    def __migrate(self) -> int:
+        migrated = 0
+        temp_path = self.__path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for record in _legacy_records(self.__legacy_path):
+                    f.write(_encode(record))
+                    migrated += 1
+                f.flush()
+                os.fsync(f.fileno())
+        except AccountManagementException:
+            os.remove(temp_path)
+            raise
+        os.replace(temp_path, self.__path)
+        return migrated
+
+    def records(self):
+        """Yields the stored records in insertion order.
+        A torn last line (left by a crash in the middle of a write) is ignored."""
+        if not os.path.exists(self.__path):
+            return
+        if self.__file is not None:
+            self.__file.flush()
+        with open(self.__path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    return
+                if line.strip():
+                    yield json.loads(line)
+
+    def append(self, record: dict):
+        """Appends one record, syncing to disk every ``sync_every`` records."""
+        self.append_many([record])
+
+    def append_many(self, records: list) -> int:
+        """Appends several records with a single write. If the write fails the journal
+        is truncated back, so either all the records are stored or none of them.
+        Returns the journal offset the records were written at, see truncate."""
+        if not records:
+            return None
+        with self.locked():
+            return self.__append_many(records)
+
+    def truncate(self, offset: int):
+        """Drops the records appended from ``offset`` on, undoing an append_many.
+        The index and the filter are rebuilt. Call it while holding the journal lock."""
+        if self.__file is not None:
+            self.__discard_handle()
+        os.truncate(self.__path, offset)
+        self.__end = offset
+        self.__index.rebuild()
+        self.__filter.rebuild()
+
+    def __append_many(self, records: list) -> int:
+        handle = self.__handle()
+        start = os.fstat(handle.fileno()).st_size
+        if start != self.__end:
+            # Written by another process, or by a crash: a torn last line would be
+            # glued to the first record, so it is cut off
+            start = _cut_torn_line(self.__path, start)
+        try:
+            handle.write("".join(_encode(record) for record in records))
+            handle.flush()
+        except OSError:
+            self.__discard_handle()
+            os.truncate(self.__path, start)
+            raise
+        for record in records:
+            self.__index.add(record["transfer_code"])
+            self.__filter.add(record["transfer_code"])
+        end = os.fstat(handle.fileno()).st_size
+        self.__end = end
+        self.__index.mark_journal_offset(end)
+        self.__filter.mark_journal_offset(end)
+        metrics.count("bytes_written", self.__path, end - start)
+        self.__pending += len(records)
+        if self.__pending >= self.__sync_every:
+            self.sync()
+        return start
+
+    def sync(self):
+        """Forces the pending appends to disk."""
+        if self.__file is not None and self.__pending:
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__index.flush()
+        self.__pending = 0
+
+    def export_legacy(self, path: str = None) -> int:
+        """Writes the journal contents as the legacy JSON array (by default over
+        ``stored_transactions.json``). Returns the number of records."""
+        with file_lock(self.__path):
+            records = list(self.records())
+            write_json_array(path or self.__legacy_path, records)
+        return len(records)
+
+    def close(self):
+        """Syncs the journal and closes its file, index and filter."""
+        self.sync()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        self.__index.close()
+        self.__filter.close()
+
+    def __discard_handle(self):
+        try:
+            self.__file.close()
+        except OSError:
+            pass
+        self.__file = None
+        self.__pending = 0
+
+    def __handle(self):
+        if self.__file is None:
+            self.__file = open(self.__path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+        return self.__file
+
+
+def _cut_torn_line(path: str, size: int) -> int:
+    """Truncates the journal after its last complete line. Returns the new size."""
+    with open(path, "rb") as f:
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+    if end != size:
+        os.truncate(path, end)
+    return end
+
+
+def _encode(record: dict) -> str:
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def partition_name(transfer_date: str) -> str:
+    """Month partition of a transfer date ("24/03/2025" is "2025-03")."""
+    found = _TRANSFER_DATE.match(transfer_date) if isinstance(transfer_date, str) else None
+    if found is None:
+        return UNDATED
+    return f"{found.group(2)}-{found.group(1)}"
+
+
+class PartitionedTransferStore:
+    """Transfer store split into one journal per month of transfer_date, with the
+    methods of TransferJournal. The journals are opened when first needed."""
+
+    def __init__(self, legacy_path: str, sync_every: int = DEFAULT_SYNC_EVERY):
+        self.__legacy_path = legacy_path
+        self.__path = os.path.splitext(legacy_path)[0] + PARTITIONS_SUFFIX
+        self.__sync_every = sync_every
+        self.__partitions = {}
+        self.migrate()
+
+    @property
+    def path(self):
+        """Path of the partitions directory"""
+        return self.__path
+
+    @property
+    def legacy_path(self):
+        """Path of the legacy JSON array file"""
+        return self.__legacy_path
+
+    def partition_names(self) -> list:
+        """Names of the stored partitions, oldest first ("2024" is a compacted year)."""
+        if not os.path.isdir(self.__path):
+            return []
+        return sorted(name[:-len(JOURNAL_SUFFIX)] for name in os.listdir(self.__path)
+                      if name.endswith(JOURNAL_SUFFIX))
+
+    def partition(self, name: str) -> TransferJournal:
+        """The journal of a partition, opened on first use."""
+        journal = self.__partitions.get(name)
+        if journal is None:
+            journal = TransferJournal(os.path.join(self.__path, name + ".json"),
+                                        self.__sync_every)
+            self.__partitions[name] = journal
+        return journal
+
+    def __partition_of(self, transfer_date: str) -> TransferJournal:
+        """The partition a transfer of that date is stored in: its year once the
+        months of the year were compacted, its month otherwise."""
+        name = partition_name(transfer_date)
+        year = name[:4]
+        if name != UNDATED and os.path.exists(os.path.join(self.__path,
+                                                           year + JOURNAL_SUFFIX)):
+            name = year
+        return self.partition(name)
+
+    def __contains__(self, transfer_code: str) -> bool:
+        # Without the date every partition has to be looked at, see has_transfer
+        for name in self.partition_names():
+            journal = self.partition(name)
+            with journal.locked():
+                if transfer_code in journal:
+                    return True
+        return False
+
+    def has_transfer(self, transfer_code: str, transfer_date: str) -> bool:
+        """True if the transfer is stored, looking only at the partition of its date."""
+        journal = self.__partition_of(transfer_date)
+        with journal.locked():
+            return transfer_code in journal
+
+    @contextmanager
+    def locked(self):
+        """Holds the store lock, so no other process stores or compacts meanwhile."""
+        with file_lock(self.__path):
+            yield self
+
+    def migrate(self) -> int:
+        """
+        Splits the journal, or the legacy JSON array if there is no journal, into
+        partitions, only if there are no partitions yet.
+
+        Returns:
+            int: Number of records migrated.
+        """
+        with file_lock(self.__path):
+            if os.path.isdir(self.__path):
+                return 0
+            return self.__migrate()
+
+    def __migrate(self) -> int:
+        base_path = os.path.splitext(self.__legacy_path)[0]
+        journal_path = base_path + JOURNAL_SUFFIX
+        if os.path.exists(journal_path):
+            records = TransferJournal(self.__legacy_path).records()
+        elif os.path.exists(self.__legacy_path):
+            records = _legacy_records(self.__legacy_path)
+        else:
+            records = []
+        temp_path = self.__path + ".tmp"
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+        try:
+            migrated = _write_partitions(temp_path, records)
+        except AccountManagementException:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+        os.rename(temp_path, self.__path)
+        # The partitions replace the journal, the legacy array is kept for its readers
+        for path in (journal_path, base_path + INDEX_SUFFIX, base_path + BLOOM_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+        return migrated
+
+    def records(self):
+        """Yields the stored records, partition by partition from the oldest one
+        and in insertion order within a partition."""
+        for name in self.partition_names():
+            yield from self.partition(name).records()
+
+    def append(self, record: dict):
+        """Appends one record to the partition of its date."""
+        self.append_many([record])
+
+    def append_many(self, records: list):
+        """Appends several records, with a single write per partition. If a partition
+        cannot be written the ones already written are truncated back, so either all
+        the records are stored or none of them."""
+        groups = {}
+        for record in records:
+            journal = self.__partition_of(record.get("transfer_date"))
+            groups.setdefault(journal.path, (journal, []))[1].append(record)
+        # The partitions are locked in path order, so two batches cannot deadlock,
+        # and kept locked until every one of them is written
+        with ExitStack() as stack:
+            for path in sorted(groups):
+                stack.enter_context(groups[path][0].locked())
+            written = []
+            try:
+                for path in sorted(groups):
+                    journal, group = groups[path]
+                    written.append((journal, journal.append_many(group)))
+            except OSError:
+                for journal, offset in written:
+                    journal.truncate(offset)
+                raise
+
+    def sync(self):
+        """Forces the pending appends of every open partition to disk."""
+        for journal in self.__partitions.values():
+            journal.sync()
+
+    def compact(self, before_year: int) -> list:
+        """
+        Merges the month partitions of the years before ``before_year`` into one
+        partition per year, rewritten without torn lines or repeated codes. Meant
+        to be run offline, while no other process is storing transfers.
+
+        Returns:
+            list: Names of the year partitions written.
+        """
+        with self.locked():
+            years = {}
+            for name in self.partition_names():
+                dated = _DATED_PARTITION.match(name)
+                if dated is not None and int(dated.group(1)) < before_year:
+                    years.setdefault(dated.group(1), []).append(name)
+            for year, names in sorted(years.items()):
+                self.__compact_year(year, names)
+            return sorted(years)
+
+    def __compact_year(self, year: str, names: list):
+        codes = set()
+        merged = []
+        for name in names:
+            for record in self.partition(name).records():
+                if record.get("transfer_code") not in codes:
+                    codes.add(record.get("transfer_code"))
+                    merged.append(record)
+        self.__close_partitions()
+        temp_path = os.path.join(self.__path, year + JOURNAL_SUFFIX + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write("".join(_encode(record) for record in merged))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, os.path.join(self.__path, year + JOURNAL_SUFFIX))
+        # The index and filter of the year are rebuilt when needed, the months are
+        # gone for good
+        for name in names:
+            _remove(os.path.join(self.__path, name + INDEX_SUFFIX))
+            _remove(os.path.join(self.__path, name + BLOOM_SUFFIX))
+            if name != year:
+                journal_path = os.path.join(self.__path, name + JOURNAL_SUFFIX)
+                _remove(journal_path)
+                _remove(journal_path + LOCK_SUFFIX)
+
+    def export_legacy(self, path: str = None) -> int:
+        """Writes every stored transfer as the legacy JSON array (by default over
+        ``stored_transactions.json``). Returns the number of records."""
+        with self.locked():
+            records = list(self.records())
+            write_json_array(path or self.__legacy_path, records)
+        return len(records)
+
+    def close(self):
+        """Closes the partitions."""
+        self.__close_partitions()
+
+    def __close_partitions(self):
+        for journal in self.__partitions.values():
+            journal.close()
+        self.__partitions.clear()
+
+
+def _legacy_records(legacy_path: str):
+    """
+    Yields the records of the legacy array.
+
+    Raises:
+        AccountManagementException: If the file is broken. Taking it for an empty
+            list would accept every stored transfer code again, so nothing is
+            migrated and the file is left as it is for an operator to repair.
+    """
+    try:
+        yield from iter_records(legacy_path)
+    except ValueError as exception:
+        raise AccountManagementException(
+            f"The stored transfers file is not in JSON format: {legacy_path}") from exception
+
+
+def _write_partitions(directory: str, records) -> int:
+    """Writes the records to one journal per month in ``directory``."""
+    files = {}
+    written = 0
+    try:
+        for record in records:
+            name = partition_name(record.get("transfer_date"))
+            if name not in files:
+                files[name] = open(os.path.join(directory, name + JOURNAL_SUFFIX),  # pylint: disable=consider-using-with
+                                   "w", encoding="utf-8")
+            files[name].write(_encode(record))
+            written += 1
+        for file in files.values():
+            file.flush()
+            os.fsync(file.fileno())
+    finally:
+        for file in files.values():
+            file.close()
+    return written
+
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+_JOURNALS = {}
+
+
+def open_journal(legacy_path: str) -> TransferJournal:
+    """Returns the shared journal for the given legacy file, opening it on first use."""
+    key = os.path.abspath(legacy_path)
+    if key not in _JOURNALS:
+        _JOURNALS[key] = TransferJournal(key)
+    return _JOURNALS[key]
+
+
+def open_partitioned_store(legacy_path: str) -> PartitionedTransferStore:
+    """Returns the shared partitioned store for the given legacy file, opening it
+    (and migrating the journal or the legacy array into it) on first use."""
+    key = os.path.abspath(legacy_path)
+    store_key = os.path.splitext(key)[0] + PARTITIONS_SUFFIX
+    if store_key not in _JOURNALS:
+        _JOURNALS[store_key] = PartitionedTransferStore(key)
+    return _JOURNALS[store_key]
+
+
+def read_transactions(legacy_path: str) -> list:
+    """Compatibility reader: returns the stored transfers as the list that
+    ``stored_transactions.json`` used to hold, whichever format is on disk."""
+    base_path = os.path.splitext(legacy_path)[0]
+    if os.path.isdir(base_path + PARTITIONS_SUFFIX):
+        return list(open_partitioned_store(legacy_path).records())
+    if os.path.exists(base_path + JOURNAL_SUFFIX):
+        return list(open_journal(legacy_path).records())
+    return load_json_array(legacy_path)
+
+
+@atexit.register
+def close_journals():
+    """Closes every open journal (called automatically at exit)."""
+    for journal in _JOURNALS.values():
+        journal.close()
+    _JOURNALS.clear()
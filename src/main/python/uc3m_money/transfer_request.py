@@ -3,6 +3,14 @@ import hashlib
 import json
 import os
 from datetime import datetime, timezone
+# pylint: disable=import-error
+from uc3m_money.transfer_journal import open_partitioned_store
+from uc3m_money.storage_backend import get_backend
+from uc3m_money.money import cents_to_float
+from uc3m_money.validation import (parse_date, parse_transfer_amount, valid_iban,
+                                   TRANSFER_TYPES)
+from uc3m_money.parallel import map_chunks
+from uc3m_money import metrics
 
 class AccountManagementException(Exception):
     """Exception to be raised for account management errors."""
@@ -12,6 +20,11 @@ class TransferRequest:
     """Class representing a transfer request."""
     # pylint: disable=too-many-positional-arguments
     # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-instance-attributes
+    # Slots instead of an instance __dict__, batches keep many of them in memory
+    __slots__ = ("__from_iban", "__to_iban", "__transfer_type", "__transfer_concept",
+                 "__transfer_date", "__transfer_amount", "__time_stamp", "__transfer_code")
+
     def __init__(self,
                  from_iban: str,
                  transfer_type: str,
@@ -27,9 +40,19 @@ class TransferRequest:
         self.__transfer_amount = transfer_amount
         justnow = datetime.now(timezone.utc)
         self.__time_stamp = datetime.timestamp(justnow)
+        self.__transfer_code = None
 
     def __str__(self):
-        return "Transfer:" + json.dumps(self.__dict__)
+        # The keys are the attribute names the transfer code has always been computed from
+        return "Transfer:" + json.dumps({
+            "_TransferRequest__from_iban": self.__from_iban,
+            "_TransferRequest__to_iban": self.__to_iban,
+            "_TransferRequest__transfer_type": self.__transfer_type,
+            "_TransferRequest__transfer_concept": self.__transfer_concept,
+            "_TransferRequest__transfer_date": self.__transfer_date,
+            "_TransferRequest__transfer_amount": self.__transfer_amount,
+            "_TransferRequest__time_stamp": self.__time_stamp
+        })
 
     def to_json(self):
         """Returns the object information in JSON format."""
@@ -52,6 +75,7 @@ class TransferRequest:
     @from_iban.setter
     def from_iban(self, value):
         self.__from_iban = value
+        self.__transfer_code = None
 
     @property
     def to_iban(self):
@@ -61,6 +85,7 @@ class TransferRequest:
     @to_iban.setter
     def to_iban(self, value):
         self.__to_iban = value
+        self.__transfer_code = None
 
     @property
     def transfer_type(self):
@@ -70,6 +95,7 @@ class TransferRequest:
     @transfer_type.setter
     def transfer_type(self, value):
         self.__transfer_type = value
+        self.__transfer_code = None
 
     @property
     def transfer_amount(self):
@@ -79,6 +105,7 @@ class TransferRequest:
     @transfer_amount.setter
     def transfer_amount(self, value):
         self.__transfer_amount = value
+        self.__transfer_code = None
 
     @property
     def transfer_concept(self):
@@ -88,6 +115,7 @@ class TransferRequest:
     @transfer_concept.setter
     def transfer_concept(self, value):
         self.__transfer_concept = value
+        self.__transfer_code = None
 
     @property
     def transfer_date(self):
@@ -97,6 +125,7 @@ class TransferRequest:
     @transfer_date.setter
     def transfer_date(self, value):
         self.__transfer_date = value
+        self.__transfer_code = None
 
     @property
     def time_stamp(self):
@@ -105,28 +134,16 @@ class TransferRequest:
 
     @property
     def transfer_code(self):
-        """Returns the MD5 signature (transfer code)"""
-        return hashlib.md5(str(self).encode()).hexdigest()
-
-def valid_iban(iban: str) -> bool:
-    """
-    Validate IBAN format.
-    When check_spanish is True, enforce Spanish IBAN rules:
-      - Must start with 'ES'
-      - Must be exactly 24 characters long
-      - Characters after 'ES' must be all digits
-    When False, a generic IBAN is expected:
-      - At least 15 characters and at most 34
-      - Must be alphanumeric
-    """
-
-    return iban.startswith("ES") and (len(iban) == 24) and iban[2:].isdigit()
+        """Returns the MD5 signature (transfer code), computed once until a field changes"""
+        if self.__transfer_code is None:
+            self.__transfer_code = hashlib.md5(str(self).encode()).hexdigest()
+        return self.__transfer_code
 
 # pylint: disable=too-many-arguments,too-many-branches,too-many-locals,too-many-positional-arguments, too-many-statements
-def process_transfer(from_iban: str, to_iban: str, concept: str,
-                     transfer_type: str, date: str, amount: str) -> str:
+def validate_transfer(from_iban: str, to_iban: str, concept: str,
+                      transfer_type: str, date: str, amount: str) -> TransferRequest:
     """
-    Process a transfer request after validating the inputs.
+    Validates the inputs of a transfer and builds its TransferRequest.
 
     Validates:
       - IBANs: spanish and valid
@@ -137,9 +154,8 @@ def process_transfer(from_iban: str, to_iban: str, concept: str,
       - Amount: must be a numeric value (allowing commas as separators)
        with exactly 2 decimals,
                 and between 10.00 and 10,000.00 (inclusive).
-      - The transfer must not be a duplicate (based on its transfer code) in the stored JSON file.
 
-    On success, the transfer is saved and a string containing the transfer code is returned.
+    Raises AccountManagementException when any of the inputs is not valid.
     """
     # Validate sender IBAN (always require Spanish IBAN format)
     if not valid_iban(from_iban):
@@ -157,66 +173,143 @@ def process_transfer(from_iban: str, to_iban: str, concept: str,
         raise AccountManagementException("Concept is not valid")
 
     # Validate transfer type:
-    allowed_types = {"ORDINARY", "URGENT", "IMMEDIATE"}
-    if transfer_type not in allowed_types:
+    if transfer_type not in TRANSFER_TYPES:
         raise AccountManagementException("Transfer type is not valid")
 
     # Validate date:
     try:
-        date_obj = datetime.strptime(date, "%d/%m/%Y")
+        transfer_day = parse_date(date)
     except ValueError as exc:
         raise AccountManagementException("Transfer date is not valid") from exc
-    if date_obj.date() < datetime.now().date():
+    if transfer_day < datetime.now().date():
         raise AccountManagementException("Transfer date is in the past")
 
     # Validate amount:
-    # Normalize the amount if it's a float
-    # Validate amount:
-    if isinstance(amount, float):
-        # Ensure the amount has exactly two decimal places
-        normalized_amount = f"{amount:.2f}"
-    else:
-        # If amount is a string, normalize it (remove commas if any)
-        normalized_amount = amount.replace(",", "")
-
-    # Ensure the amount has exactly one decimal point
-    if normalized_amount.count('.') != 1:
-        raise AccountManagementException("Amount is not valid")
-
-    # Split the amount into integer and decimal parts
-    integer_part, decimal_part = normalized_amount.split('.')
-
-    # Validate that both parts are digits and the decimal part has exactly 2 digits
-    if not (integer_part.isdigit() and decimal_part.isdigit() and len(decimal_part) == 2):
-        raise AccountManagementException("Amount is not valid")
-
-    # Convert the normalized amount to float
-    float_amount = float(normalized_amount)
+    # Digits with exactly two decimals (commas are removed), converted to exact cents
+    try:
+        cents = parse_transfer_amount(amount)
+    except ValueError as exc:
+        raise AccountManagementException("Amount is not valid") from exc
 
     # Check that the amount is within the valid range (10.00 to 10000.00
-    if not 10.00 <= float_amount <= 10000.00:
+    if not 1000 <= cents <= 1000000:
         raise AccountManagementException("Amount is not valid")
 
-    transfer = TransferRequest(from_iban, transfer_type, to_iban, concept, date, float_amount)
+    # The stored amount is the same float as float(normalized_amount)
+    return TransferRequest(from_iban, transfer_type, to_iban, concept, date,
+                           cents_to_float(cents))
 
+
+def open_transfer_store():
+    """Returns the store where the transfers are stored, partitioned by month next to
+    stored_transactions.json, or the transfer store of the selected storage backend."""
+    backend = get_backend()
+    if backend is not None:
+        return backend.transfer_store()
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
     json_path = os.path.join(base_dir, "stored_transactions.json")
+    return open_partitioned_store(json_path)
+
+
+def process_transfer(from_iban: str, to_iban: str, concept: str,
+                     transfer_type: str, date: str, amount: str) -> str:
+    """
+    Process a transfer request after validating the inputs (see validate_transfer).
 
-    if os.path.exists(json_path):
-        with open(json_path, 'r', encoding='utf-8') as f:
-            try:
-                transactions = json.load(f)
-                if not isinstance(transactions, list):
-                    transactions = []
-            except json.JSONDecodeError:
-                transactions = []
-    else:
-        transactions = []
-
-    for t in transactions:
-        if t["transfer_code"] == transfer.transfer_code:
+    The transfer must not be a duplicate (based on its transfer code) in the stored transfers.
+
+    On success, the transfer is saved and a string containing the transfer code is returned.
+    """
+    with metrics.timer("transfer", "validate"):
+        transfer = validate_transfer(from_iban, to_iban, concept, transfer_type, date, amount)
+    with metrics.timer("transfer", "hash"):
+        transfer_code = transfer.transfer_code
+
+    # Transfers are appended to the journal of their month instead of rewriting the
+    # whole file
+    journal = open_transfer_store()
+
+    # Duplicates are found through the transfer code index of that month only, not by
+    # scanning the journal. The lock keeps another process from storing the same
+    # transfer in between
+    with journal.locked():
+        with metrics.timer("transfer", "dedup"):
+            duplicate = journal.has_transfer(transfer_code, transfer.transfer_date)
+        if duplicate:
             raise AccountManagementException("Output JSON file already has that transfer")
+        with metrics.timer("transfer", "write"):
+            journal.append(transfer.to_json())
+    return f"Transfer Code: {transfer_code}"
+
+
+def process_transfers(requests, workers: int = 1) -> list:
+    """
+    Processes a batch of transfer requests with a single commit to the store.
+
+    Args:
+        requests: Iterable of mappings with the process_transfer arguments
+            (from_iban, to_iban, concept, transfer_type, date, amount).
+        workers: Worker processes that validate the requests and compute their
+            transfer codes, in chunks (None uses every available core). The
+            duplicate checks and the commit always run in this process.
+
+    Returns:
+        list: One result per request, in input order: the "Transfer Code: ..." string
+        of the stored transfer, or the AccountManagementException that rejected it
+        (invalid inputs, or a duplicate in the store or earlier in the batch).
+    """
+    return store_transfers(map_chunks(_validate_transfers, list(requests), workers))
+
+
+def _validate_transfers(requests: list) -> list:
+    """Validates a chunk of requests and computes their transfer codes (run in the
+    worker processes). Returns a TransferRequest or an exception per request."""
+    results = []
+    for request in requests:
+        try:
+            transfer = validate_transfer(**request)
+            # Computed here so the hashing is spread over the workers as well
+            _ = transfer.transfer_code
+            results.append(transfer)
+        except AccountManagementException as exc:
+            results.append(exc)
+        except (AttributeError, TypeError):
+            # Missing or unknown fields, or fields that are not strings
+            results.append(AccountManagementException("Transfer request is not valid"))
+    return results
+
+
+def store_transfers(transfers: list) -> list:
+    """
+    Stores validated transfers with a single commit, rejecting the duplicates.
 
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(transactions + [transfer.to_json()], f, indent=4)  # type: ignore
-    return f"Transfer Code: {transfer.transfer_code}"
+    Args:
+        transfers: TransferRequest objects. Any other item (such as the exception
+            that rejected a request) is returned as it is.
+
+    Returns:
+        list: One result per item, in input order, as in process_transfers.
+    """
+    results = list(transfers)
+    journal = open_transfer_store()
+    accepted = []
+    batch_codes = set()
+    # The duplicate checks and the append are done holding the store lock
+    with journal.locked():
+        for position, transfer in enumerate(results):
+            if not isinstance(transfer, TransferRequest):
+                continue
+            transfer_code = transfer.transfer_code
+            if transfer_code in batch_codes or \
+                    journal.has_transfer(transfer_code, transfer.transfer_date):
+                results[position] = AccountManagementException(
+                    "Output JSON file already has that transfer")
+                continue
+            batch_codes.add(transfer_code)
+            accepted.append(transfer.to_json())
+            results[position] = f"Transfer Code: {transfer_code}"
+
+        # The whole batch is written and synced at once
+        journal.append_many(accepted)
+        journal.sync()
+    return results
@@ -0,0 +1,112 @@
+"""MODULE: validation. Fast parsers shared by the validators of the entry points.
+
+The checks are done in a single pass (with a precompiled regular expression for
+the dates), and accept and reject exactly the same inputs as the code they replace:
+datetime.strptime(text, "%d/%m/%Y") for the dates, and the split and isdigit
+checks of process_transfer for the amounts (except non ASCII digits, which
+str.isdigit let through and are now rejected). The IBANs of every entry point are
+checked by valid_iban, which also verifies the ISO 13616 check digits."""
+import re
+from datetime import date
+from functools import lru_cache
+
+# The fields of "%d/%m/%Y" as datetime.strptime matches them (including one digit
+# days and months, and a space before a one digit day)
+_DATE = re.compile(r"(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])/(1[0-2]|0[1-9]|[1-9])/(\d\d\d\d)")
+
+TRANSFER_TYPES = frozenset({"ORDINARY", "URGENT", "IMMEDIATE"})
+
+# Recent IBANs kept by valid_iban, the same accounts come back again and again
+IBAN_CACHE_SIZE = 8192
+# 10 ** 6 % 97, to append "ES" (1428) and the check digits to the BBAN remainder
+_SHIFT_6_DIGITS = 10 ** 6 % 97
+
+# Transfers use a few distinct dates, so a small cache serves almost every request
+DATE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(text: str) -> date:
+    """
+    Returns the date of a DD/MM/YYYY string, the same as
+    datetime.strptime(text, "%d/%m/%Y").date(). Valid dates are cached.
+
+    Raises:
+        ValueError: If the text is not a valid date in that format.
+        TypeError: If the text is not a string.
+    """
+    if not isinstance(text, str):
+        raise TypeError(f"strptime() argument 1 must be str, not {type(text).__name__}")
+    match = _DATE.fullmatch(text)
+    if match is None:
+        raise ValueError(f"time data {text!r} does not match format '%d/%m/%Y'")
+    day, month, year = match.groups()
+    return date(int(year), int(month), int(day))
+
+
+def valid_iban(iban: str) -> bool:
+    """
+    Validates a Spanish IBAN:
+      - Must start with 'ES'
+      - Must be 24 characters long
+      - The remaining characters after 'ES' must be digits
+      - The check digits must be right (ISO 13616, mod 97 of the IBAN is 1)
+    Values that are not strings are not valid; the results of recent IBANs are cached.
+    """
+    # Lists or dicts cannot be keys of the cache, so they are rejected before it
+    return isinstance(iban, str) and _valid_iban_text(iban)
+
+
+@lru_cache(maxsize=IBAN_CACHE_SIZE)
+def _valid_iban_text(iban: str) -> bool:
+    """Checks the format and the check digits of an IBAN given as a string"""
+    if len(iban) != 24 or not iban.startswith("ES") \
+            or not iban[2:].isascii() or not iban[2:].isdigit():
+        return False
+    # The IBAN is checked as the number BBAN + "1428" (E = 14, S = 28) + check digits,
+    # computed from the integer BBAN instead of building that string
+    remainder = int(iban[4:]) % 97 * _SHIFT_6_DIGITS + 142800 + int(iban[2:4])
+    return remainder % 97 == 1
+
+
+def valid_ibans(ibans) -> list:
+    """Validates several IBANs at once, returning one bool per IBAN in input order."""
+    return [isinstance(iban, str) and _valid_iban_text(iban) for iban in ibans]
+
+
+def float_cents(amount: float) -> int:
+    """
+    Returns a float amount as an integer number of cents, as money.parse_cents
+    does, without formatting it as text first.
+
+    Raises:
+        ValueError: If the amount has more than two decimals.
+    """
+    cents = round(amount * 100)
+    # Only a float with at most two decimals is the closest float to cents / 100
+    if cents / 100 != amount:
+        raise ValueError(f"Not an amount with two decimals: {amount!r}")
+    return cents
+
+
+def parse_transfer_amount(amount) -> int:
+    """
+    Returns a transfer amount as an integer number of cents. A float is taken with
+    two decimals, a string must be digits with exactly two decimals and may have
+    commas anywhere ("1,000.00").
+
+    Raises:
+        ValueError: If the amount does not have that format.
+    """
+    if isinstance(amount, float):
+        normalized_amount = f"{amount:.2f}"
+    else:
+        normalized_amount = amount.replace(",", "")
+    # "1234.56": ASCII digits, a dot and two digits, read as one integer of cents
+    if len(normalized_amount) > 3 and normalized_amount[-3] == "." \
+            and normalized_amount.isascii():
+        # A second dot is left in and fails isdigit
+        digits = normalized_amount.replace(".", "", 1)
+        if digits.isdigit():
+            return int(digits)
+    raise ValueError(f"Not a transfer amount: {amount!r}")
@@ -0,0 +1,143 @@
+"""MODULE: write_behind. In-process queue that stores records in the background.
+
+Callers put records on the queue and return at once; a writer thread stores
+them in batches, when ``batch_size`` records are waiting or ``interval_ms``
+milliseconds after the oldest one was queued, whichever comes first. ``flush()``
+waits until everything queued so far is stored, and every queue still open is
+flushed and closed at interpreter exit, so no queued record is lost on a normal
+shutdown. A batch that cannot be stored stays queued and is tried again, and
+its error is raised by flush()."""
+import atexit
+import threading
+import time
+import weakref
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_INTERVAL_MS = 50
+# Seconds before a batch that could not be stored is tried again
+RETRY_DELAY = 0.1
+
+_OPEN_QUEUES = weakref.WeakSet()
+
+
+class WriteBehindQueue:
+    """Queue of records stored in batches by a background thread.
+
+    ``store`` is called from the writer thread with a list of records."""
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, store, batch_size: int = DEFAULT_BATCH_SIZE,
+                 interval_ms: int = DEFAULT_INTERVAL_MS):
+        self.__store = store
+        self.__batch_size = max(1, batch_size)
+        self.__interval = max(0, interval_ms) / 1000
+        self.__queue = []
+        self.__due = None
+        self.__writing = 0
+        self.__error = None
+        self.__closed = False
+        self.__condition = threading.Condition()
+        self.__thread = threading.Thread(target=self.__run, name="uc3m_money-write-behind",
+                                         daemon=True)
+        self.__thread.start()
+        _OPEN_QUEUES.add(self)
+
+    def __len__(self):
+        """Number of records not stored yet"""
+        with self.__condition:
+            return len(self.__queue) + self.__writing
+
+    def put(self, record):
+        """Queues a record to be stored."""
+        self.put_many([record])
+
+    def put_many(self, records: list):
+        """Queues several records to be stored."""
+        with self.__condition:
+            if self.__closed:
+                raise RuntimeError("The write-behind queue is closed")
+            if not self.__queue:
+                self.__due = time.monotonic() + self.__interval
+            self.__queue.extend(records)
+            self.__condition.notify_all()
+
+    def flush(self):
+        """Waits until every record queued so far is stored.
+
+        Raises:
+            Exception: The last error of the writer, if the records could not be stored.
+        """
+        with self.__condition:
+            self.__due = 0.0  # Do not wait for the interval
+            self.__condition.notify_all()
+            while (self.__queue or self.__writing) and self.__error is None:
+                self.__condition.wait()
+            error, self.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Stores what is still queued and stops the writer thread."""
+        with self.__condition:
+            if self.__closed:
+                return
+        try:
+            self.flush()
+        finally:
+            with self.__condition:
+                self.__closed = True
+                self.__condition.notify_all()
+            self.__thread.join()
+            _OPEN_QUEUES.discard(self)
+
+    def __next_batch(self):
+        """Waits until a batch is due and takes it, or returns None once closed."""
+        with self.__condition:
+            while True:
+                if self.__closed:
+                    return None
+                if not self.__queue:
+                    self.__condition.wait()
+                    continue
+                wait = self.__due - time.monotonic()
+                # A full batch does not wait, unless it is waiting to be tried again
+                full = len(self.__queue) >= self.__batch_size and self.__error is None
+                if full or wait <= 0:
+                    batch = self.__queue[:self.__batch_size]
+                    del self.__queue[:self.__batch_size]
+                    self.__writing = len(batch)
+                    # What is left keeps the due time of the oldest record
+                    return batch
+                self.__condition.wait(wait)
+
+    def __run(self):
+        while True:
+            batch = self.__next_batch()
+            if batch is None:
+                return
+            try:
+                self.__store(batch)
+                error = None
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                error = exc
+            with self.__condition:
+                if error is not None:
+                    # Put the batch back in front, it is tried again
+                    self.__queue[:0] = batch
+                    self.__due = time.monotonic() + max(self.__interval, RETRY_DELAY)
+                    self.__error = error
+                self.__writing = 0
+                self.__condition.notify_all()
+
+
+@atexit.register
+def close_queues():
+    """Stores the records still queued and stops every writer (called at exit)."""
+    errors = []
+    for queue in list(_OPEN_QUEUES):
+        try:
+            queue.close()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            errors.append(exc)
+    if errors:
+        raise errors[0]
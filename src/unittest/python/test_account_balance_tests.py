@@ -2,9 +2,13 @@
 import unittest
 import os
 import json
+import shutil
+import tempfile
+from datetime import date
 # pylint: disable=import-error
 from unittest.mock import patch
-from uc3m_money.account_balance import store_new_balance, AccountManagementException
+from uc3m_money.account_balance import (store_new_balance, store_all_balances,
+                                        AccountManagementException)
 
 
 def fake_exists_tc2(path):
@@ -87,5 +91,83 @@ class TestAccountBalanceTests(BaseTest):
             store_new_balance(iban)
 
 
+class TestBalanceSnapshots(BaseTest):
+    """Here we check how the snapshots are written, on a copy of the json files."""
+
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        nested_dir = os.path.join(self.temp_dir.name, "level1", "level2")
+        os.makedirs(nested_dir)
+        main_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                "..", "..", "main"))
+        shutil.copy(os.path.join(main_dir, "all_transactions.json"), self.temp_dir.name)
+        self.balances_path = os.path.join(self.temp_dir.name, "account_balances.json")
+        with open(self.balances_path, "w", encoding="utf-8") as f:
+            json.dump([{"iban": "ES3559005439021242088295", "amount": 1.0,
+                        "date": "2025-03-24"}], f, indent=4)  # type: ignore
+        self.patcher = patch("uc3m_money.account_balance.__file__",
+                             os.path.join(nested_dir, "dummy_module.py"))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def _stored(self):
+        with open(self.balances_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return content, json.loads(content)
+
+    def test_snapshot_is_appended(self):
+        """The file keeps the previous records and is written in compact JSON"""
+        iban = self.test_cases["tc1"]["iban"]
+        store_new_balance(iban)
+        store_new_balance(iban)
+        content, data = self._stored()
+        self.assertEqual(content, json.dumps(data, separators=(",", ":")))
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[-1]["iban"], iban)
+        self.assertEqual(data[-1]["date"], date.today().isoformat())
+
+    def test_snapshot_is_upserted(self):
+        """With upsert there is only one snapshot per iban and date"""
+        iban = self.test_cases["tc1"]["iban"]
+        store_new_balance(iban, upsert=True)
+        store_new_balance(iban, upsert=True)
+        _, data = self._stored()
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[-1]["iban"], iban)
+
+
+    def test_broken_file_is_kept(self):
+        """A file that cannot be decoded is copied to .corrupt, not taken for an
+        empty list and lost"""
+        with open(self.balances_path, "r", encoding="utf-8") as f:
+            broken = f.read()[:-10]
+        with open(self.balances_path, "w", encoding="utf-8") as f:
+            f.write(broken)
+        store_new_balance(self.test_cases["tc1"]["iban"])
+        with open(self.balances_path + ".corrupt", "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), broken)
+        self.assertEqual(len(self._stored()[1]), 1)
+
+    def test_all_balances_in_one_pass(self):
+        """Every iban gets its snapshot and the report has the row counts"""
+        with open(os.path.join(self.temp_dir.name, "all_transactions.json"),
+                  "r", encoding="utf-8") as f:
+            transactions = json.load(f)
+        ibans = {key["IBAN"] for key in transactions}
+        report = store_all_balances()
+        _, data = self._stored()
+        self.assertEqual(report["transactions"], len(transactions))
+        self.assertEqual(report["accounts"], len(ibans))
+        self.assertGreaterEqual(report["seconds"], 0)
+        self.assertEqual({snapshot["iban"] for snapshot in data[1:]}, ibans)
+        store_all_balances(upsert=True)
+        self.assertEqual(len(self._stored()[1]), len(ibans) + 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -4,9 +4,12 @@ import os
 import json
 import sys
 import tempfile
+import hashlib
 # pylint: disable=import-error
 from unittest.mock import patch
-from uc3m_money.account_deposit import AccountDeposit, deposit_into_account
+from uc3m_money.account_deposit import (AccountDeposit, deposit_into_account, enable_write_behind,
+                                        disable_write_behind, flush_deposits,
+                                        deposit_many_into_account, validate_deposit)
 from uc3m_money.account_management_exception import AccountManagementException
 
 # Adjust sys.path to import the main module
@@ -77,6 +80,19 @@ class TestDepositRequest(BaseTest):
                         )
                     self.assertIn("Invalid amount format", str(cm.exception))
 
+    def test_signature_and_layout_without_instance_dict(self):
+        """Tests that the slotted deposit keeps the signature and the JSON layout"""
+        with patch("uc3m_money.account_deposit.datetime") as mock_datetime:
+            mock_datetime.timestamp.return_value = 1742846943.840017
+            deposit = AccountDeposit("ES9121000418450200051332", 500.0)
+        signature_string = ("{alg:SHA-256,typ:DEPOSIT,iban:ES9121000418450200051332,"
+                            "amount:500.0,deposit_date:1742846943.840017}")
+        self.assertEqual(deposit.deposit_signature,
+                         hashlib.sha256(signature_string.encode()).hexdigest())
+        self.assertEqual(list(deposit.to_json()), ["alg", "type", "to_iban", "deposit_amount",
+                                                   "deposit_date", "deposit_signature"])
+        self.assertFalse(hasattr(deposit, "__dict__"))
+
     def test_amount_below_minimum(self):
         """Tests deposits below minimum allowed"""
         for tc in self.test_cases["invalid"]:
@@ -302,6 +318,44 @@ class TestDepositIntoAccount(BaseTest):
             deposit_into_account(temp_input_file)
         self.assertIn("Amount must be <=", str(cm.exception))
 
+    def test_deposit_into_account_amount_with_thousands_commas(self):
+        """Tests that the amount is parsed as exact cents, thousands commas included."""
+        input_data = {"IBAN": "ES7921000813610123456789", "AMOUNT": "EUR 1,000.00"}
+        temp_input_file = os.path.join(self.temp_dir.name, "amount_commas.json")
+        with open(temp_input_file, "w", encoding="utf-8") as f:
+            json.dump(input_data, f) #type: ignore
+        deposit_into_account(temp_input_file)
+        with open(self._get_deposit_json_path(), "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)[-1]["deposit_amount"], 1000.0)
+
+    def test_deposit_into_account_amount_three_decimals(self):
+        """Tests that deposit_into_account raises an error for more than two decimals."""
+        input_data = {"IBAN": "ES7921000813610123456789", "AMOUNT": "EUR 500.123"}
+        temp_input_file = os.path.join(self.temp_dir.name, "amount_three_decimals.json")
+        with open(temp_input_file, "w", encoding="utf-8") as f:
+            json.dump(input_data, f) #type: ignore
+        with self.assertRaises(AccountManagementException) as cm:
+            deposit_into_account(temp_input_file)
+        self.assertIn("must have two decimal places", str(cm.exception))
+
+    def test_validate_deposit_amount_checks_in_order(self):
+        """Tests that the range is checked before the decimals, and that the amounts
+        float() reads with two decimals at most are still accepted."""
+        cases = {"EUR 10000.001": "Amount must be <= 10000.00",
+                 "EUR 5.001": "Amount must be >= 10.00",
+                 "EUR -5.123": "Deposit amount must be greater than zero.",
+                 "EUR 10000.000": 10000.0, "EUR 1e3": 1000.0, "EUR 5_00.00": 500.0}
+        for amount, expected in cases.items():
+            with self.subTest(amount=amount):
+                data = {"IBAN": "ES7921000813610123456789", "AMOUNT": amount}
+                if isinstance(expected, float):
+                    self.assertEqual(validate_deposit(data).to_json()["deposit_amount"],
+                                     expected)
+                    continue
+                with self.assertRaises(AccountManagementException) as cm:
+                    validate_deposit(data)
+                self.assertEqual(str(cm.exception), expected)
+
     def test_deposit_into_account_amount_non_positive(self):
         """Tests that deposit_into_account raises an error when amount <= 0."""
         input_data = {"IBAN": "ES7921000813610123456789", "AMOUNT": "EUR 0.00"}
@@ -352,5 +406,139 @@ class TestDepositIntoAccount(BaseTest):
         self.assertEqual(len(deposits), 1)
 
 
+class TestDepositWriteBehind(unittest.TestCase):
+    """Tests the write-behind mode of deposit_into_account on a temporary deposits.json"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        nested_dir = os.path.join(self.temp_dir.name, "level1", "level2")
+        os.makedirs(nested_dir)
+        self.patcher = patch("uc3m_money.account_deposit.__file__",
+                             os.path.join(nested_dir, "dummy_module.py"))
+        self.patcher.start()
+        self.deposit_json_path = os.path.join(self.temp_dir.name, "deposits.json")
+        with open(self.deposit_json_path, "w", encoding="utf-8") as f:
+            f.write("[\n\n]")
+        self.input_file = os.path.join(self.temp_dir.name, "input.json")
+        with open(self.input_file, "w", encoding="utf-8") as f:
+            json.dump({"IBAN": "ES7921000813610123456789", "AMOUNT": "EUR 500.00"}, f) #type: ignore
+
+    def tearDown(self):
+        disable_write_behind()
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def _stored(self):
+        with open(self.deposit_json_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return content, json.loads(content)
+
+    def test_deposits_are_stored_on_flush(self):
+        """The signatures are returned at once and the deposits stored by flush"""
+        enable_write_behind(batch_size=1000, interval_ms=60000)
+        signatures = [deposit_into_account(self.input_file) for _ in range(20)]
+        self.assertEqual(self._stored()[1], [])
+        flush_deposits()
+        content, deposits = self._stored()
+        self.assertEqual([d["deposit_signature"] for d in deposits], signatures)
+        # Same layout as the deposits written without write-behind
+        self.assertEqual(content, json.dumps(deposits, separators=(",", ":")))
+
+    def test_disable_stores_the_queue(self):
+        """Going back to the normal mode stores what was still queued"""
+        enable_write_behind(batch_size=1000, interval_ms=60000)
+        signature = deposit_into_account(self.input_file)
+        disable_write_behind()
+        self.assertEqual([d["deposit_signature"] for d in self._stored()[1]], [signature])
+        deposit_into_account(self.input_file)
+        self.assertEqual(len(self._stored()[1]), 2)
+
+    def test_validation_errors_are_raised_at_once(self):
+        """Invalid deposits still raise before anything is queued"""
+        enable_write_behind()
+        with self.assertRaises(AccountManagementException):
+            deposit_into_account(os.path.join(self.temp_dir.name, "missing.json"))
+        flush_deposits()
+        self.assertEqual(self._stored()[1], [])
+
+
+class TestDepositMany(unittest.TestCase):
+    """Tests deposit_many_into_account on a temporary deposits.json"""
+
+    VALID = {"IBAN": "ES7921000813610123456789", "AMOUNT": "EUR 500.00"}
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        nested_dir = os.path.join(self.temp_dir.name, "level1", "level2")
+        os.makedirs(nested_dir)
+        self.patcher = patch("uc3m_money.account_deposit.__file__",
+                             os.path.join(nested_dir, "dummy_module.py"))
+        self.patcher.start()
+        self.deposit_json_path = os.path.join(self.temp_dir.name, "deposits.json")
+        self.input_file = os.path.join(self.temp_dir.name, "input.json")
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def _write_input(self, content):
+        with open(self.input_file, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _stored(self):
+        with open(self.deposit_json_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_json_array(self):
+        """Every request gets its result in input order and the valid ones are stored"""
+        requests = [self.VALID, {"IBAN": "ES00", "AMOUNT": "EUR 500.00"},
+                    {"IBAN": "ES7921000813610123456789", "AMOUNT": "USD 5.00"},
+                    {"IBAN": "ES7921000813610123456789"}, self.VALID,
+                    {"IBAN": "ES7921000813610123456789", "AMOUNT": 500}]
+        self._write_input(json.dumps(requests))
+        results = deposit_many_into_account(self.input_file, workers=1)
+        self.assertEqual(len(results[0]), 64)
+        self.assertEqual(results[1].message,
+                         "The JSON data does not have valid values (invalid IBAN).")
+        self.assertEqual(results[2].message, "Invalid currency format.")
+        self.assertEqual(results[3].message, "The JSON does not have the expected structure.")
+        self.assertEqual(len(results[4]), 64)
+        self.assertEqual(results[5].message, "The JSON does not have the expected structure.")
+        self.assertEqual([d["deposit_signature"] for d in self._stored()],
+                         [results[0], results[4]])
+
+    def test_json_lines(self):
+        """A line that cannot be decoded only fails that request"""
+        self._write_input(json.dumps(self.VALID) + "\n{not json\n\n" + json.dumps(self.VALID))
+        results = deposit_many_into_account(self.input_file, workers=1)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[1].message, "The file is not in JSON format.")
+        self.assertEqual(len(self._stored()), 2)
+
+    def test_invalid_file(self):
+        """A missing file or a broken array fails as a whole"""
+        with self.assertRaises(AccountManagementException) as cm:
+            deposit_many_into_account(self.input_file)
+        self.assertEqual(cm.exception.message, "The data file is not found.")
+        self._write_input('[{"IBAN": ')
+        with self.assertRaises(AccountManagementException) as cm:
+            deposit_many_into_account(self.input_file)
+        self.assertEqual(cm.exception.message, "The file is not in JSON format.")
+        self.assertFalse(os.path.exists(self.deposit_json_path))
+
+    def test_parallel_validation(self):
+        """Validating in worker processes gives the same results in the same order"""
+        requests = [self.VALID if i % 3 else {"IBAN": "ES00", "AMOUNT": "EUR 500.00"}
+                    for i in range(3000)]
+        self._write_input("\n".join(json.dumps(request) for request in requests))
+        results = deposit_many_into_account(self.input_file, workers=2)
+        failed = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+        self.assertEqual(failed, list(range(0, 3000, 3)))
+        stored = self._stored()
+        self.assertEqual(len(stored), 2000)
+        self.assertEqual([d["deposit_signature"] for d in stored],
+                         [r for r in results if not isinstance(r, Exception)])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,130 @@
+"""This module tests the async entry points and their group commits"""
+import unittest
+import os
+import json
+import asyncio
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest.mock import patch
+# pylint: disable=import-error
+from uc3m_money.async_api import (aprocess_transfer, adeposit_into_account,
+                                  astore_new_balance, committer)
+from uc3m_money.transfer_request import AccountManagementException
+from uc3m_money.account_management_exception import (
+    AccountManagementException as DepositException)
+from uc3m_money.transfer_journal import read_transactions, close_journals
+
+# pylint: disable=duplicate-code
+IBAN = "ES8658342044541216872704"
+
+
+class TestAsyncApi(unittest.TestCase):
+    """Here we run many concurrent requests on copies of the json files"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.base_dir = self.temp_dir.name
+        nested_dir = os.path.join(self.base_dir, "level1", "level2")
+        os.makedirs(nested_dir)
+        main_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                "..", "..", "main"))
+        shutil.copy(os.path.join(main_dir, "all_transactions.json"), self.base_dir)
+        with open(os.path.join(self.base_dir, "account_balances.json"), "w",
+                  encoding="utf-8") as f:
+            f.write("[]")
+        module_file = os.path.join(nested_dir, "dummy_module.py")
+        self.patchers = [patch(f"uc3m_money.{module}.__file__", module_file)
+                         for module in ("transfer_request", "account_deposit",
+                                        "account_balance")]
+        for patcher in self.patchers:
+            patcher.start()
+        self.date = (date.today() + timedelta(days=30)).strftime("%d/%m/%Y")
+
+    def tearDown(self):
+        close_journals()
+        for patcher in self.patchers:
+            patcher.stop()
+        self.temp_dir.cleanup()
+
+    def _load(self, name):
+        with open(os.path.join(self.base_dir, name), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _transfer(self, amount):
+        return aprocess_transfer("ES9121000418450200051332", "ES7921000813610123456789",
+                                 "monthly rent payment", "ORDINARY", self.date, amount)
+
+    def test_concurrent_transfers_are_grouped(self):
+        """Concurrent transfers are all stored with fewer commits than transfers"""
+        async def run():
+            results = await asyncio.gather(*(self._transfer(f"{100 + n}.00")
+                                             for n in range(50)))
+            return results, committer("transfers").commits
+
+        results, commits = asyncio.run(run())
+        self.assertTrue(all(result.startswith("Transfer Code: ") for result in results))
+        self.assertLess(commits, 50)
+        stored = read_transactions(os.path.join(self.base_dir, "stored_transactions.json"))
+        self.assertEqual(sorted(f"Transfer Code: {t['transfer_code']}" for t in stored),
+                         sorted(results))
+
+    def test_transfer_exceptions(self):
+        """Invalid and duplicated transfers raise the usual exceptions"""
+        async def run():
+            with self.assertRaises(AccountManagementException) as invalid:
+                await self._transfer("5.00")
+            with patch("uc3m_money.transfer_request.datetime") as mock_datetime:
+                mock_datetime.now.return_value.date.return_value = date.today()
+                mock_datetime.timestamp.return_value = 1742846943.840017
+                results = await asyncio.gather(self._transfer("100.00"),
+                                               self._transfer("100.00"),
+                                               return_exceptions=True)
+            return invalid.exception, results
+
+        invalid, results = asyncio.run(run())
+        self.assertEqual(str(invalid), "Amount is not valid")
+        self.assertIn("Transfer Code", results[0])
+        self.assertIsInstance(results[1], AccountManagementException)
+        self.assertEqual(str(results[1]), "Output JSON file already has that transfer")
+
+    def test_concurrent_deposits(self):
+        """Concurrent deposits return their signatures and are all stored"""
+        input_file = os.path.join(self.base_dir, "deposit.json")
+        with open(input_file, "w", encoding="utf-8") as f:
+            json.dump({"IBAN": IBAN, "AMOUNT": "EUR 500.00"}, f)  # type: ignore
+
+        async def run():
+            return await asyncio.gather(*(adeposit_into_account(input_file)
+                                          for _ in range(20)))
+
+        signatures = asyncio.run(run())
+        stored = [d["deposit_signature"] for d in self._load("deposits.json")]
+        self.assertEqual(sorted(stored), sorted(signatures))
+
+    def test_deposit_exceptions(self):
+        """A missing deposit file raises the usual exception"""
+        with self.assertRaises(DepositException) as context:
+            asyncio.run(adeposit_into_account(os.path.join(self.base_dir, "missing.json")))
+        self.assertEqual(str(context.exception), "The data file is not found.")
+
+    def test_concurrent_balances(self):
+        """Concurrent balance snapshots are stored, with upsert only the latest stays"""
+        async def run():
+            stored = await asyncio.gather(*(astore_new_balance(IBAN) for _ in range(5)))
+            upserted = await asyncio.gather(*(astore_new_balance(IBAN, upsert=True)
+                                              for _ in range(5)))
+            return stored + upserted
+
+        self.assertEqual(asyncio.run(run()), [True] * 10)
+        self.assertEqual(len(self._load("account_balances.json")), 5)
+
+    def test_balance_exceptions(self):
+        """An IBAN without movements raises the usual exception"""
+        with self.assertRaises(Exception) as context:
+            asyncio.run(astore_new_balance("ES8200000000000000000000"))
+        self.assertEqual(str(context.exception), "Transaction not stored")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""This module tests the balance ledger used by the account_balance script"""
+import unittest
+import os
+import json
+import tempfile
+from decimal import Decimal
+# pylint: disable=import-error
+from uc3m_money.balance_ledger import BalanceLedger
+
+IBAN_1 = "ES8658342044541216872704"
+IBAN_2 = "ES3559005439021242088295"
+
+
+class TestBalanceLedger(unittest.TestCase):
+    """Here we check the running balances against a temporary transactions file"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.temp_dir.name, "all_transactions.json")
+        self.movements = [{"IBAN": IBAN_1, "amount": "-1280.06"},
+                          {"IBAN": IBAN_1, "amount": "+2424.42"},
+                          {"IBAN": IBAN_2, "amount": "+1258.75"}]
+        self._write()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.movements, f, indent=4)  # type: ignore
+
+    def _expected(self, iban):
+        amount = Decimal(0)
+        for key in self.movements:
+            if key["IBAN"] == iban:
+                amount = amount + Decimal(key["amount"])
+        return float(amount)
+
+    def test_balances_are_exact_sums(self):
+        """The ledger gives the exact sum of the movements in the file"""
+        ledger = BalanceLedger(self.path)
+        self.assertEqual(ledger.balance(IBAN_1), self._expected(IBAN_1))
+        self.assertEqual(ledger.balance(IBAN_2), self._expected(IBAN_2))
+        self.assertNotIn("ES0000000000000000000000", ledger)
+        self.assertEqual(ledger.rows, 3)
+
+    def test_appended_movements_are_added(self):
+        """Movements appended to the array are added to the balances"""
+        ledger = BalanceLedger(self.path)
+        ledger.balance(IBAN_1)
+        self.movements.append({"IBAN": IBAN_1, "amount": "-10.00"})
+        self.movements.append({"IBAN": "ES6211110783482828975098", "amount": "+5.00"})
+        self._write()
+        self.assertEqual(ledger.balance(IBAN_1), self._expected(IBAN_1))
+        self.assertIn("ES6211110783482828975098", ledger)
+        self.assertEqual(ledger.rows, 5)
+
+    def test_rewritten_file_is_rebuilt(self):
+        """A file whose previous movements changed is aggregated again"""
+        ledger = BalanceLedger(self.path)
+        ledger.balance(IBAN_1)
+        self.movements = [{"IBAN": IBAN_2, "amount": "+1.00"}] + self.movements
+        self.movements[1]["amount"] = "-1.00"
+        self._write()
+        self.assertEqual(ledger.balance(IBAN_1), self._expected(IBAN_1))
+        self.assertEqual(ledger.balance(IBAN_2), self._expected(IBAN_2))
+        self.assertEqual(ledger.rows, 4)
+
+    def test_long_ledger_does_not_drift(self):
+        """Adding many amounts that floats cannot represent gives the exact total"""
+        self.movements = [{"IBAN": IBAN_1, "amount": "+0.10"}] * 10000
+        self._write()
+        self.assertEqual(BalanceLedger(self.path).balance(IBAN_1), 1000.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""This module tests the NumPy backend of the balance ledger"""
+import unittest
+import os
+import json
+import random
+import tempfile
+# pylint: disable=import-error
+from uc3m_money.balance_ledger import BalanceLedger, get_ledger
+from uc3m_money.balance_numpy import (ColumnarTransactions, NumpyBalanceLedger,
+                                      numpy_available, use_numpy_backend, CACHE_SUFFIX)
+
+IBAN_1 = "ES8658342044541216872704"
+IBAN_2 = "ES3559005439021242088295"
+
+
+@unittest.skipUnless(numpy_available(), "NumPy is not installed")
+class TestNumpyBalanceLedger(unittest.TestCase):
+    """Here we check that the NumPy backend gives the pure Python balances"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.temp_dir.name, "all_transactions.json")
+        generator = random.Random(10)
+        ibans = [IBAN_1, IBAN_2] + [f"ES{generator.randrange(10 ** 22):022d}"
+                                    for _ in range(20)]
+        self.movements = [{"IBAN": generator.choice(ibans),
+                           "amount": f"{generator.choice('+-')}{generator.randrange(100000)}."
+                                     f"{generator.randrange(100):02d}"}
+                          for _ in range(2000)]
+        self._write()
+
+    def tearDown(self):
+        use_numpy_backend(False)
+        self.temp_dir.cleanup()
+
+    def _write(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.movements, f, indent=4)  # type: ignore
+
+    def test_same_balances_as_python(self):
+        """Both backends give exactly the same balances and number of movements"""
+        python_ledger = BalanceLedger(self.path)
+        numpy_ledger = NumpyBalanceLedger(self.path)
+        self.assertEqual(numpy_ledger.balances(), python_ledger.balances())
+        self.assertEqual(numpy_ledger.balance_cents(IBAN_1), python_ledger.balance_cents(IBAN_1))
+        self.assertEqual(numpy_ledger.rows, python_ledger.rows)
+
+    def test_columns_are_cached(self):
+        """The columns are written next to the file and reused while it does not change"""
+        columns = ColumnarTransactions.load(self.path)
+        self.assertTrue(os.path.exists(self.path + CACHE_SUFFIX))
+        cached = ColumnarTransactions.load(self.path)
+        self.assertEqual(cached.sums(), columns.sums())
+        self.assertEqual(len(cached), 2000)
+
+    def test_changed_file_is_parsed_again(self):
+        """A cache written for other contents of the file is not used"""
+        ColumnarTransactions.load(self.path)
+        self.movements = self.movements[:10]
+        self._write()
+        self.assertEqual(NumpyBalanceLedger(self.path).balances(),
+                         BalanceLedger(self.path).balances())
+
+    def test_broken_cache_is_ignored(self):
+        """A cache file that cannot be read is written again"""
+        with open(self.path + CACHE_SUFFIX, "w", encoding="utf-8") as f:
+            f.write("not a cache")
+        self.assertEqual(len(ColumnarTransactions.load(self.path)), 2000)
+        self.assertEqual(len(ColumnarTransactions.load(self.path)), 2000)
+
+    def test_appended_movements_are_added(self):
+        """Movements appended after the aggregation are added like in the Python ledger"""
+        ledger = NumpyBalanceLedger(self.path)
+        ledger.balances()
+        self.movements.append({"IBAN": IBAN_1, "amount": "-10.01"})
+        self._write()
+        self.assertEqual(ledger.balances(), BalanceLedger(self.path).balances())
+
+    def test_use_numpy_backend(self):
+        """The shared ledgers are created with the selected backend"""
+        use_numpy_backend()
+        self.assertIsInstance(get_ledger(self.path), NumpyBalanceLedger)
+        use_numpy_backend(False)
+        self.assertNotIsInstance(get_ledger(self.path), NumpyBalanceLedger)
+
+
+if __name__ == '__main__':
+    unittest.main()
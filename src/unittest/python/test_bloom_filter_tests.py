@@ -0,0 +1,116 @@
+"""This module tests the Bloom filter in front of the transfer code index"""
+import unittest
+import os
+import tempfile
+# pylint: disable=import-error
+from uc3m_money import bloom_filter
+from uc3m_money.bloom_filter import ScalableBloomFilter, TransferCodeFilter
+from uc3m_money.transfer_journal import TransferJournal, close_journals
+
+
+def make_record(code: str) -> dict:
+    """Builds a minimal transfer record for the filter tests"""
+    return {"from_iban": "ES9121000418450200051332", "transfer_code": code}
+
+
+class TestScalableBloomFilter(unittest.TestCase):
+    """Here we check the answers of the filter as it grows"""
+
+    def test_no_false_negatives_and_bounded_rate(self):
+        """Every added code is found and few others are"""
+        bloom = ScalableBloomFilter(0.01, capacity=100)
+        codes = [f"code-{number}" for number in range(5000)]
+        for code in codes:
+            bloom.add(code)
+        self.assertEqual(len(bloom), 5000)
+        self.assertTrue(all(code in bloom for code in codes))
+        false_positives = sum(f"other-{number}" in bloom for number in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+
+    def test_round_trip(self):
+        """The stored filter answers as the original one"""
+        bloom = ScalableBloomFilter(0.05, capacity=10)
+        for number in range(100):
+            bloom.add(str(number))
+        loaded, offset = ScalableBloomFilter.from_bytes(bloom.to_bytes(1234))
+        self.assertEqual(offset, 1234)
+        self.assertEqual(loaded.rate, 0.05)
+        self.assertEqual(len(loaded), 100)
+        self.assertEqual([str(n) in loaded for n in range(200)],
+                         [str(n) in bloom for n in range(200)])
+        with self.assertRaises(ValueError):
+            ScalableBloomFilter.from_bytes(bloom.to_bytes(0)[:-1])
+
+    def test_invalid_rate(self):
+        """Only rates between 0 and 1 are accepted"""
+        with self.assertRaises(ValueError):
+            bloom_filter.set_false_positive_rate(1.5)
+
+
+class TestTransferCodeFilter(unittest.TestCase):
+    """Here we check the filter of a journal, its file and its statistics"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.legacy_path = os.path.join(self.temp_dir.name, "stored_transactions.json")
+        self.bloom_path = os.path.join(self.temp_dir.name, "stored_transactions.bloom")
+        bloom_filter.reset_stats()
+
+    def tearDown(self):
+        close_journals()
+        bloom_filter.set_false_positive_rate(bloom_filter.DEFAULT_FALSE_POSITIVE_RATE)
+        self.temp_dir.cleanup()
+
+    def test_new_codes_avoid_the_exact_lookup(self):
+        """New codes are answered by the filter, stored ones by the index"""
+        journal = TransferJournal(self.legacy_path)
+        journal.append_many([make_record(str(number)) for number in range(100)])
+        new = sum(f"new-{number}" in journal for number in range(1000))
+        self.assertEqual(new, 0)
+        self.assertIn("42", journal)
+        stats = bloom_filter.stats()
+        self.assertEqual(stats["checks"], 1001)
+        self.assertEqual(stats["exact_lookups"], stats["checks"] - stats["avoided"])
+        self.assertEqual(stats["exact_lookups"] - stats["false_positives"], 1)
+        self.assertGreater(stats["avoided_ratio"], 0.95)
+
+    def test_persisted_and_caught_up(self):
+        """The filter is saved on close and catches up with later appends"""
+        journal = TransferJournal(self.legacy_path)
+        journal.append(make_record("a"))
+        journal.close()
+        self.assertTrue(os.path.exists(self.bloom_path))
+        other = TransferJournal(self.legacy_path)
+        other.append(make_record("b"))
+        other.sync()
+        code_filter = TransferCodeFilter(self.bloom_path, other.path)
+        self.assertTrue(code_filter.might_contain("a"))
+        self.assertTrue(code_filter.might_contain("b"))
+
+    def test_rebuilt_from_the_journal(self):
+        """A broken file, or one built for another rate, is rebuilt from the journal"""
+        journal = TransferJournal(self.legacy_path)
+        journal.append(make_record("a"))
+        journal.close()
+        with open(self.bloom_path, "wb") as f:
+            f.write(b"broken")
+        self.assertIn("a", TransferJournal(self.legacy_path))
+        bloom_filter.set_false_positive_rate(0.001)
+        code_filter = TransferCodeFilter(self.bloom_path, journal.path)
+        self.assertTrue(code_filter.might_contain("a"))
+        code_filter.close()
+        with open(self.bloom_path, "rb") as f:
+            self.assertEqual(ScalableBloomFilter.from_bytes(f.read())[0].rate, 0.001)
+
+    def test_sees_appends_of_another_writer(self):
+        """Under the lock the filter knows the codes another journal appended"""
+        first = TransferJournal(self.legacy_path)
+        second = TransferJournal(self.legacy_path)
+        self.assertNotIn("a", second)
+        first.append(make_record("a"))
+        with second.locked():
+            self.assertIn("a", second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""This module runs many processes writing to the same stores at once"""
+import unittest
+import os
+import json
+import multiprocessing
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest.mock import patch
+# pylint: disable=import-error
+from uc3m_money.account_deposit import deposit_into_account
+from uc3m_money.account_balance import store_new_balance
+from uc3m_money.transfer_request import process_transfer
+from uc3m_money.transfer_journal import read_transactions, close_journals
+
+WORKERS = 8
+OPERATIONS = 15
+IBAN = "ES8658342044541216872704"
+
+
+def worker(base_dir: str, worker_id: int):
+    """Makes OPERATIONS deposits, transfers and balance snapshots on the stores of base_dir"""
+    module_file = os.path.join(base_dir, "level1", "level2", "dummy_module.py")
+    transfer_date = (date.today() + timedelta(days=30)).strftime("%d/%m/%Y")
+    with patch("uc3m_money.account_deposit.__file__", module_file), \
+            patch("uc3m_money.account_balance.__file__", module_file), \
+            patch("uc3m_money.transfer_request.__file__", module_file):
+        input_file = os.path.join(base_dir, f"deposit_{worker_id}.json")
+        with open(input_file, "w", encoding="utf-8") as f:
+            json.dump({"IBAN": IBAN, "AMOUNT": "EUR 500.00"}, f)  # type: ignore
+        for operation in range(OPERATIONS):
+            deposit_into_account(input_file)
+            process_transfer("ES9121000418450200051332", "ES7921000813610123456789",
+                             f"worker {worker_id} payment", "ORDINARY", transfer_date,
+                             f"{100 + operation}.00")
+            store_new_balance(IBAN)
+        close_journals()
+
+
+class TestConcurrentWrites(unittest.TestCase):
+    """Here we check that no record is lost when several processes write at once"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.base_dir = self.temp_dir.name
+        os.makedirs(os.path.join(self.base_dir, "level1", "level2"))
+        main_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                "..", "..", "main"))
+        shutil.copy(os.path.join(main_dir, "all_transactions.json"), self.base_dir)
+        with open(os.path.join(self.base_dir, "account_balances.json"), "w",
+                  encoding="utf-8") as f:
+            f.write("[]")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _load(self, name):
+        with open(os.path.join(self.base_dir, name), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_no_record_is_lost(self):
+        """Every deposit, transfer and snapshot of every process is stored"""
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=worker, args=(self.base_dir, worker_id))
+                     for worker_id in range(WORKERS)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=120)
+            self.assertEqual(process.exitcode, 0)
+
+        total = WORKERS * OPERATIONS
+        deposits = self._load("deposits.json")
+        self.assertEqual(len(deposits), total)
+        self.assertEqual(len({d["deposit_signature"] for d in deposits}), total)
+        self.assertEqual(len(self._load("account_balances.json")), total)
+        legacy_path = os.path.join(self.base_dir, "stored_transactions.json")
+        transfers = read_transactions(legacy_path)
+        self.assertEqual(len(transfers), total)
+        self.assertEqual(len({t["transfer_code"] for t in transfers}), total)
+        close_journals()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""This module tests the read-through cache of the JSON array files"""
+import unittest
+import os
+import json
+import tempfile
+# pylint: disable=import-error
+from uc3m_money import file_cache
+from uc3m_money.file_cache import FileCache, load_json
+from uc3m_money.json_array_store import (load_json_array, write_json_array,
+                                         append_to_json_array)
+
+
+def _write(path: str, records: list):
+    """Writes the file as another process would, behind the back of the cache"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=4)  # type: ignore
+
+
+class TestFileCache(unittest.TestCase):
+    """Here we check when the cached arrays are served and when they are dropped"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.temp_dir.name, "deposits.json")
+        self.cache = file_cache.set_max_bytes(file_cache.DEFAULT_MAX_BYTES)
+
+    def tearDown(self):
+        file_cache.set_max_bytes(file_cache.DEFAULT_MAX_BYTES)
+        self.temp_dir.cleanup()
+
+    def test_second_load_is_a_hit(self):
+        """A file that did not change is parsed only once"""
+        _write(self.path, [{"a": 1}])
+        self.assertEqual(load_json_array(self.path), [{"a": 1}])
+        self.assertEqual(load_json_array(self.path), [{"a": 1}])
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 1))
+
+    def test_callers_get_a_copy(self):
+        """Changing the returned list does not change the cached array"""
+        _write(self.path, [{"a": 1}])
+        load_json_array(self.path).append({"b": 2})
+        self.assertEqual(load_json_array(self.path), [{"a": 1}])
+
+    def test_file_changed_by_another_process(self):
+        """A file changed on disk (other size or time) is read again"""
+        _write(self.path, [{"a": 1}])
+        load_json_array(self.path)
+        _write(self.path, [{"a": 1}, {"b": 2}])
+        self.assertEqual(load_json_array(self.path), [{"a": 1}, {"b": 2}])
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_file_replaced_by_another_process(self):
+        """A file replaced by another one with the same size and time is read again"""
+        _write(self.path, [{"a": 1}])
+        stat = os.stat(self.path)
+        load_json_array(self.path)
+        other_path = self.path + ".new"
+        _write(other_path, [{"a": 2}])
+        os.utime(other_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(other_path, self.path)
+        self.assertEqual(load_json_array(self.path), [{"a": 2}])
+
+    def test_own_writes_update_the_cache(self):
+        """After a write or an append in place the file is not parsed again"""
+        write_json_array(self.path, [{"a": 1}])
+        append_to_json_array(self.path, [{"b": 2}])
+        self.assertEqual(load_json(self.path), [{"a": 1}, {"b": 2}])
+        self.assertEqual((self.cache.misses, self.cache.hits), (0, 1))
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [{"a": 1}, {"b": 2}])
+
+    def test_append_to_a_stale_entry_drops_it(self):
+        """An append to a file changed by another process does not patch the old array"""
+        write_json_array(self.path, [{"a": 1}])
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('[{"c":3}]')
+        append_to_json_array(self.path, [{"b": 2}])
+        self.assertNotIn(self.path, self.cache)
+        self.assertEqual(load_json_array(self.path), [{"c": 3}, {"b": 2}])
+
+    def test_least_recently_used_files_are_evicted(self):
+        """The total size of the cached files stays under the cap"""
+        paths = [os.path.join(self.temp_dir.name, f"file{number}.json") for number in range(3)]
+        for path in paths:
+            _write(path, [{"value": "x" * 100}])
+        cache = file_cache.set_max_bytes(2 * os.path.getsize(paths[0]))
+        load_json(paths[0])
+        load_json(paths[1])
+        load_json(paths[0])
+        load_json(paths[2])
+        self.assertEqual(cache.evictions, 1)
+        self.assertNotIn(paths[1], cache)
+        self.assertIn(paths[0], cache)
+        self.assertLessEqual(cache.cached_bytes, cache.max_bytes)
+
+    def test_disabled_cache(self):
+        """With a cap of 0 nothing is cached"""
+        cache = file_cache.set_max_bytes(0)
+        _write(self.path, [{"a": 1}])
+        load_json_array(self.path)
+        self.assertEqual((len(cache), cache.hits), (0, 0))
+
+    def test_objects_are_not_cached(self):
+        """Only arrays are cached, other json values are returned as loaded"""
+        _write(self.path, {"a": 1})
+        self.assertEqual(load_json(self.path), {"a": 1})
+        self.assertEqual(len(self.cache), 0)
+        self.assertIsNone(FileCache().get(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
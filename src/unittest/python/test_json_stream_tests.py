@@ -0,0 +1,57 @@
+"""This module tests the incremental reader of JSON array files"""
+import unittest
+import os
+import json
+import tempfile
+# pylint: disable=import-error
+from uc3m_money.json_stream import iter_json_array
+
+
+class TestIterJsonArray(unittest.TestCase):
+    """Here we check the streamed elements against json.load"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.temp_dir.name, "all_transactions.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, content: str):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def test_same_elements_as_json_load(self):
+        """Every chunk size gives the elements json.load gives"""
+        data = [{"IBAN": "ES8658342044541216872704", "amount": "-1280.06"},
+                12345, -0.5, "text, with ] chars", [1, [2, 3]], None, True, {}]
+        self._write(json.dumps(data, indent=4))
+        for chunk_size in (1, 2, 3, 7, 64, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_json_array(self.path, chunk_size)), data)
+
+    def test_empty_array(self):
+        """An empty array gives no elements"""
+        self._write("[\n\n]")
+        self.assertEqual(list(iter_json_array(self.path, 1)), [])
+
+    def test_stops_early(self):
+        """The elements before an error are yielded before it is raised"""
+        self._write('[{"IBAN": "a"}, {"IBAN": "b"}, oops]')
+        elements = iter_json_array(self.path, 4)
+        self.assertEqual(next(elements), {"IBAN": "a"})
+        self.assertEqual(next(elements), {"IBAN": "b"})
+        with self.assertRaises(json.JSONDecodeError):
+            next(elements)
+
+    def test_not_an_array(self):
+        """Files that are not an array raise a decode error"""
+        for content in ('{"IBAN": "a"}', "", "[1 2]", "[1,"):
+            with self.subTest(content=content):
+                self._write(content)
+                with self.assertRaises(json.JSONDecodeError):
+                    list(iter_json_array(self.path, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
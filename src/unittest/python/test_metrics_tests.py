@@ -0,0 +1,124 @@
+"""This module tests the optional timers and counters of the entry points"""
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest.mock import patch
+# pylint: disable=import-error
+from uc3m_money import metrics
+from uc3m_money.metrics import MetricsRegistry, PrometheusTextFile
+from uc3m_money.transfer_request import process_transfer
+from uc3m_money.account_deposit import deposit_into_account
+from uc3m_money.account_balance import store_new_balance
+from uc3m_money.transfer_journal import close_journals
+
+# pylint: disable=duplicate-code
+IBAN = "ES8658342044541216872704"
+
+
+class TestMetricsDisabled(unittest.TestCase):
+    """Here we check that nothing is measured without a sink"""
+
+    def test_shared_null_timer(self):
+        """Without a sink every timer is the same do-nothing context manager"""
+        self.assertIsNone(metrics.get_sink())
+        self.assertFalse(metrics.enabled())
+        self.assertIs(metrics.timer("transfer", "validate"), metrics.timer("deposit", "read"))
+        with metrics.timer("transfer", "validate"):
+            metrics.count("bytes_read", "deposits.json", 10)
+
+    def test_set_sink_closes_the_previous_one(self):
+        """Selecting another sink closes the previous one"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "uc3m_money.prom")
+            metrics.set_sink(PrometheusTextFile(path))
+            metrics.count("rows_scanned", "/data/all_transactions.json", 3)
+            metrics.set_sink(None)
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        self.assertIn('uc3m_money_rows_scanned_total{file="all_transactions.json"} 3\n', text)
+
+
+class TestMetricsOfTheEntryPoints(unittest.TestCase):
+    """Here we run the entry points on copies of the json files with a registry"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        base_dir = self.temp_dir.name
+        nested_dir = os.path.join(base_dir, "level1", "level2")
+        os.makedirs(nested_dir)
+        main_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                "..", "..", "main"))
+        shutil.copy(os.path.join(main_dir, "all_transactions.json"), base_dir)
+        with open(os.path.join(base_dir, "account_balances.json"), "w", encoding="utf-8") as f:
+            f.write("[]")
+        self.input_file = os.path.join(base_dir, "input.json")
+        with open(self.input_file, "w", encoding="utf-8") as f:
+            json.dump({"IBAN": IBAN, "AMOUNT": "EUR 500.00"}, f)  # type: ignore
+        module_file = os.path.join(nested_dir, "dummy_module.py")
+        self.patchers = [patch(f"uc3m_money.{module}.__file__", module_file)
+                         for module in ("transfer_request", "account_deposit",
+                                        "account_balance")]
+        for patcher in self.patchers:
+            patcher.start()
+        self.registry = MetricsRegistry()
+        metrics.set_sink(self.registry)
+
+    def tearDown(self):
+        metrics.set_sink(None)
+        close_journals()
+        for patcher in self.patchers:
+            patcher.stop()
+        self.temp_dir.cleanup()
+
+    def test_phases_are_timed(self):
+        """Every phase of the three entry points is timed once per call"""
+        transfer_date = (date.today() + timedelta(days=30)).strftime("%d/%m/%Y")
+        process_transfer(IBAN, "ES9121000418450200051332", "monthly rent payment",
+                         "ORDINARY", transfer_date, "100.00")
+        deposit_into_account(self.input_file)
+        deposit_into_account(self.input_file)
+        store_new_balance(IBAN)
+        timers = self.registry.timers()
+        for phase in ("validate", "hash", "dedup", "write"):
+            self.assertEqual(timers[("transfer", phase)]["count"], 1)
+        for phase in ("read", "validate", "hash", "write"):
+            self.assertEqual(timers[("deposit", phase)]["count"], 2)
+        for phase in ("validate", "aggregate", "write"):
+            self.assertIn(("balance", phase), timers)
+
+    def test_bytes_and_rows_are_counted(self):
+        """The stores count the bytes they read and write and the rows they scan"""
+        deposits_path = os.path.join(self.temp_dir.name, "deposits.json")
+        deposit_into_account(self.input_file)
+        first_size = os.path.getsize(deposits_path)
+        deposit_into_account(self.input_file)
+        store_new_balance(IBAN)
+        counters = self.registry.counters()
+        self.assertEqual(counters[("bytes_read", "input.json")],
+                         2 * os.path.getsize(self.input_file))
+        # The second deposit finds the file the first one wrote in the file cache
+        # and only writes it again
+        self.assertNotIn(("bytes_read", "deposits.json"), counters)
+        self.assertEqual(counters[("bytes_written", "deposits.json")],
+                         first_size + os.path.getsize(deposits_path))
+        with open(os.path.join(self.temp_dir.name, "all_transactions.json"), "r",
+                  encoding="utf-8") as f:
+            rows = len(json.load(f))
+        self.assertEqual(counters[("rows_scanned", "all_transactions.json")], rows)
+        self.assertIn(("bytes_written", "account_balances.json"), counters)
+
+    def test_prometheus_text(self):
+        """The figures are exposed in the Prometheus text format"""
+        deposit_into_account(self.input_file)
+        text = self.registry.prometheus_text()
+        self.assertIn("# TYPE uc3m_money_phase_seconds summary\n", text)
+        self.assertIn('uc3m_money_phase_seconds_count{operation="deposit",phase="read"} 1\n',
+                      text)
+        self.assertIn('uc3m_money_bytes_written_total{file="deposits.json"} ', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
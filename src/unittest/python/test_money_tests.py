@@ -0,0 +1,35 @@
+"""This module tests the exact money amounts"""
+import unittest
+# pylint: disable=import-error
+from uc3m_money.money import parse_cents, cents_to_float, format_cents
+
+
+class TestParseCents(unittest.TestCase):
+    """Here we check the amounts accepted and rejected by parse_cents"""
+
+    def test_valid_amounts(self):
+        """Every supported notation gives the exact number of cents"""
+        cases = {"+2424.42": 242442, "-1021.97": -102197, "EUR 500.00": 50000,
+                 "1,000.00": 100000, "10": 1000, "10.5": 1050, "-.5": -50,
+                 " 12.34 ": 1234, 10.01: 1001, 7: 700}
+        for amount, cents in cases.items():
+            with self.subTest(amount=amount):
+                self.assertEqual(parse_cents(amount), cents)
+
+    def test_invalid_amounts(self):
+        """Amounts that are not numbers or have more than two decimals are rejected"""
+        for amount in ("", ".", "abc", "1.234", "EUR 10,50", "1,00.00", "1_0.00",
+                       "+-1.00", "1.2.34", 1e-05, float("nan"), True, None):
+            with self.subTest(amount=amount):
+                with self.assertRaises(ValueError):
+                    parse_cents(amount)
+
+    def test_conversions(self):
+        """Cents are turned into the float and the text of the amount"""
+        self.assertEqual(cents_to_float(1001), 10.01)
+        self.assertEqual(format_cents(-102197), "-1021.97")
+        self.assertEqual(format_cents(5), "0.05")
+
+
+if __name__ == '__main__':
+    unittest.main()
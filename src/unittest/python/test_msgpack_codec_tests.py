@@ -0,0 +1,55 @@
+"""This module tests the bundled MessagePack codec"""
+import unittest
+import io
+# pylint: disable=import-error
+from uc3m_money.msgpack_codec import packb, unpackb, iter_unpack, IncompleteData
+
+
+class TestMsgpackCodec(unittest.TestCase):
+    """Here we check the encoding against the MessagePack specification"""
+
+    def test_round_trip(self):
+        """Every supported value decodes to what was encoded"""
+        values = [None, True, False, 0, 127, 128, 255, 256, 65536, 2 ** 32, 2 ** 64 - 1,
+                  -1, -32, -33, -128, -129, -32768, -32769, -2 ** 31 - 1, -2 ** 63,
+                  0.1, -1280.06, "", "x" * 31, "x" * 32, "ñ" * 200, "y" * 70000,
+                  b"\x00\xff", [], list(range(20)), {}, {str(n): n for n in range(20)},
+                  {"IBAN": "ES8658342044541216872704", "amount": 10.5, "nested": [{"a": None}]}]
+        for value in values:
+            with self.subTest(value=str(value)[:30]):
+                self.assertEqual(unpackb(packb(value)), value)
+
+    def test_known_encodings(self):
+        """The bytes are the ones of the specification"""
+        self.assertEqual(packb({"a": 1}), b"\x81\xa1a\x01")
+        self.assertEqual(packb([None, True, -1]), b"\x93\xc0\xc3\xff")
+        self.assertEqual(packb(300), b"\xcd\x01\x2c")
+        self.assertEqual(packb(1.5), b"\xcb\x3f\xf8" + b"\x00" * 6)
+        self.assertEqual(unpackb(b"\xca\x3f\xc0\x00\x00"), 1.5)
+
+    def test_errors(self):
+        """Unsupported values and broken data are rejected"""
+        with self.assertRaises(TypeError):
+            packb({1, 2})
+        with self.assertRaises(ValueError):
+            packb(2 ** 64)
+        with self.assertRaises(IncompleteData):
+            unpackb(packb("text")[:-1])
+        with self.assertRaises(ValueError):
+            unpackb(b"\xc1")
+        with self.assertRaises(ValueError):
+            unpackb(packb(1) + packb(2))
+
+    def test_iter_unpack(self):
+        """Consecutive values are streamed whatever the chunk size"""
+        records = [{"n": n, "text": "z" * n} for n in range(50)]
+        data = b"".join(packb(record) for record in records)
+        for chunk_size in (1, 3, 64, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_unpack(io.BytesIO(data), chunk_size)), records)
+        with self.assertRaises(IncompleteData):
+            list(iter_unpack(io.BytesIO(data[:-1]), 7))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""This module tests the output formats of the store files"""
+import unittest
+import os
+import json
+import tempfile
+from unittest.mock import patch
+# pylint: disable=import-error
+from uc3m_money import record_format, file_cache
+from uc3m_money.record_format import iter_records, set_output_format, COMPACT, JSONL, MSGPACK
+from uc3m_money.json_array_store import (load_json_array, write_json_array,
+                                         append_to_json_array, recover_append,
+                                         CORRUPT_SUFFIX)
+from uc3m_money.store_commands import main
+
+RECORDS = [{"iban": "ES8658342044541216872704", "amount": 10.5, "date": "2025-03-24"},
+           {"iban": "ES3559005439021242088295", "amount": -1.0, "date": "2025-03-25"}]
+
+
+class TestRecordFormat(unittest.TestCase):
+    """Here we write and append in every format and read the files back"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.temp_dir.name, "account_balances.json")
+        file_cache.get_file_cache().clear()
+
+    def tearDown(self):
+        set_output_format(COMPACT)
+        self.temp_dir.cleanup()
+
+    def _content(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def _uncached_load(self) -> list:
+        file_cache.get_file_cache().clear()
+        return load_json_array(self.path)
+
+    def test_compact_is_the_default(self):
+        """Without a choice the stores are compact JSON arrays"""
+        write_json_array(self.path, RECORDS[:1])
+        append_to_json_array(self.path, RECORDS[1:])
+        self.assertEqual(self._content(), json.dumps(RECORDS, separators=(",", ":")).encode())
+
+    def test_every_format_is_read_back(self):
+        """Whole writes and appends in place give the same records in every format"""
+        for output_format in record_format.FORMATS:
+            with self.subTest(output_format=output_format):
+                set_output_format(output_format)
+                write_json_array(self.path, [])
+                append_to_json_array(self.path, RECORDS[:1])
+                append_to_json_array(self.path, RECORDS[1:])
+                self.assertEqual(self._content(), record_format.encode(RECORDS))
+                self.assertEqual(self._uncached_load(), RECORDS)
+                self.assertEqual(list(iter_records(self.path)), RECORDS)
+
+    def test_detection(self):
+        """The format is told by the first bytes of the file"""
+        self.assertEqual(record_format.detect(b"\n  [\n    {"), COMPACT)
+        self.assertEqual(record_format.detect(b'{"a":1}\n'), JSONL)
+        self.assertEqual(record_format.detect(record_format.MAGIC), MSGPACK)
+        self.assertIsNone(record_format.detect(b"  \n"))
+        self.assertEqual(record_format.layout(b"[\n    {"), (COMPACT, False))
+        self.assertEqual(record_format.layout(b"[\n\n]"), (COMPACT, True))
+
+    def test_other_format_is_rewritten(self):
+        """Appending to a file in another format rewrites it in the selected one"""
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(RECORDS[:1], f, indent=4)  # type: ignore
+        set_output_format(MSGPACK)
+        append_to_json_array(self.path, RECORDS[1:])
+        self.assertTrue(self._content().startswith(record_format.MAGIC))
+        self.assertEqual(self._uncached_load(), RECORDS)
+
+    def test_torn_json_lines_file_is_not_appended_to(self):
+        """A JSON Lines file without its last newline is not extended in place, it is
+        kept as .corrupt before it is written again"""
+        set_output_format(JSONL)
+        torn = json.dumps(RECORDS[0]) + "\n" + '{"iban": "ES'
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(torn)
+        append_to_json_array(self.path, RECORDS[1:])
+        self.assertEqual(self._content(), record_format.encode(RECORDS[1:]))
+        with open(self.path + CORRUPT_SUFFIX, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), torn)
+
+    def test_torn_append_is_undone(self):
+        """An append in place torn by a crash is undone before the next write, one
+        that was finished is kept"""
+        write_json_array(self.path, RECORDS[:1])
+        appended = record_format.encode_appended(RECORDS[1:], COMPACT, False)
+        with patch("uc3m_money.record_format.encode_appended", return_value=appended[:10]), \
+                patch("uc3m_money.json_array_store._clear_undo"):
+            append_to_json_array(self.path, RECORDS[1:])
+        with self.assertRaises(ValueError):
+            json.loads(self._content())
+        append_to_json_array(self.path, RECORDS[1:])
+        self.assertEqual(self._uncached_load(), RECORDS)
+        with patch("uc3m_money.json_array_store._clear_undo"):
+            append_to_json_array(self.path, RECORDS[:1])
+        self.assertFalse(recover_append(self.path))
+        self.assertEqual(self._uncached_load(), RECORDS + RECORDS[:1])
+        self.assertFalse(os.path.exists(self.path + CORRUPT_SUFFIX))
+
+    def test_single_line_object_is_not_a_record(self):
+        """A JSON object on one line is decoded as the object it is"""
+        self.assertEqual(record_format.decode(b'{"invalid": "structure"}'),
+                         {"invalid": "structure"})
+        self.assertEqual(record_format.decode(b'{"a": 1}\n'), [{"a": 1}])
+
+    def test_unknown_format(self):
+        """Only the known formats can be selected"""
+        with self.assertRaises(ValueError):
+            set_output_format("pretty")
+
+
+class TestStoreCommands(unittest.TestCase):
+    """Here we run the export and convert commands"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.temp_dir.name, "deposits.json")
+        write_json_array(self.path, RECORDS)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_export_pretty(self):
+        """The export is the indented JSON the files used to be"""
+        destination = os.path.join(self.temp_dir.name, "export", "deposits.json")
+        self.assertEqual(main(["export", self.path, destination]), 0)
+        with open(destination, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), json.dumps(RECORDS, indent=4))
+
+    def test_convert(self):
+        """A file is rewritten in another format with the same records"""
+        self.assertEqual(main(["convert", "--format", "msgpack", self.path]), 0)
+        with open(self.path, "rb") as f:
+            self.assertTrue(f.read().startswith(record_format.MAGIC))
+        self.assertEqual(list(iter_records(self.path)), RECORDS)
+        self.assertEqual(main(["convert", "--format", "jsonl", self.path]), 0)
+        self.assertEqual(list(iter_records(self.path)), RECORDS)
+
+    def test_missing_file(self):
+        """A missing file is reported with a non zero status"""
+        missing = os.path.join(self.temp_dir.name, "missing.json")
+        self.assertEqual(main(["convert", "--format", "jsonl", missing]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
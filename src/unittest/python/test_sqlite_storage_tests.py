@@ -0,0 +1,155 @@
+"""This module tests the SQLite storage backend through the three entry points"""
+import unittest
+import os
+import json
+import shutil
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+from unittest.mock import patch
+# pylint: disable=import-error
+from uc3m_money.sqlite_storage import SQLiteStorage, use_sqlite_storage
+from uc3m_money.storage_backend import get_backend, set_backend
+from uc3m_money.transfer_request import (process_transfer, process_transfers,
+                                         AccountManagementException)
+from uc3m_money.account_deposit import deposit_into_account
+from uc3m_money.account_balance import (aggregate_movements, store_new_balance,
+                                        store_all_balances)
+from uc3m_money.balance_ledger import BalanceLedger
+
+# pylint: disable=duplicate-code
+IBAN = "ES8658342044541216872704"
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    """Here we check that the entry points give the same results with the SQLite backend"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        nested_dir = os.path.join(self.temp_dir.name, "level1", "level2")
+        os.makedirs(nested_dir)
+        main_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                "..", "..", "main"))
+        self.transactions_path = os.path.join(self.temp_dir.name, "all_transactions.json")
+        shutil.copy(os.path.join(main_dir, "all_transactions.json"), self.transactions_path)
+        # No JSON file is written with a backend, the module paths point to the temporary dir
+        self.patcher = patch("uc3m_money.account_balance.__file__",
+                             os.path.join(nested_dir, "dummy_module.py"))
+        self.patcher.start()
+        self.storage = use_sqlite_storage(os.path.join(self.temp_dir.name, "money.sqlite3"))
+        self.date = (date.today() + timedelta(days=30)).strftime("%d/%m/%Y")
+
+    def tearDown(self):
+        set_backend(None)
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def _request(self, amount="100.00"):
+        return {"from_iban": "ES9121000418450200051332",
+                "to_iban": "ES7921000813610123456789",
+                "concept": "monthly rent payment", "transfer_type": "ORDINARY",
+                "date": self.date, "amount": amount}
+
+    def test_database_is_in_wal_mode(self):
+        """The database uses write ahead logging"""
+        self.assertIs(get_backend(), self.storage)
+        self.assertTrue(os.path.exists(self.storage.path + "-wal"))
+
+    def test_transfer_is_stored_once(self):
+        """A transfer is stored and the same one again raises the usual exception"""
+        with patch("uc3m_money.transfer_request.datetime") as mock_datetime:
+            mock_datetime.now.return_value.date.return_value = date.today()
+            mock_datetime.timestamp.return_value = 1742846943.840017
+            result = process_transfer(**self._request())
+            self.assertTrue(result.startswith("Transfer Code: "))
+            with self.assertRaises(AccountManagementException) as context:
+                process_transfer(**self._request())
+        self.assertEqual(context.exception.args[0], "Output JSON file already has that transfer")
+        records = list(self.storage.transfer_store().records())
+        self.assertEqual(len(records), 1)
+        self.assertEqual(f"Transfer Code: {records[0]['transfer_code']}", result)
+
+    def test_transfer_batch(self):
+        """A batch is stored in one transaction with the usual results"""
+        results = process_transfers([self._request(), self._request(amount="5.00"),
+                                     self._request(amount="250.00")])
+        self.assertIn("Transfer Code", results[0])
+        self.assertIsInstance(results[1], AccountManagementException)
+        self.assertEqual(len(list(self.storage.transfer_store().records())), 2)
+
+    def test_duplicate_insert_is_rejected(self):
+        """The unique index rejects a transfer code stored by another writer"""
+        store = self.storage.transfer_store()
+        record = {"transfer_code": "abc", "from_iban": IBAN, "to_iban": IBAN}
+        store.append(record)
+        with self.assertRaises(AccountManagementException):
+            store.append_many([dict(record, transfer_code="def"), record])
+        self.assertEqual([r["transfer_code"] for r in store.records()], ["abc"])
+
+    def test_check_and_insert_are_one_transaction(self):
+        """Under locked() no other writer can store a transfer between the duplicate
+        check and the insert, and the insert is committed on exit"""
+        store = self.storage.transfer_store()
+        record = {"transfer_code": "abc", "from_iban": IBAN, "to_iban": IBAN}
+        other = SQLiteStorage(self.storage.path)
+        other.connection().execute("PRAGMA busy_timeout = 50")
+        with store.locked():
+            self.assertNotIn("abc", store)
+            with self.assertRaises(sqlite3.OperationalError):
+                other.transfer_store().append(record)
+            store.append(record)
+        self.assertIn("abc", other.transfer_store())
+        with self.assertRaises(AccountManagementException):
+            with store.locked():
+                store.append(dict(record, transfer_code="def"))
+                raise AccountManagementException("rolled back")
+        self.assertEqual([r["transfer_code"] for r in other.transfer_store().records()],
+                         ["abc"])
+        other.close()
+
+    def test_deposit_is_stored(self):
+        """A deposit returns its signature and is stored in the database"""
+        input_file = os.path.join(self.temp_dir.name, "deposit.json")
+        with open(input_file, "w", encoding="utf-8") as f:
+            json.dump({"IBAN": IBAN, "AMOUNT": "EUR 500.00"}, f)  # type: ignore
+        signature = deposit_into_account(input_file)
+        self.assertEqual([d["deposit_signature"] for d in self.storage.deposits()], [signature])
+
+    def test_balances_match_the_json_path(self):
+        """The balances are the same as the ledger ones and are stored in the database"""
+        ledger = BalanceLedger(self.transactions_path)
+        self.assertEqual(aggregate_movements(IBAN), ledger.balance(IBAN))
+        self.assertTrue(store_new_balance(IBAN))
+        self.assertTrue(store_new_balance(IBAN, upsert=True))
+        self.assertEqual(len(self.storage.balances()), 1)
+        report = store_all_balances()
+        self.assertEqual(report["transactions"], ledger.rows)
+        self.assertEqual({b["iban"]: b["amount"] for b in self.storage.balances()[1:]},
+                         ledger.balances())
+
+    def test_unknown_iban(self):
+        """An IBAN without movements raises the usual exception"""
+        with self.assertRaises(Exception) as context:
+            aggregate_movements("ES8200000000000000000000")
+        self.assertEqual(str(context.exception), "Transaction not stored")
+
+    def test_changed_transactions_are_reloaded(self):
+        """Movements of a rewritten transactions file replace the loaded ones"""
+        aggregate_movements(IBAN)
+        with open(self.transactions_path, "w", encoding="utf-8") as f:
+            json.dump([{"IBAN": IBAN, "amount": "+10.05"}], f)  # type: ignore
+        self.assertEqual(aggregate_movements(IBAN), 10.05)
+        self.assertEqual(self.storage.movement_count(), 1)
+
+    def test_reopened_database_keeps_data(self):
+        """The data is still there after the database is opened again"""
+        self.storage.add_balances([{"iban": IBAN, "amount": 1.5, "date": "2025-03-24"}])
+        set_backend(None)
+        storage = SQLiteStorage(self.storage.path)
+        self.assertEqual(storage.balances(), [{"iban": IBAN, "amount": 1.5,
+                                               "date": "2025-03-24"}])
+        storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""This module tests the transfer code index kept next to the transfer journal"""
+import unittest
+import os
+import json
+import tempfile
+# pylint: disable=import-error
+from uc3m_money.transfer_index import TransferCodeIndex, MIN_CAPACITY
+
+
+class TestTransferCodeIndex(unittest.TestCase):
+    """Tests lookups, persistence and recovery of the transfer code index"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.journal_path = os.path.join(self.temp_dir.name, "stored_transactions.jsonl")
+        self.index_path = os.path.join(self.temp_dir.name, "stored_transactions.idx")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _append_journal(self, *codes):
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for code in codes:
+                f.write(json.dumps({"transfer_code": code}) + "\n")
+
+    def test_add_and_contains(self):
+        """Added codes are found and are not added twice"""
+        index = TransferCodeIndex(self.index_path, self.journal_path)
+        self.assertNotIn("abc", index)
+        self.assertTrue(index.add("abc"))
+        self.assertFalse(index.add("abc"))
+        self.assertIn("abc", index)
+        self.assertEqual(len(index), 1)
+        index.close()
+
+    def test_index_persists_between_openings(self):
+        """Codes added before closing are found after reopening the file"""
+        index = TransferCodeIndex(self.index_path, self.journal_path)
+        index.add("abc")
+        index.close()
+        reopened = TransferCodeIndex(self.index_path, self.journal_path)
+        self.assertIn("abc", reopened)
+        reopened.close()
+
+    def test_catches_up_with_journal(self):
+        """Lines appended to the journal after the index was built get indexed on load"""
+        self._append_journal("first")
+        index = TransferCodeIndex(self.index_path, self.journal_path)
+        self.assertIn("first", index)
+        index.close()
+        self._append_journal("second")
+        reopened = TransferCodeIndex(self.index_path, self.journal_path)
+        self.assertIn("first", reopened)
+        self.assertIn("second", reopened)
+        reopened.close()
+
+    def test_rebuilds_when_journal_was_replaced(self):
+        """An index covering more bytes than the journal has is rebuilt"""
+        self._append_journal("first", "second")
+        index = TransferCodeIndex(self.index_path, self.journal_path)
+        self.assertIn("second", index)
+        index.close()
+        os.remove(self.journal_path)
+        self._append_journal("third")
+        reopened = TransferCodeIndex(self.index_path, self.journal_path)
+        self.assertNotIn("second", reopened)
+        self.assertIn("third", reopened)
+        reopened.close()
+
+    def test_grows_past_initial_capacity(self):
+        """The table doubles its capacity without losing codes"""
+        index = TransferCodeIndex(self.index_path, self.journal_path)
+        codes = [f"code-{i}" for i in range(MIN_CAPACITY)]
+        for code in codes:
+            index.add(code)
+        self.assertEqual(len(index), MIN_CAPACITY)
+        self.assertTrue(all(code in index for code in codes))
+        index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
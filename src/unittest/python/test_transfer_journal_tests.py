@@ -0,0 +1,233 @@
+"""This module tests the append-only journal used by process_transfer"""
+import unittest
+import os
+import json
+import tempfile
+from unittest import mock
+# pylint: disable=import-error
+from uc3m_money.transfer_journal import (TransferJournal, PartitionedTransferStore,
+                                         read_transactions, close_journals)
+from uc3m_money.store_commands import main
+from uc3m_money.account_management_exception import AccountManagementException
+
+
+def make_record(code: str, transfer_date: str = "24/03/2025") -> dict:
+    """Builds a minimal transfer record for the journal tests"""
+    return {"from_iban": "ES9121000418450200051332",
+            "to_iban": "ES7921000813610123456789",
+            "transfer_date": transfer_date,
+            "transfer_code": code}
+
+
+class TestTransferJournal(unittest.TestCase):
+    """Tests the migration, append and compatibility reader of the journal"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.legacy_path = os.path.join(self.temp_dir.name, "stored_transactions.json")
+
+    def tearDown(self):
+        close_journals()
+        self.temp_dir.cleanup()
+
+    def _write_legacy(self, content):
+        with open(self.legacy_path, "w", encoding="utf-8") as f:
+            json.dump(content, f, indent=4)  # type: ignore
+
+    def test_migrates_legacy_array_once(self):
+        """The legacy array is copied to the journal only the first time"""
+        self._write_legacy([make_record("a"), make_record("b")])
+        journal = TransferJournal(self.legacy_path)
+        self.assertTrue(os.path.exists(journal.path))
+        self.assertEqual([r["transfer_code"] for r in journal.records()], ["a", "b"])
+        journal.close()
+        self._write_legacy([make_record("c")])
+        self.assertEqual(TransferJournal(self.legacy_path).migrate(), 0)
+
+    def test_broken_legacy_is_not_migrated(self):
+        """A legacy file that cannot be decoded is not taken for an empty list: the
+        journal is not created and the file is left as it is"""
+        self._write_legacy([make_record("a"), make_record("b")])
+        with open(self.legacy_path, "r+", encoding="utf-8") as f:
+            f.truncate(40)
+        for store in (TransferJournal, PartitionedTransferStore):
+            with self.subTest(store=store.__name__):
+                with self.assertRaises(AccountManagementException):
+                    store(self.legacy_path)
+                self.assertEqual(os.path.getsize(self.legacy_path), 40)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name,
+                                                     "stored_transactions.jsonl")))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name,
+                                                     "stored_transactions.partitions")))
+
+    def test_append_does_not_rewrite_previous_records(self):
+        """Appending keeps the previous bytes of the journal untouched"""
+        self._write_legacy([make_record("a")])
+        journal = TransferJournal(self.legacy_path, sync_every=2)
+        with open(journal.path, "rb") as f:
+            before = f.read()
+        journal.append(make_record("b"))
+        journal.append_many([make_record("c"), make_record("d")])
+        with open(journal.path, "rb") as f:
+            after = f.read()
+        self.assertTrue(after.startswith(before))
+        self.assertEqual([r["transfer_code"] for r in journal.records()], ["a", "b", "c", "d"])
+
+    def test_torn_last_line_is_ignored(self):
+        """A partially written last line is not returned, and is cut off before the
+        next append"""
+        journal = TransferJournal(self.legacy_path)
+        journal.append(make_record("a"))
+        journal.sync()
+        with open(journal.path, "a", encoding="utf-8") as f:
+            f.write('{"transfer_code": "b"')
+        self.assertEqual([r["transfer_code"] for r in journal.records()], ["a"])
+        journal.append(make_record("c"))
+        self.assertEqual([r["transfer_code"] for r in journal.records()], ["a", "c"])
+        other = TransferJournal(self.legacy_path)
+        with other.locked():
+            self.assertIn("c", other)
+            self.assertNotIn("b", other)
+
+    def test_legacy_array_is_only_exported_on_demand(self):
+        """Closing the journal leaves stored_transactions.json alone, export_legacy
+        regenerates it for old consumers"""
+        self._write_legacy([make_record("a")])
+        journal = TransferJournal(self.legacy_path)
+        journal.append(make_record("b"))
+        journal.close()
+        with open(self.legacy_path, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [make_record("a")])
+        self.assertEqual(journal.export_legacy(), 2)
+        with open(self.legacy_path, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        self.assertEqual([r["transfer_code"] for r in legacy], ["a", "b"])
+
+    def test_read_transactions_without_journal(self):
+        """The compatibility reader falls back to the legacy array"""
+        self._write_legacy([make_record("a")])
+        self.assertEqual(read_transactions(self.legacy_path), [make_record("a")])
+
+    def test_sees_appends_of_another_writer(self):
+        """A journal sees the transfers appended by another journal on the same
+        file (as another process would) once it takes the lock"""
+        first = TransferJournal(self.legacy_path)
+        second = TransferJournal(self.legacy_path)
+        self.assertNotIn("a", second)
+        first.append(make_record("a"))
+        for code in range(2000):
+            first.append(make_record(str(code)))
+        with second.locked():
+            self.assertIn("a", second)
+            self.assertIn("1999", second)
+            second.append(make_record("b"))
+        with first.locked():
+            self.assertIn("b", first)
+        first.close()
+        second.close()
+        self.assertEqual(len(read_transactions(self.legacy_path)), 2002)
+
+
+class TestPartitionedTransferStore(unittest.TestCase):
+    """Tests the month partitions of the transfer store and their compaction"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.legacy_path = os.path.join(self.temp_dir.name, "stored_transactions.json")
+
+    def tearDown(self):
+        close_journals()
+        self.temp_dir.cleanup()
+
+    def _codes(self, store):
+        return [record["transfer_code"] for record in store.records()]
+
+    def test_migrates_journal_into_months(self):
+        """The journal is split by month of transfer_date and then removed"""
+        journal = TransferJournal(self.legacy_path)
+        journal.append_many([make_record("a", "24/03/2025"), make_record("b", "01/04/2025"),
+                             make_record("c", "31/03/2025"), make_record("d", "bad")])
+        journal.sync()
+        store = PartitionedTransferStore(self.legacy_path)
+        self.assertEqual(store.partition_names(), ["2025-03", "2025-04", "undated"])
+        self.assertEqual(self._codes(store), ["a", "c", "b", "d"])
+        self.assertFalse(os.path.exists(journal.path))
+        self.assertEqual(PartitionedTransferStore(self.legacy_path).migrate(), 0)
+
+    def test_only_the_month_of_the_transfer_is_touched(self):
+        """Storing and checking a transfer opens only the partition of its month"""
+        store = PartitionedTransferStore(self.legacy_path)
+        store.append_many([make_record("a", "24/03/2025"), make_record("b", "01/04/2025")])
+        store.close()
+        for name in ("2025-03.idx", "2025-04.idx"):
+            os.remove(os.path.join(store.path, name))
+        store = PartitionedTransferStore(self.legacy_path)
+        with store.locked():
+            self.assertTrue(store.has_transfer("a", "24/03/2025"))
+            self.assertFalse(store.has_transfer("b", "24/03/2025"))
+        # Only the index of March was rebuilt
+        self.assertTrue(os.path.exists(os.path.join(store.path, "2025-03.idx")))
+        self.assertFalse(os.path.exists(os.path.join(store.path, "2025-04.idx")))
+        self.assertIn("b", store)
+
+    def test_batch_is_not_partly_stored(self):
+        """If a partition cannot be written the partitions already written are
+        truncated back, with their index and filter"""
+        store = PartitionedTransferStore(self.legacy_path)
+        store.append_many([make_record("a", "24/03/2025"), make_record("b", "01/04/2025")])
+        append_many = TransferJournal.append_many
+
+        def fail_in_april(journal, records):
+            if journal.path.endswith("2025-04.jsonl"):
+                raise OSError("No space left on device")
+            return append_many(journal, records)
+        with mock.patch.object(TransferJournal, "append_many", autospec=True,
+                               side_effect=fail_in_april):
+            with self.assertRaises(OSError):
+                store.append_many([make_record("c", "25/03/2025"),
+                                   make_record("d", "02/04/2025")])
+        self.assertEqual(self._codes(store), ["a", "b"])
+        self.assertFalse(store.has_transfer("c", "25/03/2025"))
+        store.append_many([make_record("c", "25/03/2025"), make_record("d", "02/04/2025")])
+        self.assertEqual(self._codes(store), ["a", "c", "b", "d"])
+        self.assertTrue(store.has_transfer("c", "25/03/2025"))
+
+    def test_export_transfers_command(self):
+        """The export-transfers command regenerates stored_transactions.json for old
+        consumers, closing the store does not"""
+        store = PartitionedTransferStore(self.legacy_path)
+        store.append_many([make_record("a", "01/04/2025"), make_record("b", "24/03/2025")])
+        store.close()
+        self.assertFalse(os.path.exists(self.legacy_path))
+        self.assertEqual(main(["export-transfers", self.legacy_path]), 0)
+        with open(self.legacy_path, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        self.assertEqual([r["transfer_code"] for r in legacy], ["b", "a"])
+        self.assertEqual(read_transactions(self.legacy_path), legacy)
+
+    def test_compact_merges_past_years(self):
+        """The months of past years are merged into one partition per year"""
+        store = PartitionedTransferStore(self.legacy_path)
+        store.append_many([make_record("a", "24/03/2024"), make_record("b", "01/04/2024"),
+                           make_record("c", "01/04/2025")])
+        store.sync()
+        self.assertEqual(store.compact(2025), ["2024"])
+        self.assertEqual(store.partition_names(), ["2024", "2025-04"])
+        self.assertEqual(self._codes(store), ["a", "b", "c"])
+        # A transfer of a compacted year goes to its year
+        store.append(make_record("d", "05/06/2024"))
+        self.assertTrue(store.has_transfer("d", "05/06/2024"))
+        self.assertEqual(store.partition_names(), ["2024", "2025-04"])
+
+    def test_compact_command(self):
+        """The compaction command merges the years before the given one"""
+        store = PartitionedTransferStore(self.legacy_path)
+        store.append_many([make_record("a", "24/03/2023"), make_record("b", "01/04/2024")])
+        store.close()
+        self.assertEqual(main(["compact", "--before-year", "2024", self.legacy_path]), 0)
+        self.assertEqual(PartitionedTransferStore(self.legacy_path).partition_names(),
+                         ["2023", "2024-04"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,9 +4,14 @@ import unittest
 import os
 import json
 import sys
+import hashlib
+import tempfile
+from datetime import date, timedelta
+from unittest.mock import patch
 # pylint: disable=import-error
-from uc3m_money.transfer_request import (process_transfer,
+from uc3m_money.transfer_request import (process_transfer, process_transfers, TransferRequest,
                                          AccountManagementException)
+from uc3m_money.transfer_journal import read_transactions, close_journals
 
 # pylint: disable=duplicate-code
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -320,6 +325,152 @@ class TestAmountValidation(BaseTest):
                     self.assertIn("Amount is not valid", str(cm.exception))
 
 
+class TestTransferCode(BaseTest):
+    """This class checks the memoized transfer code"""
+
+    @staticmethod
+    def _new_transfer():
+        return TransferRequest("ES9121000418450200051332", "ORDINARY",
+                               "ES7921000813610123456789", "monthly rent payment",
+                               "01/01/2030", 100.0)
+
+    def test_transfer_code_is_computed_once(self):
+        """
+        Test that reading the transfer code several times hashes only once.
+        """
+        transfer = self._new_transfer()
+        with patch("uc3m_money.transfer_request.hashlib.md5",
+                   side_effect=hashlib.md5) as md5:
+            code = transfer.transfer_code
+            transfer.to_json()
+            self.assertEqual(transfer.transfer_code, code)
+        self.assertEqual(md5.call_count, 1)
+
+    def test_transfer_code_changes_with_setter(self):
+        """
+        Test that changing a field gives the code of the new values.
+        """
+        transfer = self._new_transfer()
+        code = transfer.transfer_code
+        transfer.transfer_amount = 200.0
+        self.assertNotEqual(transfer.transfer_code, code)
+        transfer.transfer_amount = 100.0
+        self.assertEqual(transfer.transfer_code, code)
+
+    def test_transfer_code_of_the_attribute_layout(self):
+        """
+        Test that the slotted transfer gives the code of the original instance __dict__.
+        """
+        with patch("uc3m_money.transfer_request.datetime") as mock_datetime:
+            mock_datetime.timestamp.return_value = 1742846943.840017
+            transfer = self._new_transfer()
+        attributes = {"_TransferRequest__from_iban": "ES9121000418450200051332",
+                      "_TransferRequest__to_iban": "ES7921000813610123456789",
+                      "_TransferRequest__transfer_type": "ORDINARY",
+                      "_TransferRequest__transfer_concept": "monthly rent payment",
+                      "_TransferRequest__transfer_date": "01/01/2030",
+                      "_TransferRequest__transfer_amount": 100.0,
+                      "_TransferRequest__time_stamp": 1742846943.840017}
+        self.assertEqual(transfer.transfer_code, hashlib.md5(
+            ("Transfer:" + json.dumps(attributes)).encode()).hexdigest())
+        self.assertFalse(hasattr(transfer, "__dict__"))
+
+
+
+class TestProcessTransfers(BaseTest):
+    """This class checks the batch processing of transfers on a temporary store"""
+
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        nested_dir = os.path.join(self.temp_dir.name, "level1", "level2")
+        os.makedirs(nested_dir)
+        # stored_transactions.json is computed as three directories above __file__
+        self.patcher = patch("uc3m_money.transfer_request.__file__",
+                             os.path.join(nested_dir, "dummy_module.py"))
+        self.patcher.start()
+        self.date = (date.today() + timedelta(days=30)).strftime("%d/%m/%Y")
+
+    def tearDown(self):
+        close_journals()
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def _request(self, amount="100.00", concept="monthly rent payment"):
+        return {"from_iban": "ES9121000418450200051332",
+                "to_iban": "ES7921000813610123456789",
+                "concept": concept, "transfer_type": "ORDINARY",
+                "date": self.date, "amount": amount}
+
+    def test_batch_results_in_input_order(self):
+        """
+        Test that every request gets its code or its exception, in input order.
+        """
+        results = process_transfers([self._request(),
+                                     self._request(concept="bad"),
+                                     self._request(amount="5.00"),
+                                     self._request(amount="250.00")])
+        self.assertIn("Transfer Code", results[0])
+        self.assertIsInstance(results[1], AccountManagementException)
+        self.assertIn("Concept is not valid", str(results[1]))
+        self.assertIn("Amount is not valid", str(results[2]))
+        self.assertIn("Transfer Code", results[3])
+
+    def test_batch_non_string_fields(self):
+        """
+        Test that a field that is not a string rejects only its own request.
+        """
+        results = process_transfers([self._request(amount=100),
+                                     self._request(concept=None),
+                                     self._request()])
+        self.assertIn("Transfer request is not valid", str(results[0]))
+        self.assertIn("Transfer request is not valid", str(results[1]))
+        self.assertIn("Transfer Code", results[2])
+        stored = read_transactions(os.path.join(self.temp_dir.name, "stored_transactions.json"))
+        self.assertEqual(["Transfer Code: " + t["transfer_code"] for t in stored], results[2:])
+
+    def test_batch_is_stored_once(self):
+        """
+        Test that the accepted transfers of the batch are stored.
+        """
+        results = process_transfers([self._request(), self._request(amount="250.00")])
+        stored = read_transactions(os.path.join(self.temp_dir.name, "stored_transactions.json"))
+        self.assertEqual(["Transfer Code: " + t["transfer_code"] for t in stored], results)
+
+    def test_batch_rejects_duplicates(self):
+        """
+        Test that a code already stored or repeated in the batch is rejected.
+        """
+        with patch("uc3m_money.transfer_request.datetime") as mock_datetime:
+            mock_datetime.now.return_value.date.return_value = date.today()
+            mock_datetime.timestamp.return_value = 1742846943.840017
+            first = process_transfers([self._request()])
+            second = process_transfers([self._request(amount="250.00"),
+                                        self._request(amount="250.00"),
+                                        self._request()])
+        self.assertIn("Transfer Code", first[0])
+        self.assertIn("Transfer Code", second[0])
+        self.assertIn("already has that transfer", str(second[1]))
+        self.assertIn("already has that transfer", str(second[2]))
+
+    def test_batch_validated_in_worker_processes(self):
+        """
+        Test that validating in worker processes gives the same results, in input order.
+        """
+        requests = [self._request(concept="bad") if number % 4 == 0 else
+                    self._request(amount=f"{100 + number % 9000}.00") for number in range(2500)]
+        results = process_transfers(requests, workers=2)
+        self.assertEqual(len(results), 2500)
+        for number, result in enumerate(results):
+            if number % 4 == 0:
+                self.assertIn("Concept is not valid", str(result))
+            else:
+                self.assertTrue(result.startswith("Transfer Code: "))
+        stored = read_transactions(os.path.join(self.temp_dir.name, "stored_transactions.json"))
+        self.assertEqual(["Transfer Code: " + t["transfer_code"] for t in stored],
+                         [r for r in results if isinstance(r, str)])
+
 
 if __name__ == '__main__':
     unittest.main()
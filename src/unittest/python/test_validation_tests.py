@@ -0,0 +1,138 @@
+"""This module tests the fast parsers of the validation module"""
+import random
+import unittest
+from datetime import datetime
+# pylint: disable=import-error
+from uc3m_money.money import parse_cents
+from uc3m_money.validation import (parse_date, parse_transfer_amount, float_cents, valid_iban,
+                                   valid_ibans)
+from uc3m_money.account_manager import AccountManager
+
+
+def old_transfer_amount(amount) -> int:
+    """The amount checks process_transfer used to do"""
+    normalized_amount = f"{amount:.2f}" if isinstance(amount, float) else amount.replace(",", "")
+    if normalized_amount.count('.') != 1:
+        raise ValueError(amount)
+    integer_part, decimal_part = normalized_amount.split('.')
+    if not (integer_part.isdigit() and decimal_part.isdigit() and len(decimal_part) == 2):
+        raise ValueError(amount)
+    return parse_cents(normalized_amount)
+
+
+class TestParseDate(unittest.TestCase):
+    """Here we check that parse_date accepts and rejects the same dates as strptime"""
+
+    def _assert_same_as_strptime(self, text):
+        try:
+            expected = datetime.strptime(text, "%d/%m/%Y").date()
+        except ValueError:
+            with self.assertRaises(ValueError):
+                parse_date(text)
+            return
+        self.assertEqual(parse_date(text), expected)
+
+    def test_edge_cases(self):
+        """Padding, ranges, leap years and malformed dates"""
+        for text in ("01/01/2025", "1/1/2025", " 1/01/2025", "31/12/2050", "29/02/2028",
+                     "29/02/2027", "31/04/2030", "00/01/2030", "32/01/2030", "01/13/2030",
+                     "01/00/2030", "1/1/25", "01/01/20250", "01-01-2030", " 01/01/2030",
+                     "01/01/2030 ", "001/01/2030", "01/01/0000", "", "//", "10/ 1/2030"):
+            with self.subTest(text=text):
+                self._assert_same_as_strptime(text)
+
+    def test_random_dates(self):
+        """Random strings built from the characters of a date"""
+        generator = random.Random(17)
+        for _ in range(5000):
+            length = generator.randint(6, 11)
+            text = "".join(generator.choice("0123456789/ ") for _ in range(length))
+            with self.subTest(text=text):
+                self._assert_same_as_strptime(text)
+
+    def test_not_a_string(self):
+        """Other types raise TypeError, as in strptime"""
+        with self.assertRaises(TypeError):
+            parse_date(20250101)
+
+
+class TestAmounts(unittest.TestCase):
+    """Here we check the amount parsers against the checks they replace"""
+
+    def test_transfer_amounts(self):
+        """The same amounts are accepted, with the same number of cents"""
+        for amount in ("100.00", "1,000.00", "1,0,00.00", "0010.00", "10.5", "10.000", ".50",
+                       "10.", "+10.00", "-10.00", "1 0.00", "10.0a", "1.2.3", "", 12.5, 12.345):
+            with self.subTest(amount=amount):
+                try:
+                    expected = old_transfer_amount(amount)
+                except ValueError:
+                    with self.assertRaises(ValueError):
+                        parse_transfer_amount(amount)
+                    continue
+                self.assertEqual(parse_transfer_amount(amount), expected)
+
+    def test_float_cents(self):
+        """Floats with more than two decimals are rejected, as by parse_cents"""
+        generator = random.Random(17)
+        amounts = [generator.randrange(1000, 1000001) / 100 for _ in range(5000)]
+        amounts += [generator.uniform(10, 10000) for _ in range(5000)]
+        amounts += [10.0, 10000.0, 0.1 + 0.2, 100.005, float("nan")]
+        for amount in amounts:
+            try:
+                expected = parse_cents(amount)
+            except ValueError:
+                with self.assertRaises(ValueError):
+                    float_cents(amount)
+                continue
+            self.assertEqual(float_cents(amount), expected)
+
+
+class TestValidIban(unittest.TestCase):
+    """Here we check the format and the check digits of the IBANs"""
+
+    def test_check_digits(self):
+        """Only the right check digits are accepted"""
+        self.assertTrue(valid_iban("ES9121000418450200051332"))
+        self.assertTrue(valid_iban("ES8200000000000000000000"))
+        for check_digits in range(100):
+            iban = f"ES{check_digits:02d}21000418450200051332"
+            with self.subTest(iban=iban):
+                self.assertEqual(valid_iban(iban), check_digits == 91)
+
+    def test_same_as_string_mod_97(self):
+        """The integer remainder gives the textbook ISO 13616 result"""
+        generator = random.Random(13)
+        for _ in range(2000):
+            iban = f"ES{generator.randrange(100):02d}{generator.randrange(10 ** 20):020d}"
+            rearranged = "".join(str(int(char, 36)) for char in iban[4:] + iban[:4])
+            with self.subTest(iban=iban):
+                self.assertEqual(valid_iban(iban), int(rearranged) % 97 == 1)
+
+    def test_invalid_format(self):
+        """Other countries, lengths, characters and types are rejected"""
+        for iban in ("FR7630006000011234567890189", "ES912100041845020005133",
+                     "ES91210004184502000513320", "es9121000418450200051332",
+                     "ES91210004184502000513A2", "ES９1210004184502000513３2", "", None, 42):
+            with self.subTest(iban=iban):
+                self.assertFalse(valid_iban(iban))
+
+    def test_unhashable_values(self):
+        """Lists and dicts are not valid IBANs instead of breaking the cache"""
+        for iban in (["ES9121000418450200051332"], {}, {"iban": "ES9121000418450200051332"}):
+            with self.subTest(iban=iban):
+                self.assertFalse(valid_iban(iban))
+                self.assertFalse(AccountManager.validate_iban(iban))
+        self.assertEqual(valid_ibans([["ES"], "ES9121000418450200051332"]), [False, True])
+
+    def test_batch_and_account_manager(self):
+        """The batch form and AccountManager give the same results"""
+        ibans = ["ES9121000418450200051332", "ES7921000813610123456889", None,
+                 "ES7921000813610123456789"]
+        self.assertEqual(valid_ibans(ibans), [True, False, False, True])
+        self.assertEqual([AccountManager.validate_iban(iban) for iban in ibans],
+                         [True, False, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
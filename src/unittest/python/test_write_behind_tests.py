@@ -0,0 +1,81 @@
+"""This module tests the write-behind queue used for deposits"""
+import unittest
+import threading
+import time
+# pylint: disable=import-error
+from uc3m_money.write_behind import WriteBehindQueue
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    """Here we check when the queue stores its records and what happens on errors"""
+
+    def setUp(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def store(self, batch):
+        """Store function that only remembers the batches"""
+        with self.lock:
+            self.batches.append(list(batch))
+
+    def test_full_batches_are_stored(self):
+        """A batch is stored as soon as batch_size records are queued"""
+        queue = WriteBehindQueue(self.store, batch_size=10, interval_ms=60000)
+        queue.put_many(list(range(25)))
+        deadline = time.monotonic() + 5
+        while len(self.batches) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.batches, [list(range(10)), list(range(10, 20))])
+        self.assertEqual(len(queue), 5)
+        queue.close()
+        self.assertEqual(self.batches[-1], list(range(20, 25)))
+
+    def test_interval_stores_partial_batch(self):
+        """Records are stored after the interval even if the batch is not full"""
+        queue = WriteBehindQueue(self.store, batch_size=1000, interval_ms=20)
+        queue.put("a")
+        deadline = time.monotonic() + 5
+        while not self.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.batches, [["a"]])
+        queue.close()
+
+    def test_flush_waits_for_everything(self):
+        """flush() returns once every queued record is stored"""
+        queue = WriteBehindQueue(self.store, batch_size=1000, interval_ms=60000)
+        for record in range(100):
+            queue.put(record)
+        queue.flush()
+        self.assertEqual(sum(self.batches, []), list(range(100)))
+        self.assertEqual(len(queue), 0)
+        queue.close()
+
+    def test_failed_batch_is_retried(self):
+        """A batch that could not be stored is kept, flush raises the error
+        and the next flush stores it"""
+        failures = [OSError("disk full")]
+
+        def store(batch):
+            if failures:
+                raise failures.pop()
+            self.store(batch)
+
+        queue = WriteBehindQueue(store, batch_size=1000, interval_ms=0)
+        queue.put_many([1, 2])
+        time.sleep(0.05)
+        with self.assertRaises(OSError):
+            queue.flush()
+        queue.flush()
+        self.assertEqual(self.batches, [[1, 2]])
+        queue.close()
+
+    def test_closed_queue_rejects_records(self):
+        """Nothing can be queued after close()"""
+        queue = WriteBehindQueue(self.store)
+        queue.close()
+        with self.assertRaises(RuntimeError):
+            queue.put(1)
+
+
+if __name__ == '__main__':
+    unittest.main()